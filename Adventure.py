@@ -1,654 +1,994 @@
+import argparse
 import os
 import random
-import time
-import json
-
-ITEMS_JSON = 'items.json'
-ENEMIES_JSON = 'enemies.json'
-LOCATIONS_JSON = 'locations.json'
+import sys
+
+from clock import GameClock, Poison, StatModifier
+from commands import CommandTable
+from content import STARTING_ITEMS, STAT_BUFFS, get_content
+from persistence import get_store
+from playerstate import Equipment, Inventory, LocationSet, Stats
+from render import FlushBeforePrompt, Renderer
+from savedb import PAGE_SIZE, get_save_db
+from snapshots import AUTOSAVE_FILE, SnapshotLog, apply as apply_snapshot
+from policies import BATTLE_ACTIONS, DIRECTIONS, ENCOUNTER_ACTIONS, PLAYER_CLASSES, TRAP_ACTIONS, BatchPolicy, ConsolePolicy
+from world import EXITS, MAP_IDENTITY
 
 class Player:
-    def __init__(self, player_class):
+    __slots__ = (
+        'player_class', 'state_dir', 'content', 'store', 'saves', 'snapshots', 'policy', 'rng', 'say', 'clock', 'effects',
+        'inventory_file', 'equipped_file', 'inventory', 'equipped_items',
+        'poisoned', 'poison_duration', 'current_location', '_visited', '_world', 'game_over', 'opponent', 'trap',
+        'health', 'max_health', 'mana', 'max_mana', 'stats',
+    )
+
+    def __init__(self, player_class, content=None, store=None, policy=None, rng=None, output=None, clock=None,
+                 state_dir=None, saves=None, world=None):
         self.player_class = player_class
-        self.inventory_file = f'{player_class}_inventory.json'
-        self.equipped_file = f'{player_class}_equipped.json'
-        self.inventory = []
-        self.equipped_items = {
-            'trap_detection_item': None,
-            'trap_disarmament_item': None,
-            'orb_mystic': None,
-            'chest': None,
-            'two-handed weapon': None,
-            'armguards_upper': None,
-            'tome_knowledge': None,
-            'head': None,
-            'tome_power': None,
-            'scroll_lighting': None,
-            'stam_potion': None,
-            'tome_mystic': None,
-            'elixir_power': None,
-            'scroll_fire': None,
-            'int_potion': None,
-            'necklace': None,
-            'legs': None,
-            'scroll_telly': None, 
-            'elixir_life': None,
-            'strength_potion': None,
-            'elixir_speed': None,
-            'elixir_mystic': None,
-            'orb_protection': None,
-            'ring_right': None,
-            'one-handed weapon': None,
-            'shield': None, 
-            'ring_left': None,
-            'orb_summon': None,
-            'elixir_wisdom': None,
-            'gloves': None,
-            'scroll_mystic': None,
-            'boots': None, 
-            'health_potion': None,
-            'tome_secrets': None,
-            'armguards_lower': None,
-            'back': None, 
-            'orb_telly': None,
-            'orb_enlight': None,
-            'agility_potion': None,
-            'scroll_invis': None,
-            'scroll_heal': None,
-            'tome_spells': None,
-            'mana_potion': None,
-        }
-
-        self.load_inventory_from_file()
+        # Each session keeps its files in its own directory so two players of
+        # the same class don't overwrite each other.
+        self.state_dir = state_dir
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self.content = content if content is not None else get_content()
+        # None plays the hand-written map; see world property.
+        self._world = world
+        self.store = store if store is not None else get_store()
+        self.saves = saves
+        self.snapshots = None
+        self.policy = policy if policy is not None else ConsolePolicy()
+        self.rng = rng if rng is not None else random.Random()
+        self.say = output if output is not None else print
+        self.clock = clock if clock is not None else GameClock()
+        self.effects = {}
+        self.inventory_file = self.state_path(f'{player_class}_inventory.json')
+        self.equipped_file = self.state_path(f'{player_class}_equipped.json')
+        self.inventory = Inventory(self.content.items, content=self.content)
+        self.equipped_items = Equipment(self.content.items.slots, content=self.content)
+        self.stats = Stats({'damage_modifier': 1, 'armor_rating': 0, 'damage_rating': 10})
+
+        returning_player = self.load_inventory_from_file()
         self.load_equipped_from_file()
         self.poisoned = False
         self.poison_duration = 0
-        self.action_performed = False
-        self.current_location = 'Town'
-        self.visited_locations = ['start']
+        self.current_location = self.world.start
+        self._visited = LocationSet(self.world.ids, [self.current_location])
         self.game_over = False
+        # What the decision being asked is about, for policies that look
+        # ahead: the enemy in a battle or encounter, the trap when spotted.
+        self.opponent = None
+        self.trap = None
         self.health = 100
-        self.damage_modifier = 1  # Base damage modifier
         self.max_health = 100
         self.max_mana = 120 if self.player_class == "Mage" else 0
         self.mana = self.max_mana
-        self.armor_rating = 0  
-        self.damage_rating = 10 
         
         if self.player_class == "Warrior":
             self.max_health = 120
             self.health = 120
-            self.damage_rating = 15
-            self.armor_rating = 10
+            self.stats.set_base('damage_rating', 15)
+            self.stats.set_base('armor_rating', 10)
         elif self.player_class == "Mage":
             self.max_mana = 120
             self.mana = 120
-            self.damage_rating = 12
-            self.armor_rating = 5
+            self.stats.set_base('damage_rating', 12)
+            self.stats.set_base('armor_rating', 5)
             self.max_health = 80
             self.health = 80
         elif self.player_class == "Rogue":
             self.max_health = 100
             self.health = 100
-            self.damage_rating = 13
-            self.armor_rating = 3
-        self.assign_starting_items()
+            self.stats.set_base('damage_rating', 13)
+            self.stats.set_base('armor_rating', 3)
+        # A returning player already has their kit in the saved inventory.
+        if not returning_player:
+            self.assign_starting_items()
         
         pass
 
     def start_game(self):
-        self.current_location = 'start'
-        self.visited_locations = ['start']
+        self.current_location = self.world.start
+        self.visited_locations = [self.current_location]
         self.describe_location()
 
+    @property
+    def visited_locations(self):
+        return list(self._visited)
+
+    @visited_locations.setter
+    def visited_locations(self, names):
+        self._visited = LocationSet(self.world.ids, names)
+
+    # Combat and the stats display read these cached totals; base values
+    # and gear live in self.stats.
+    @property
+    def damage_modifier(self):
+        return self.stats['damage_modifier']
+
+    @property
+    def armor_rating(self):
+        return self.stats['armor_rating']
+
+    @property
+    def damage_rating(self):
+        return self.stats['damage_rating']
+
+    def gear(self, item_name):
+        # The catalog entry of an item whose ratings count while equipped, or
+        # None. Consumables kept in a slot are carried, not worn.
+        items = self.content.items
+        if item_name is None or item_name not in items or items.is_consumable(item_name):
+            return None
+        return items[item_name]
+
+    def refresh_gear(self):
+        self.stats.set_gear(filter(None, (self.gear(name) for _, name in self.equipped_items.equipped())))
+
+    @property
+    def world(self):
+        # A generated world (regions.py) if one was given, else the map from
+        # locations.json, looked up each time so a content reload shows.
+        return self._world if self._world is not None else self.content.world
+
+    def has_visited(self, location):
+        return location in self._visited
+
+    def event(self, kind, template, **fields):
+        # Something that happened, for output that wants it as data (see
+        # render.py); plain output callables like print get the text.
+        emit = getattr(self.say, 'event', None)
+        if emit is not None:
+            emit(kind, template, fields)
+        else:
+            self.say(template.format(**fields))
+
+    def state_path(self, filename):
+        if self.state_dir:
+            return os.path.join(self.state_dir, filename)
+        return filename
+
     def load_inventory_from_file(self):
-        try:
-            with open(self.inventory_file, 'r') as f:
-                self.inventory = json.load(f)
-        except FileNotFoundError:
-            pass
+        inventory = self.store.load(self.inventory_file)
+        if inventory is not None:
+            self.inventory = Inventory(self.content.items, inventory, content=self.content)
+        return inventory is not None
 
     def load_equipped_from_file(self):
-        try:
-            with open(self.equipped_file, 'r') as f:
-                self.equipped_items = json.load(f)
-        except FileNotFoundError:
-            pass 
+        equipped_items = self.store.load(self.equipped_file)
+        if equipped_items is not None:
+            self.equipped_items = Equipment(self.content.items.slots, equipped_items, content=self.content)
+            self.refresh_gear()
 
+    # Saves only mark the file dirty; the store writes it at the end of the turn.
     def save_inventory_to_file(self):
-        with open(self.inventory_file, 'w') as f:
-            json.dump(self.inventory, f)
+        self.store.mark_dirty(self.inventory_file, lambda: self.inventory.to_dict())
 
     def save_equipped_to_file(self):
-        with open(self.equipped_file, 'w') as f:
-            json.dump(self.equipped_items, f)
+        self.store.mark_dirty(self.equipped_file, self.equipped_items.to_dict)
+
+    def finish_writes(self):
+        # Blocks until this player's files, journal and saves are on disk.
+        self.store.flush()
+        paths = [self.inventory_file, self.equipped_file]
+        if self.snapshots is not None and self.snapshots.path:
+            paths.append(self.snapshots.path)
+        self.store.wait(paths)
+        if self.saves is not None:
+            self.saves.flush(self.save_owner())
+
+    def end_turn(self):
+        self.clock.advance()
+        if self.snapshots is not None:
+            self.snapshots.checkpoint(self)
+        self.store.end_turn()
+
+    def rewind(self, turns=1):
+        if self.snapshots is None:
+            self.say("Nothing to rewind.")
+            return
+        turn = max(self.snapshots.oldest_turn, self.snapshots.turn - turns)
+        self.snapshots.rewind(self, turn)
+        self.save_inventory_to_file()
+        self.save_equipped_to_file()
+        self.say(f"Rewound to turn {turn}.")
+        self.describe_location()
 
     def load_items(self):
-        with open('items.json', 'r') as f:
-            return json.load(f)
+        return self.content.items
     
     def load_enemies(self):
-        with open('enemies.json', 'r') as f:
-            return json.load(f)
+        return self.content.enemies
 
     def load_locations(self):
-        with open(LOCATIONS_JSON, 'r') as file:
-            locations = json.load(file)
-        return locations
+        return self.content.locations
         
     def assign_starting_items(self):
         items = self.load_items() 
-        starting_items = {
-            'Warrior': ['Sword', 'Shield', 'Chestplate', 'Boots', 'Leggings', 'Health Potion'],
-            'Mage': ['Staff', 'Robe','Magic Amulet', 'Leggings', 'Boots', 'Gloves' 'Health Potion', 'Mana Potion'],
-            'Rogue': ['Dagger', 'Dagger', 'Cloak', 'Boots', 'Gloves', 'Bracers', 'Health Potion']
-        }
-        items_to_add = starting_items.get(self.player_class, [])
+        items_to_add = STARTING_ITEMS.get(self.player_class, [])
         for item_name in items_to_add:
             if item_name in items:
                 self.add_to_inventory(item_name)
             else:
-                print(f"Item {item_name} not found in items.json.")
+                self.say(f"Item {item_name} not found in items.json.")
 
     def add_to_inventory(self, item_name):
+        # Returns whether the item was added.
         items = self.load_items()
-        if item_name in items:
-            self.inventory.append(item_name)
-            print(f"Added {item_name} to inventory.")
+        if item_name not in items:
+            self.say(f"Item {item_name} not found in items.json.")
+        elif self.inventory.add(item_name):
+            self.event('item_added', "Added {item} to inventory.", item=item_name)
             self.save_inventory_to_file()
+            return True
         else:
-            print(f"Item {item_name} not found in items.json.")
+            self.say(f"You can't carry another {item_name}.")
+        return False
 
     def equip_item(self, item_name):
         items = self.load_items()
         if item_name in items:
-            item_type = items[item_name]['type']
+            item_type = items.type_of(item_name)
+            self.change_gear(self.equipped_items[item_type], item_name)
             self.equipped_items[item_type] = item_name
-            print(f"You equipped {item_name}.")
+            self.event('item_equipped', "You equipped {item}.", item=item_name, slot=item_type)
             self.save_equipped_to_file()
         else:
-            print("Item not found in items.json.")
+            self.say("Item not found in items.json.")
+
 
+    def change_gear(self, removed, added):
+        removed, added = self.gear(removed), self.gear(added)
+        if removed is not None:
+            self.stats.unequip(removed)
+        if added is not None:
+            self.stats.equip(added)
 
     def unequip_item(self, item_type):
         if item_type in self.equipped_items:
             if self.equipped_items[item_type]:
-                self.inventory.append(self.equipped_items[item_type])
-                print(f"You unequipped {self.equipped_items[item_type]}.")
+                if not self.inventory.add(self.equipped_items[item_type]):
+                    self.say(f"You can't carry another {self.equipped_items[item_type]}.")
+                    return
+                self.event('item_unequipped', "You unequipped {item}.", item=self.equipped_items[item_type], slot=item_type)
+                self.change_gear(self.equipped_items[item_type], None)
                 self.equipped_items[item_type] = None
                 self.save_inventory_to_file()
                 self.save_equipped_to_file()
             else:
-                print(f"No {item_type} equipped.")
+                self.say(f"No {item_type} equipped.")
         else:
-            print("Invalid equipment type.")
+            self.say("Invalid equipment type.")
 
     def move(self, direction):
-        destinations = self.load_locations_from_json()
+        world = self.world
         if direction == "random":
-            random_moves = destinations[self.current_location]['random_moves']
-            self.current_location = random.choice(random_moves)
-        elif direction in destinations[self.current_location]:
-            new_location = destinations[self.current_location][direction]
-            self.current_location = new_location
-            if new_location not in self.visited_locations:
-                self.visited_locations.append(new_location)
-            self.describe_location()
-            self.encounter_enemy()
-            self.detect_trap()
+            # Rooms without their own random_moves list wander through their open exits.
+            random_moves = world.wander_targets(self.current_location)
+            new_location = self.rng.choice(random_moves) if random_moves else None
+        elif direction in EXITS:
+            new_location = world.destination(self.current_location, direction)
         else:
-            print("You can't go that way.")
+            new_location = None
+
+        if new_location is None:
+            self.say("You can't go that way.")
+            return
+        self.current_location = new_location
+        self._visited.add(new_location)
+        self.describe_location()
+        self.encounter_enemy()
+        self.detect_trap()
+
+    def travel(self, destination):
+        world = self.world
+        target = world.find(destination)
+        if target is None:
+            self.say(f"There is no place called {destination}.")
+            return
+        route = world.route(self.current_location, target)
+        if route is None:
+            self.say(f"You don't know a way to {target} from here.")
+            return
+        if not route:
+            self.say(f"You are already in {target}.")
+            return
+        self.say(f"You set off for {target}: {', '.join(route)}.")
+        for direction in route:
+            self.move(direction)
+            # Stop if something on the road ended the game or sent us elsewhere.
+            if self.game_over or self.current_location == target:
+                break
 
     def load_locations_from_json(self):
-        with open(LOCATIONS_JSON, 'r') as file:
-            locations = json.load(file)
-        return locations
+        return self.load_locations()
 
     def describe_location(self):
-        with open(LOCATIONS_JSON, 'r') as file:
-            locations_data = json.load(file)
-        
-        descriptions = locations_data[self.current_location]['description']
-        print(descriptions)
+        archetype = self.world.archetype(self.current_location)
+        # Generated rooms are named after the location they are built from plus
+        # their coordinates; the name is what travel and saves refer to.
+        template = "{description}" if archetype == self.current_location else "{location}: {description}"
+        self.event('location', template, location=self.current_location,
+                   description=self.content.describe('locations', archetype))
 
     def show_inventory(self):
         if self.inventory:
-            print("You are carrying:")
-            for item in self.inventory:
-                print(f"- {item}")
+            self.say("You are carrying:")
+            for item, count in self.inventory.stacks():
+                self.say(f"- {item} x{count}" if count > 1 else f"- {item}")
         else:
-            print("Your inventory is empty.")
+            self.say("Your inventory is empty.")
     
     def use_consumable(self, item):
         items = self.load_items()
-        if item in items:
-            item_type = items[item]['type']
-            if item_type == 'consumable':
-                print(f"You used {item}.")
+        if item in self.inventory:
+            item_type = items.type_of(item)
+            if items.is_consumable(item):
+                self.event('item_used', "You used {item}.", item=item)
                 self.inventory.remove(item)
                 self.save_inventory_to_file()
-                if item_type == 'Health Potion':
-                    self.health += random.randint(20, 30)
+                if item_type == 'health_potion':
+                    self.health += self.rng.randint(20, 30)
                     if self.health > self.max_health:
                         self.health = self.max_health
-                    print(f"Your health is now {self.health}.")
-                elif item_type == 'Mana Potion':
-                    self.mana += random.randint(20, 30)
+                    self.say(f"Your health is now {self.health}.")
+                elif item_type == 'mana_potion':
+                    self.mana += self.rng.randint(20, 30)
                     if self.mana > self.max_mana:
                         self.mana = self.max_mana
-                    print(f"Your mana is now {self.mana}.")
+                    self.say(f"Your mana is now {self.mana}.")
+                elif item_type in STAT_BUFFS:
+                    field, add, multiply, turns = STAT_BUFFS[item_type]
+                    self.apply_effect(StatModifier(item, turns, field, add, multiply))
             else:
-                print(f"{item} is not a consumable.")
+                self.say(f"{item} is not a consumable.")
         else:
-            print(f"You don't have {item} in your inventory.")
+            self.say(f"You don't have {item} in your inventory.")
     
     def use_tome(self):
-        print("You used a Tome. It reveals hidden knowledge.")
+        self.say("You used a Tome. It reveals hidden knowledge.")
 
     def use_scroll(self):
-        print("You used a Scroll. It casts a spell or reveals a message.")
+        self.say("You used a Scroll. It casts a spell or reveals a message.")
 
     def use_orb(self):
-        print("You used an Orb. It enhances your magical abilities.")
+        self.say("You used an Orb. It enhances your magical abilities.")
 
     def use_amulet(self):
-        print("You used an Amulet. It provides mystical protection.")
+        self.say("You used an Amulet. It provides mystical protection.")
 
     def describe_enemies(self):
-        enemies = self.load_enemies()
-        print("Enemies in this area:")
-        for enemy, stats in enemies.items():
-            print(f"{enemy}: {stats['description']}")
+        table = self.content.spawns.table(self.world.archetype(self.current_location))
+        self.say("Enemies in this area:")
+        for enemy in table.outcomes:
+            self.say(f"{enemy.name}: {self.content.describe('enemies', enemy.name)}")
 
     def encounter_enemy(self):
-        encounter_chance = random.random()
+        encounter_chance = self.rng.random()
         if encounter_chance < 0.4: 
-            enemies = self.load_enemies()
-            num_enemies = random.randint(1, 4)  
-            encountered_enemies = random.sample(list(enemies.items()), num_enemies)
-            print(f"Encountered {num_enemies} enemies!")
-            for enemy_name, stats in encountered_enemies:
-                print(f"An enemy approaches: {enemy_name}")
-                self.battle_enemy(enemy_name, stats)
-
-    def save_game(self):
-        save_name = input("Enter a name for your save: ").strip()
-        save_file = f'{save_name}_save.json'
-        save_data = {
+            # Drawn from this location's spawn table; each enemy is a fresh
+            # instance, so battles never touch the shared templates.
+            spawns = self.content.spawns
+            archetype = self.world.archetype(self.current_location)
+            num_enemies = self.rng.randint(1, 4)  
+            self.event('encounter', "Encountered {count} enemies!", count=num_enemies)
+            for _ in range(num_enemies):
+                enemy = spawns.spawn(archetype, self.rng)
+                self.event('enemy_appears', "An enemy approaches: {enemy}", enemy=enemy.name)
+                self.battle_enemy(enemy)
+
+    def save_game(self, save_name=None):
+        if save_name is None:
+            save_name = self.policy.decide(self, 'save_name', None, "Enter a name for your save: ")
+        save_name = save_name.strip()
+        if not save_name:
+            self.say("A save needs a name.")
+            return
+        self.save_db().save(save_name, self.save_data(), owner=self.save_owner())
+        self.say(f"Game saved as '{save_name}'.")
+
+    def save_db(self):
+        # Opened on first use so players that never save never touch the disk.
+        if self.saves is None:
+            self.saves = get_save_db()
+        return self.saves
+
+    def save_owner(self):
+        # Sessions on a shared server each see only their own saves.
+        return self.state_dir or ''
+
+    def save_data(self):
+        return {
                 'player_class': self.player_class,
-                'inventory': self.inventory,
-                'equipped_items': self.equipped_items,
+                'world': self.world.identity,
+                'inventory': self.inventory.to_dict(),
+                'equipped_items': self.equipped_items.to_dict(),
                 'health': self.health,
                 'max_health': self.max_health,
                 'mana': self.mana,
                 'max_mana': self.max_mana,
-                'damage_rating': self.damage_rating,
-                'armor_rating': self.armor_rating,
+                'damage_rating': self.stats.base('damage_rating'),
+                'armor_rating': self.stats.base('armor_rating'),
                 'current_location': self.current_location,
                 'visited_locations': self.visited_locations
         }
-        with open(save_file, 'w') as f:
-            json.dump(save_data, f)
-        print(f"Game saved as '{save_name}_save.json'.")
-
-    def load_game(self):
-        saved_games = self.get_saved_games()
-        if not saved_games:
-            print("No saved games found.")
+
+    def restore(self, save_data):
+        if save_data['player_class'] != self.player_class:
+            self.player_class = save_data['player_class']
+            self.inventory_file = self.state_path(f'{self.player_class}_inventory.json')
+            self.equipped_file = self.state_path(f'{self.player_class}_equipped.json')
+        self.inventory = Inventory(self.content.items, save_data['inventory'], content=self.content)
+        self.equipped_items = Equipment(self.content.items.slots, save_data['equipped_items'], content=self.content)
+        self.refresh_gear()
+        self.health = save_data['health']
+        self.max_health = save_data['max_health']
+        self.mana = save_data['mana']
+        self.max_mana = save_data['max_mana']
+        self.stats.set_base('damage_rating', save_data['damage_rating'])
+        self.stats.set_base('armor_rating', save_data['armor_rating'])
+        self.current_location = save_data['current_location']
+        self.visited_locations = save_data['visited_locations']
+
+    def load_game(self, save_name=None):
+        owner = self.save_owner()
+        saves = self.save_db()
+        if save_name:
+            self.load_save(save_name.strip())
             return
-        
-        print("Saved games:")
-        for idx, save in enumerate(saved_games, start=1):
-            print(f"{idx}. {save}")
+        total = saves.count(owner)
+        if not total:
+            self.say("No saved games found.")
+            return
+
+        pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+        page = 0
+        while True:
+            saved_games = saves.catalog(owner, page)
+            if pages > 1:
+                self.say(f"Saved games (page {page + 1} of {pages}):")
+            else:
+                self.say("Saved games:")
+            for idx, save in enumerate(saved_games, start=1):
+                self.say(f"{idx}. {save['name']} ({save['player_class']}, {save['current_location']})")
+
+            options = tuple(str(idx) for idx in range(1, len(saved_games) + 1))
+            prompt = "Enter the number of the save you want to load: "
+            if pages > 1:
+                options += ('next', 'prev')
+                prompt = "Enter the number of the save you want to load, or next/prev for more: "
+            choice = self.policy.decide(self, 'load_choice', options, prompt).strip().lower()
+            if choice == 'next' and page + 1 < pages:
+                page += 1
+            elif choice == 'prev' and page > 0:
+                page -= 1
+            else:
+                break
 
-        choice = input("Enter the number of the save you want to load: ").strip()
         if not choice.isdigit() or int(choice) < 1 or int(choice) > len(saved_games):
-            print("Invalid choice.")
+            self.say("Invalid choice.")
             return
-        
-        save_name = saved_games[int(choice) - 1]
-        save_file = f'{save_name}_save.json'
-
-        try:
-            with open(save_file, 'r') as f:
-                save_data = json.load(f)
-                self.current_location = save_data['current_location']
-                self.health = save_data['health']
-                self.mana = save_data['mana']
-                self.inventory = save_data['inventory']
-                self.equipped_items = save_data['equipped_items']
-            print(f"Game '{save_name}_save.json' loaded.")
-            self.describe_location()
-            self.show_health_and_stats()
-        except FileNotFoundError:
-            print("Error loading saved game.")
-
-    def get_saved_games(self):
-        saved_games = [filename.split('_save.json')[0] for filename in os.listdir('.') if filename.endswith('_save.json')]
-        return saved_games
+
+        self.load_save(saved_games[int(choice) - 1]['name'])
+
+    def load_save(self, save_name):
+        save_data = self.save_db().load(save_name, self.save_owner())
+        if save_data is None:
+            self.say(f"No saved game named '{save_name}'.")
+            return
+        if save_data.get('world', MAP_IDENTITY) != self.world.identity:
+            self.say(f"'{save_name}' was saved in a different world.")
+            return
+        self.restore(save_data)
+        self.save_inventory_to_file()
+        self.save_equipped_to_file()
+        self.say(f"Game '{save_name}' loaded.")
+        self.describe_location()
+        self.show_health_and_stats()
+
+    def get_saved_games(self, page=0):
+        return [save['name'] for save in self.save_db().catalog(self.save_owner(), page)]
 
     def show_health_and_stats(self):
-        print(f"Health: {self.health}/{self.max_health}")
-        print(f"Damage Modifier: {self.damage_modifier}")
-        print(f"Armor: {self.armor}")
+        self.say(f"Health: {self.health}/{self.max_health}")
+        self.say(f"Damage Modifier: {self.damage_modifier:g}")
+        self.say(f"Damage: {self.damage_rating:g}")
+        self.say(f"Armor: {self.armor_rating:g}")
         if self.player_class == "Mage":
-            print(f"Mana: {self.mana}/{self.max_mana}")
+            self.say(f"Mana: {self.mana}/{self.max_mana}")
 
-    def fight(self, enemy_name, enemy_stats):
-        print(f"A {enemy_name} blocks your path.")
+    def fight(self, enemy):
+        self.opponent = enemy
+        self.say(f"A {enemy.name} blocks your path.")
         while True:
-            action = input("Do you want to [fight], [evade], or [negotiate]? ").lower()
+            action = self.policy.decide(self, 'encounter', ENCOUNTER_ACTIONS, "Do you want to [fight], [evade], or [negotiate]? ").lower()
             if action == "fight":
-                if self.battle_enemy(enemy_name, enemy_stats):
-                    print(f"You defeated the {enemy_name}. Continue your journey.")
+                if self.battle_enemy(enemy):
+                    self.say(f"You defeated the {enemy.name}. Continue your journey.")
                     self.reward_quest()
                     break
                 else:
-                    print(f"You were defeated by the {enemy_name}. Game over.")
+                    self.say(f"You were defeated by the {enemy.name}. Game over.")
                     self.game_over = True
                     break
             elif action == "evade":
-                if random.random() < 0.5:  
-                    print(f"You successfully evaded the {enemy_name}.")
+                if self.rng.random() < 0.5:  
+                    self.say(f"You successfully evaded the {enemy.name}.")
                     break
                 else:
-                    print(f"You failed to evade the {enemy_name} and must face it.")
-                    if self.battle_enemy(enemy_name, enemy_stats):
-                        print(f"You defeated the {enemy_name}. Continue your journey.")
+                    self.say(f"You failed to evade the {enemy.name} and must face it.")
+                    if self.battle_enemy(enemy):
+                        self.say(f"You defeated the {enemy.name}. Continue your journey.")
                         self.reward_quest()
                     else:
-                        print(f"You were defeated by the {enemy_name}. Game over.")
+                        self.say(f"You were defeated by the {enemy.name}. Game over.")
                         self.game_over = True
                     break
             elif action == "negotiate":
-                print(f"You attempt to negotiate with the {enemy_name}.")
-                if random.random() < 0.5:  
-                    print(f"You successfully negotiate with the {enemy_name} and continue your journey.")
+                self.say(f"You attempt to negotiate with the {enemy.name}.")
+                if self.rng.random() < 0.5:  
+                    self.say(f"You successfully negotiate with the {enemy.name} and continue your journey.")
                     self.reward_quest()
                     break
                 else:
-                    print(f"The {enemy_name} is not interested in negotiation and attacks!")
-                    if self.battle_enemy(enemy_name, enemy_stats):
-                        print(f"You defeated the {enemy_name}. Continue your journey.")
+                    self.say(f"The {enemy.name} is not interested in negotiation and attacks!")
+                    if self.battle_enemy(enemy):
+                        self.say(f"You defeated the {enemy.name}. Continue your journey.")
                     else:
-                        print(f"You were defeated by the {enemy_name}. Game over.")
+                        self.say(f"You were defeated by the {enemy.name}. Game over.")
                         self.game_over = True
                     break
             else:
-                print("Invalid action. Please choose [fight], [evade], or [negotiate].")
+                self.say("Invalid action. Please choose [fight], [evade], or [negotiate].")
 
-    def battle_enemy(self, enemy_name, enemy_stats):
-        print(f"Battle begins! You are fighting {enemy_name}.")
-        while self.health > 0 and enemy_stats['health'] > 0:
-            print(f"Your Health: {self.health}, Enemy Health: {enemy_stats['health']}")
-            action = input("What will you do? (attack, block, heal) ").lower()
+    def battle_enemy(self, enemy):
+        self.opponent = enemy
+        self.event('battle_started', "Battle begins! You are fighting {enemy}.", enemy=enemy.name)
+        while self.health > 0 and enemy.health > 0:
+            self.event('battle_status', "Your Health: {health}, Enemy Health: {enemy_health}",
+                       health=self.health, enemy_health=enemy.health, enemy=enemy.name)
+            action = self.policy.decide(self, 'battle', BATTLE_ACTIONS, "What will you do? (attack, block, heal) ").lower()
 
             if action == "attack":
-                self.attack(enemy_name, enemy_stats)
-                if enemy_stats['health'] > 0:
-                    self.defend(enemy_name, enemy_stats)
+                self.attack(enemy)
+                if enemy.health > 0:
+                    self.defend(enemy)
             elif action == "block":
-                self.block(enemy_name, enemy_stats)
-                self.defend(enemy_name, enemy_stats)
+                self.block(enemy)
+                self.defend(enemy)
             elif action == "heal":
                 self.heal()
-                self.defend(enemy_name, enemy_stats)
+                self.defend(enemy)
             else:
-                print("Invalid action. Choose 'attack', 'block', or 'heal'.")
+                self.say("Invalid action. Choose 'attack', 'block', or 'heal'.")
 
             if self.health <= 0:
-                print("Game Over. You have been defeated.")
+                self.event('player_defeated', "Game Over. You have been defeated.", enemy=enemy.name)
                 self.game_over = True
                 return False
-            elif enemy_stats['health'] <= 0:
-                print(f"You defeated the {enemy_name}!")
+            elif enemy.health <= 0:
+                self.event('enemy_defeated', "You defeated the {enemy}!", enemy=enemy.name)
                 self.reward_quest()
                 return True
 
-        print(f"You and {enemy_name} are too tired to fight.")
+        self.say(f"You and {enemy.name} are too tired to fight.")
         return True
     
-    def attack(self, enemy_name, enemy_stats):
-        print(f"You attack the {enemy_name}!")
-        attack_damage = random.randint(5, 15) * self.damage_modifier + self.damage_rating
-        enemy_damage = random.randint(5, 15) * (1 - self.armor_rating / 100) - self.armor_rating
-        enemy_stats['health'] -= max(0, attack_damage)
+    def attack(self, enemy):
+        self.event('attack', "You attack the {enemy}!", enemy=enemy.name)
+        attack_damage = self.rng.randint(5, 15) * self.damage_modifier + self.damage_rating
+        enemy_damage = self.rng.randint(5, 15) * (1 - self.armor_rating / 100) - self.armor_rating
+        enemy.health -= max(0, attack_damage)
         self.health -= max(0, enemy_damage)
-        print(f"You dealt {max(0, attack_damage)} damage to {enemy_name}.")
-        print(f"{enemy_name} dealt {max(0, enemy_damage)} damage to you.")
+        self.event('damage_dealt', "You dealt {damage} damage to {enemy}.", damage=max(0, attack_damage), enemy=enemy.name)
+        self.event('damage_taken', "{enemy} dealt {damage} damage to you.", damage=max(0, enemy_damage), enemy=enemy.name)
 
-    def block(self, enemy_name, enemy_stats):
-        print(f"You block the {enemy_name}'s attack!")
-        block_amount = random.randint(0, 5)
+    def block(self, enemy):
+        self.event('block', "You block the {enemy}'s attack!", enemy=enemy.name)
+        block_amount = self.rng.randint(0, 5)
         self.health -= block_amount
-        print(f"You blocked {block_amount} damage.")
+        self.event('blocked', "You blocked {amount} damage.", amount=block_amount)
 
     def heal(self):
         if 'Health Potion' in self.inventory:
-            potion_health = random.randint(10, 20)
+            potion_health = self.rng.randint(10, 20)
             self.health = min(self.max_health, self.health + potion_health)
-            print(f"You used a Health Potion and healed {potion_health} health points.")
+            self.event('healed', "You used a Health Potion and healed {amount} health points.", amount=potion_health)
             self.inventory.remove('Health Potion')
+            self.save_inventory_to_file()
         else:
-            print("You don't have any Health Potions to use.")
+            self.say("You don't have any Health Potions to use.")
 
-    def defend(self, enemy_name, enemy_stats):
-        print(f"{enemy_name} attacks you!")
-        enemy_damage = random.randint(5, 15) * enemy_stats['damage']
+    def defend(self, enemy):
+        self.event('enemy_attack', "{enemy} attacks you!", enemy=enemy.name)
+        enemy_damage = self.rng.randint(5, 15) * enemy.attack
         self.health -= max(0, enemy_damage)
-        print(f"You received {max(0, enemy_damage)} damage.")
+        self.event('damage_taken', "You received {damage} damage.", damage=max(0, enemy_damage), enemy=enemy.name)
 
-    def reward_quest(self):
+    def reward_quest(self, item_type=None):
         reward_types = ['gold', 'item', 'experience']
-        reward = random.choice(reward_types)
+        reward = self.rng.choice(reward_types)
         if reward == 'gold':
-            print("You found some gold!")
+            self.event('reward', "You found some gold!", reward='gold')
         elif reward == 'item':
-            item_reward = random.choice(list(self.load_items().keys()))
-            self.add_to_inventory(item_reward)
-            print(f"You found a {item_reward}!")
+            items = self.load_items()
+            item_reward = None
+            if item_type is not None:
+                item_reward = items.random_item_of_type(item_type, self.rng)
+            if item_reward is None:
+                item_reward = items.random_item(self.rng)
+            if self.add_to_inventory(item_reward):
+                self.event('reward', "You found a {item}!", reward='item', item=item_reward)
         elif reward == 'experience':
-            print("You gained experience!")
-        self.damage_modifier += 0.2
+            self.event('reward', "You gained experience!", reward='experience')
+        self.stats.add_base('damage_modifier', 0.2)
 
     def use_healing_item(self):
-        if self.equipped_items['healing_item']:
-            self.health += random.randint(20, 30)
-            print(f"You used {self.equipped_items['healing_item']} to heal.")
+        if self.equipped_items['health_potion']:
+            self.health += self.rng.randint(20, 30)
+            self.say(f"You used {self.equipped_items['health_potion']} to heal.")
             if self.health > self.max_health:
                 self.health = self.max_health
-            print(f"Your health is now {self.health}.")
+            self.say(f"Your health is now {self.health}.")
         else:
-            print("No healing item equipped.")
+            self.say("No healing item equipped.")
 
     
     def detect_trap(self):
         trap_types = ['spike', 'pitfall', 'net', 'poison dart']
-        if random.random() < 0.3:
-            trap = random.choice(trap_types)  
+        if self.rng.random() >= 0.3:
+            return
+        trap = self.rng.choice(trap_types)
+        self.trap = trap
         if self.player_class == 'Rogue':
-            print(f"You detected a {trap} trap!")
-        elif 'trap_detection_item' in self.inventory:
-            if random.random() < 0.5:  
-                print(f"You noticed the {trap} trap before it triggered. Your Trap Detection Kit Broke")
-                self.inventory.remove('trap_detection_item')
+            self.say(f"You detected a {trap} trap!")
+        elif self.inventory.has_type('trap_detection_item'):
+            if self.rng.random() < 0.5:  
+                kit = self.inventory.first_of_type('trap_detection_item')
+                self.say(f"You noticed the {trap} trap before it triggered. Your {kit} broke.")
+                self.inventory.remove(kit)
+                self.save_inventory_to_file()
             else:
-                print(f"You encountered a {trap} trap and triggered it!")
+                self.say(f"You encountered a {trap} trap and triggered it!")
                 self.trigger_trap(trap)
                 return
         else:
-            print(f"You encountered a {trap} trap and triggered it!")
+            self.say(f"You encountered a {trap} trap and triggered it!")
             self.trigger_trap(trap)
             return
     
-        action = input("Do you want to [disarm] or [avoid] the trap? ").lower()
+        action = self.policy.decide(self, 'trap', TRAP_ACTIONS, "Do you want to [disarm] or [avoid] the trap? ").lower()
         
         if action == "disarm":
-            if 'trap_disarmament_item' in self.inventory:
-                disarm_tool_success = random.random() < 0.9 if self.player_class == 'rogue' else random.random() < 0.5
+            tool = self.inventory.first_of_type('trap_disarmament_item')
+            if tool is not None:
+                disarm_tool_success = self.rng.random() < 0.9 if self.player_class == 'Rogue' else self.rng.random() < 0.5
                 if disarm_tool_success:
-                    print(f"You successfully disarmed the {trap} trap with your {self.inventory['trap_disarmament_item']}.")
-                    keep_tool_chance = 0.7 if self.player_class == 'rogue' else 0
-                    if random.random() < keep_tool_chance:
-                        print(f"You managed to keep your {self.inventory['trap_disarmament_item']} after disarming the trap.")
+                    self.say(f"You successfully disarmed the {trap} trap with your {tool}.")
+                    keep_tool_chance = 0.7 if self.player_class == 'Rogue' else 0
+                    if self.rng.random() < keep_tool_chance:
+                        self.say(f"You managed to keep your {tool} after disarming the trap.")
                     else:
-                        print(f"Your {self.inventory['trap_disarmament_item']} broke during the disarmament process.")
-                        self.inventory.remove('trap_disarmament_item')
+                        self.say(f"Your {tool} broke during the disarmament process.")
+                        self.inventory.remove(tool)
+                        self.save_inventory_to_file()
                 else:
-                    print(f"You failed to disarm the {trap} trap with your {self.inventory['trap_disarmament_item']}.")
-                    self.inventory.remove('trap_disarmament_item')
-                    if self.player_class == 'rogue':
-                        print(f"The trap activates and you take half damage!")
-                        self.take_damage(trap, damage_multiplier=0.5)
-                        if trap == 'net':
-                            self.encounter_enemy()
+                    self.say(f"You failed to disarm the {trap} trap with your {tool}.")
+                    self.inventory.remove(tool)
+                    self.save_inventory_to_file()
+                    if self.player_class == 'Rogue':
+                        self.say(f"The trap activates and you take half damage!")
+                        self.trigger_trap(trap, damage_multiplier=0.5)
                     else:
-                        print(f"The trap activates!")
+                        self.say(f"The trap activates!")
                         self.trigger_trap(trap)
             else:
-                disarm_success = random.random() < 0.5 if self.player_class != 'rogue' else random.random() < 0.2
+                disarm_success = self.rng.random() < 0.5 if self.player_class != 'Rogue' else self.rng.random() < 0.2
                 if disarm_success:
-                    print(f"You successfully disarmed the {trap} trap.")
+                    self.say(f"You successfully disarmed the {trap} trap.")
                 else:
-                    print(f"You failed to disarm the {trap} trap and it activates!")
+                    self.say(f"You failed to disarm the {trap} trap and it activates!")
                     self.trigger_trap(trap)
         elif action == "avoid":
-            avoid_chance = 0.6 if self.player_class == 'rogue' else 0.4
-            if random.random() < avoid_chance:
-                print(f"You successfully avoided the {trap} trap.")
+            avoid_chance = 0.6 if self.player_class == 'Rogue' else 0.4
+            if self.rng.random() < avoid_chance:
+                self.say(f"You successfully avoided the {trap} trap.")
             else:
-                print(f"You failed to avoid the {trap} trap and it activates!")
+                self.say(f"You failed to avoid the {trap} trap and it activates!")
                 self.trigger_trap(trap)
         else:
-            print(f"You triggered the {trap} trap!")
+            self.event('trap_triggered', "You triggered the {trap} trap!", trap=trap)
             self.trigger_trap(trap)   
         
     
-    def trigger_trap(self, trap):
+    def trigger_trap(self, trap, damage_multiplier=1.0):
         if trap == 'spike':
-            self.take_damage(trap, amount=20)
+            self.take_damage(trap, amount=20, damage_multiplier=damage_multiplier)
         elif trap == 'pitfall':
-            self.take_damage(trap, amount=30)
+            self.take_damage(trap, amount=30, damage_multiplier=damage_multiplier)
         elif trap == 'net':
-            print("You are temporarily caught in the net.")
-            self.take_damage(trap, amount=0)  
+            self.say("You are temporarily caught in the net.")
+            self.take_damage(trap, amount=0, damage_multiplier=damage_multiplier)
             self.encounter_enemy()  
         elif trap == 'poison dart':
-            self.poisoned = True
-            self.poison_duration = random.randint(2, 5)  
-            print("You are poisoned and will lose additional health over time.")
-            if self.player_class == 'rogue':
-                self.poison_duration += random.randint(1, 2)  
-            self.apply_poison_effect()
+            poison_duration = self.rng.randint(2, 5)
+            self.say("You are poisoned and will lose additional health over time.")
+            if self.player_class == 'Rogue':
+                poison_duration += self.rng.randint(1, 2)
+            self.apply_poison_effect(poison_duration)
 
         if self.health <= 0:
-            print("You succumbed to your injuries. Game over.")
+            self.event('player_defeated', "You succumbed to your injuries. Game over.", enemy=None)
             self.game_over = True
 
-    def apply_poison_effect(self):
-        if self.poisoned:
-            while self.poison_duration > 0:
-                if self.action_performed:  
-                    print(f"You are poisoned! {self.poison_duration} turns remaining.")
-                    self.take_damage('poison', amount=10)
-                    self.poison_duration -= 1
-                else:
-                    print("You are poisoned, but you rest this turn.")
-                    break
-                time.sleep(1)
-            if self.poison_duration <= 0:
-                print("You recovered from the poison.")
-                self.poisoned = False
-            self.action_performed = False  
+    def apply_poison_effect(self, duration):
+        self.apply_effect(Poison(duration))
+
+    # Timed effects tick once per game clock tick (one per turn) until they
+    # run out; the effect object is the only thing that changes its state.
+    def apply_effect(self, effect):
+        current = self.effects.get(effect.name)
+        if current is not None:
+            current.refresh(effect)
+            current.on_apply(self)
+            return
+        self.effects[effect.name] = effect
+        effect.on_apply(self)
+        self.clock.schedule(effect.interval, self._tick_effect, effect)
+
+    def remove_effect(self, name):
+        effect = self.effects.pop(name, None)
+        if effect is not None:
+            effect.on_expire(self)
+
+    def _tick_effect(self, effect):
+        if self.effects.get(effect.name) is not effect:
+            return
+        effect.on_tick(self)
+        effect.remaining -= 1
+        if effect.remaining <= 0 or self.game_over:
+            self.remove_effect(effect.name)
+        else:
+            self.clock.schedule(effect.interval, self._tick_effect, effect)
     
     def take_damage(self, trap, amount, damage_multiplier=1.0):
-        if self.player_class == 'rogue' and damage_multiplier < 1.0:
-            print(f"You resisted some of the damage from the {trap} trap!")
+        if self.player_class == 'Rogue' and damage_multiplier < 1.0:
+            self.say(f"You resisted some of the damage from the {trap} trap!")
             damage_multiplier *= 0.5  
         
         damage_taken = int(amount * damage_multiplier)
         self.health -= damage_taken
-        print(f"You took {damage_taken} damage!")
-        
-        if self.poisoned:
-            print(f"You are poisoned and lose {amount} health over time.")
-            self.health -= amount
-            self.poison_duration -= 1
-            if self.poison_duration <= 0:
-                print("You recovered from the poison.")
-                self.poisoned = False
+        self.event('damage_taken', "You took {damage} damage!", damage=damage_taken, enemy=None)
         
         if self.health <= 0:
-            print("You succumbed to your injuries. Game over.")
+            self.event('player_defeated', "You succumbed to your injuries. Game over.", enemy=None)
             self.game_over = True
 
-def main():
-    print("Welcome to the Text Adventure Game!")
-    player_class = input("Choose your class (Warrior, Mage, Rogue): ").capitalize()
-    while player_class not in ['Warrior', 'Mage', 'Rogue']:
-        print("Invalid class. Please choose again.")
-        player_class = input("Choose your class (Warrior, Mage, Rogue): ").capitalize()
+COMMANDS = CommandTable()
+
+
+def find_item(player, name):
+    # Item names are capitalised in items.json, but players type them any way.
+    return player.content.items.find(name) or name
+
+
+@COMMANDS.command('move', "Move north, south, east or west, or wander at random", '[direction]', aliases=('m',))
+def move_command(player, args):
+    direction = args or player.policy.decide(player, 'direction', DIRECTIONS, "Choose a direction (north, south, east, west) or random: ")
+    player.move(direction.strip().lower())
+
+
+@COMMANDS.command('travel', "Walk the shortest known route to a location", '[location]')
+def travel_command(player, args):
+    if args:
+        player.travel(args)
+    else:
+        player.say("Travel where?")
+
+
+@COMMANDS.command('inventory', "Show your inventory", aliases=('i',))
+def inventory_command(player, args):
+    player.show_inventory()
+
+
+@COMMANDS.command('pick up', "Pick up an item", '[item]')
+def pick_up_command(player, args):
+    player.add_to_inventory(find_item(player, args))
+
+
+@COMMANDS.command('equip', "Equip an item", '[item]')
+def equip_command(player, args):
+    player.equip_item(find_item(player, args))
+
+
+@COMMANDS.command('unequip', "Unequip the item of an equipment type", '[item type]')
+def unequip_command(player, args):
+    player.unequip_item(args.lower())
+
+
+@COMMANDS.command('use', "Use a consumable item", '[item]', aliases=('consume',))
+def use_command(player, args):
+    if args:
+        player.use_consumable(find_item(player, args))
+    else:
+        player.say("Use what?")
+
+
+@COMMANDS.command('stats', "Show health and other stats", aliases=('status',))
+def stats_command(player, args):
+    player.show_health_and_stats()
+
 
-    player = Player(player_class)
+@COMMANDS.command('save', "Save the game")
+def save_command(player, args):
+    player.save_inventory_to_file()
+    player.save_equipped_to_file()
+    player.store.flush()
+    player.say("Game saved.")
+
+
+@COMMANDS.command('load', "Load the game")
+def load_command(player, args):
+    player.load_inventory_from_file()
+    player.load_equipped_from_file()
+    player.say("Game loaded.")
+
+
+@COMMANDS.command('savegame', "Save the game under a name you can load later", '[name]')
+def savegame_command(player, args):
+    player.save_game(args or None)
+
+
+@COMMANDS.command('loadgame', "Load a named save, or choose one from a list", '[name]')
+def loadgame_command(player, args):
+    player.load_game(args or None)
+
+
+@COMMANDS.command('rewind', "Undo the last turn, or the given number of turns", '[turns]')
+def rewind_command(player, args):
+    player.rewind(int(args) if args.isdigit() else 1)
+
+
+@COMMANDS.command('fight', "Fight an enemy (only when you encounter one)")
+def fight_command(player, args):
+    player.say("You can only fight if you encounter an enemy.")
+
+
+@COMMANDS.command('quit', "Exit the game")
+def quit_command(player, args):
+    # Record where the player left off, but don't advance the clock:
+    # quitting mustn't tick poison or use up an elixir.
+    player.snapshots.checkpoint(player)
+    player.snapshots.close()
+    # Saves, player files and the journal are written in the background;
+    # they are all on disk before the game says goodbye.
+    player.finish_writes()
+    player.say("Exiting game.")
+    return True
+
+
+@COMMANDS.command('help', "Show this help message")
+def help_command(player, args):
+    player.say(COMMANDS.help_text())
+
+
+def main(policy=None, output=None, store=None, state_dir=None, pace=1.0, rng=None, world=None):
+    policy = policy if policy is not None else ConsolePolicy()
+    say = output if output is not None else Renderer()
+    # Buffered output goes out in one write before each question, which is
+    # once a turn, and when the game ends.
+    flush = getattr(say, 'flush', None)
+    if flush is not None:
+        policy = FlushBeforePrompt(policy, flush)
+    try:
+        return run_game(policy, say, store, state_dir, pace, rng, world)
+    finally:
+        if flush is not None:
+            flush()
+
+
+def run_game(policy, say, store, state_dir, pace, rng, world):
+    say("Welcome to the Text Adventure Game!")
+    player_class = policy.decide(None, 'class', PLAYER_CLASSES, "Choose your class (Warrior, Mage, Rogue): ").capitalize()
+    while player_class not in PLAYER_CLASSES:
+        say("Invalid class. Please choose again.")
+        player_class = policy.decide(None, 'class', PLAYER_CLASSES, "Choose your class (Warrior, Mage, Rogue): ").capitalize()
+
+    # pace is how long to pause after a turn in which a timed effect (like
+    # poison) ticked; the console keeps a one second pause.
+    player = Player(player_class, policy=policy, output=say, store=store, state_dir=state_dir,
+                    clock=GameClock(pace=pace, flush=getattr(say, 'flush', None)), rng=rng, world=world)
+
+    # Every turn is checkpointed to an autosave journal; pick up where a
+    # crashed session left off.
+    autosave_path = player.state_path(AUTOSAVE_FILE)
+    if player.store.io is not None:
+        player.store.io.wait(autosave_path)
+    recovered = SnapshotLog.recover(autosave_path)
+    turn = 0
+    # Only an autosave of this class in this world; the rooms of another
+    # world mean nothing here.
+    if recovered is not None and recovered[0] == player_class and (recovered[1] or MAP_IDENTITY) == player.world.identity:
+        _, _, turn, state = recovered
+        apply_snapshot(player, state)
+        say(f"Resumed from your autosave at turn {turn}.")
+    player.snapshots = SnapshotLog(player, path=autosave_path, turn=turn, io=player.store.io)
 
     while not player.game_over:
         player.show_health_and_stats()
-        print("What would you like to do?")
-        action = input("Options: move, show inventory, use item, save game, quit game\n").lower()
-
-        if action == 'move':
-            direction = input("Choose a direction (north, south, east, west) or random: ").lower()
-            player.move(direction)
-        elif action in ["inventory", "i"]:
-            player.show_inventory()
-        elif action.startswith("pick up"):
-            item = action[7:].strip()
-            player.add_to_inventory(item)
-        elif action.startswith("equip"):
-            item = action[6:].strip()
-            player.equip_item(item)
-        elif action.startswith("unequip"):
-            item_type = action[8:].strip()
-            player.unequip_item(item_type)
-        elif action.startswith("use") or action.startswith("consume"):
-            item = action.split(maxsplit=1)[1].strip()
-            player.use_consumable(item)
-        elif action in ["stats", "status"]:
-            player.show_health_and_stats()
-        elif action == "save":
-            player.save_inventory_to_file()
-            player.save_equipped_to_file()
-            print("Game saved.")
-        elif action == "load":
-            player.load_inventory_from_file()
-            player.load_equipped_from_file()
-            print("Game loaded.")
-        elif action == "fight":
-            print("You can only fight if you encounter an enemy.")
-        elif action == "quit":
-            print("Exiting game.")
+        say("What would you like to do?")
+        line = policy.decide(player, 'command', None, "Enter a command (type 'help' for a list): ")
+        if COMMANDS.dispatch(player, line):
             break
-        elif action == "help":
-            display_help()
+        player.end_turn()
+
+    if player.game_over:
+        # A finished game has nothing to resume.
+        player.snapshots.close(discard=True)
+        player.finish_writes()
+    return player
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play the text adventure.")
+    parser.add_argument('--script', metavar='FILE',
+                        help="read every answer from FILE ('-' for standard input) instead of prompting")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="record latency histograms and file I/O, written to FILE on exit (.prom for Prometheus text)")
+    parser.add_argument('--profile', metavar='FILE', help="write cProfile stats for the session to FILE")
+    parser.add_argument('--world', metavar='FILE', help="play a generated world built with regions.py")
+    parser.add_argument('--generate', metavar='SEED', type=int,
+                        help="play a world generated on the fly from SEED instead of the hand-written map")
+    parser.add_argument('--world-size', type=int, default=1000, metavar='SIDE',
+                        help="rooms along each side of a --generate world (default: 1000)")
+    parser.add_argument('--autoplay', metavar='TURNS', type=int,
+                        help="let the search agent play TURNS turns of wandering and fighting by itself")
+    parser.add_argument('--companion', action='store_true',
+                        help="have the search agent suggest what to do in battles and at traps")
+    parser.add_argument('--think', metavar='SECONDS', type=float, default=0.05,
+                        help="time the agent may spend on each decision (default: 0.05)")
+    parser.add_argument('--workers', type=int, default=1, help="processes the agent searches with (default: 1)")
+    args = parser.parse_args()
+
+    world = None
+    if args.world or args.generate is not None:
+        from regions import open_world
+        world = open_world(args.world, args.generate or 0, args.world_size)
+
+    if args.metrics:
+        import metrics
+        metrics.enable(Player, COMMANDS)
+
+    agent = None
+    if args.autoplay is not None or args.companion:
+        from agent import AutoplayPolicy, CompanionPolicy, SearchAgent
+        agent = SearchAgent(seconds=args.think, workers=args.workers)
+
+    def with_companion(policy):
+        return CompanionPolicy(policy, agent) if args.companion else policy
+
+    def play():
+        if args.autoplay is not None:
+            main(policy=AutoplayPolicy(agent, args.autoplay), pace=0, world=world)
+        elif args.script is None:
+            main(policy=with_companion(ConsolePolicy()), world=world)
+        elif args.script == '-':
+            main(policy=with_companion(BatchPolicy(sys.stdin)), pace=0, world=world)
         else:
-            print("Invalid command. Type 'help' for available commands.")
-        
-        def display_help():
-            print("""
-                Available commands:
-                - move (m): Move in a direction (north, south, east, west)
-                - inventory (i): Show your inventory
-                - pick up [item]: Pick up an item
-                - equip [item]: Equip an item
-                - unequip [item type]: Unequip an item of a specific type
-                - use [item] or consume [item]: Use a consumable item
-                - stats or status: Show health and other stats
-                - save: Save the game
-                - load: Load the game
-                - fight: Fight an enemy (only available if you encounter an enemy)
-                - quit: Exit the game
-                - help: Show this help message
-            """)   
-            
-    if __name__ == "__main__":
-        main()
\ No newline at end of file
+            with open(args.script, 'r') as script:
+                main(policy=with_companion(BatchPolicy(script)), pace=0, world=world)
+
+    try:
+        if args.profile:
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                profiler.runcall(play)
+            finally:
+                profiler.dump_stats(args.profile)
+        else:
+            play()
+    finally:
+        if agent is not None:
+            agent.close()
+        if args.metrics:
+            metrics.METRICS.write(args.metrics)
\ No newline at end of file
@@ -0,0 +1,239 @@
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from gamestate import BATTLE, DONE, ENCOUNTER, TRAP, GameState
+from policies import PLAYER_CLASSES, GreedyPolicy, Policy
+
+# A Monte Carlo tree search agent for the decisions GameState models. The
+# tree is open loop: nodes are sequences of actions, and dice are rolled
+# afresh on every pass, so chance needs no nodes of its own. Each pass
+# plays one path down the tree, finishes the fight with the greedy policy
+# and undoes everything back to the root, so the root state is never copied.
+
+SEARCH_DECISIONS = frozenset((BATTLE, ENCOUNTER, TRAP))
+THINK_SECONDS = 0.05
+# UCB1's exploration weight; values run from 0 (dead) to 1.
+EXPLORATION = 0.7
+# Passes between looks at the clock.
+CHECK_EVERY = 64
+
+
+class Node:
+    __slots__ = ('visits', 'total', 'survived', 'children')
+
+    def __init__(self):
+        self.visits = 0
+        self.total = 0.0
+        self.survived = 0
+        self.children = {}
+
+
+def search(state, rng, seconds=THINK_SECONDS, iterations=None, exploration=EXPLORATION):
+    # Runs passes until `seconds` are up or `iterations` are done, whichever
+    # comes first, and returns the root Node.
+    if seconds is None and iterations is None:
+        raise ValueError("search needs a time budget or an iteration count")
+    root = Node()
+    if state.phase == DONE:
+        return root
+    deadline = None if seconds is None else time.perf_counter() + seconds
+    log = math.log
+    sqrt = math.sqrt
+    passes = 0
+    while iterations is None or passes < iterations:
+        if deadline is not None and passes % CHECK_EVERY == 0 and time.perf_counter() >= deadline:
+            break
+        node = root
+        path = [root]
+        first = None
+        while state.phase != DONE:
+            children = node.children
+            actions = state.actions()
+            action = None
+            for candidate in actions:
+                if candidate not in children:
+                    action = candidate
+                    child = children[action] = Node()
+                    break
+            if action is None:
+                scale = exploration * sqrt(log(node.visits))
+                best = -1.0
+                for candidate in actions:
+                    option = children[candidate]
+                    score = option.total / option.visits + scale / sqrt(option.visits)
+                    if score > best:
+                        best = score
+                        action = candidate
+                        child = option
+            saved = state.apply(action, rng)
+            if first is None:
+                first = saved
+            node = child
+            path.append(node)
+            if node.visits == 0:
+                break
+        value = state.rollout(rng)
+        state.undo(first)
+        survived = value > 0
+        for node in path:
+            node.visits += 1
+            node.total += value
+            node.survived += survived
+        passes += 1
+    return root
+
+
+def root_stats(root):
+    # action -> [visits, total value, passes survived]
+    return {action: [child.visits, child.total, child.survived] for action, child in root.children.items()}
+
+
+def search_worker(state, seed, seconds, iterations):
+    return root_stats(search(state, random.Random(seed), seconds, iterations))
+
+
+class SearchAgent:
+    # Picks the most visited action at the root. With workers > 1 each
+    # decision runs that many independent searches in a process pool and
+    # adds their root statistics together.
+    def __init__(self, seconds=THINK_SECONDS, iterations=None, workers=1, seed=None):
+        self.seconds = seconds
+        self.iterations = iterations
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.passes = 0
+        self._executor = None
+
+    def analyse(self, state):
+        if self.workers <= 1:
+            stats = search_worker(state, self.rng.getrandbits(64), self.seconds, self.iterations)
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            share = None if self.iterations is None else -(-self.iterations // self.workers)
+            futures = [self._executor.submit(search_worker, state, self.rng.getrandbits(64), self.seconds, share)
+                       for _ in range(self.workers)]
+            stats = {}
+            for future in futures:
+                for action, part in future.result().items():
+                    total = stats.setdefault(action, [0, 0.0, 0])
+                    for index, value in enumerate(part):
+                        total[index] += value
+        self.passes += sum(visits for visits, _, _ in stats.values())
+        return stats
+
+    def choose(self, state):
+        stats = self.analyse(state)
+        if not stats:
+            return state.default_action(), stats
+        return max(stats, key=lambda action: stats[action][0]), stats
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class SearchPolicy(Policy):
+    # Battle, encounter and trap decisions come from the agent; everything
+    # else goes to `fallback`.
+    def __init__(self, agent, fallback=None):
+        self.agent = agent
+        self.fallback = fallback if fallback is not None else GreedyPolicy()
+
+    def decide(self, player, decision, options, prompt):
+        if player is not None and decision in SEARCH_DECISIONS:
+            action, _ = self.agent.choose(GameState.from_player(player, decision))
+            return action
+        return self.fallback.decide(player, decision, options, prompt)
+
+
+class AutoplayPolicy(SearchPolicy):
+    # Plays a whole game: a random class, `turns` random moves, then quit.
+    def __init__(self, agent, turns=100, rng=None):
+        super().__init__(agent)
+        self.turns = turns
+        self.rng = rng if rng is not None else random.Random()
+
+    def decide(self, player, decision, options, prompt):
+        if decision == 'class':
+            return self.rng.choice(options)
+        if decision == 'command':
+            self.turns -= 1
+            return 'move random' if self.turns >= 0 else 'quit'
+        return super().decide(player, decision, options, prompt)
+
+
+class CompanionPolicy(Policy):
+    # The player still decides; a companion says what it would do first.
+    def __init__(self, inner, agent):
+        self.inner = inner
+        self.agent = agent
+
+    def decide(self, player, decision, options, prompt):
+        if player is not None and decision in SEARCH_DECISIONS:
+            action, stats = self.agent.choose(GameState.from_player(player, decision))
+            if stats:
+                visits, _, survived = stats[action]
+                player.say(f"Your companion suggests you {action} (you come through {survived / visits:.0%} of the time).")
+                # The advice has to be on screen before the question.
+                flush = getattr(player.say, 'flush', None)
+                if flush is not None:
+                    flush()
+        return self.inner.decide(player, decision, options, prompt)
+
+
+def compare(player_class, enemy, runs, agent, seed):
+    from engine import run_battles
+    greedy = run_battles(player_class, enemy, runs, GreedyPolicy, seed)
+    searched = run_battles(player_class, enemy, runs, lambda: SearchPolicy(agent), seed)
+    return greedy, searched
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search-based agent for battles and traps.")
+    parser.add_argument('mode', choices=['battles', 'speed'],
+                        help="battles: win rates against the greedy policy; speed: search passes per second")
+    parser.add_argument('--class', dest='player_class', choices=PLAYER_CLASSES, default='Warrior')
+    parser.add_argument('--enemy', default='Goblin')
+    parser.add_argument('-n', '--runs', type=int, default=200)
+    parser.add_argument('--think', type=float, default=THINK_SECONDS, help="seconds per decision")
+    parser.add_argument('--iterations', type=int, default=None, help="search passes per decision")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help=f"search processes per decision (this machine has {os.cpu_count()} cores)")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    agent = SearchAgent(args.think, args.iterations, args.workers, args.seed)
+    try:
+        if args.mode == 'speed':
+            from engine import headless_player
+            player = headless_player(args.player_class, seed=args.seed)
+            player.opponent = player.content.spawns.enemy(args.enemy)
+            state = GameState.from_player(player, BATTLE)
+            agent.analyse(state)
+            agent.passes = 0
+            started = time.perf_counter()
+            for _ in range(args.runs):
+                agent.analyse(state)
+            elapsed = time.perf_counter() - started
+            print(f"{agent.passes / args.runs:,.0f} passes per decision, "
+                  f"{agent.passes / elapsed:,.0f} passes/s over {args.runs} decisions")
+        else:
+            started = time.perf_counter()
+            greedy, searched = compare(args.player_class, args.enemy, args.runs, agent, args.seed)
+            for name, result in (('greedy', greedy), ('search', searched)):
+                print(f"{name:>6}: win rate {result['win_rate']:.1%}, "
+                      f"health left on a win {result['avg_health_left_on_win']:.1f}, "
+                      f"rounds {result['avg_rounds']:.2f}")
+            print(f"elapsed: {time.perf_counter() - started:.2f}s")
+    finally:
+        agent.close()
+
+
+if __name__ == "__main__":
+    main()
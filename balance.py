@@ -0,0 +1,201 @@
+import argparse
+import time
+
+import numpy as np
+
+from content import get_content
+from engine import headless_player
+from policies import PLAYER_CLASSES
+
+# Mirrors Player.battle_enemy/attack/defend/heal for a batch of fights at once.
+# Each fight is one lane in a set of flat arrays; a round updates every lane
+# that is still going, so the Python loop runs once per round, not per fight.
+ROLL_LOW = 5
+ROLL_HIGH = 15
+HEAL_LOW = 10
+HEAL_HIGH = 20
+MAX_ROUNDS = 200
+PERCENTILES = (10, 50, 90)
+
+
+def class_stats(player_classes=PLAYER_CLASSES):
+    # Read the stats straight off a freshly built Player so the balancer can't
+    # drift from Player.__init__ and assign_starting_items.
+    stats = []
+    for player_class in player_classes:
+        player = headless_player(player_class)
+        stats.append({
+            'name': player_class,
+            'health': player.health,
+            'max_health': player.max_health,
+            'damage_rating': player.damage_rating,
+            'damage_modifier': player.damage_modifier,
+            'armor_rating': player.armor_rating,
+            'potions': player.inventory.count('Health Potion'),
+        })
+    return stats
+
+
+def enemy_stats(content=None):
+    content = content if content is not None else get_content()
+    return [
+        {'name': name, 'health': stats['health'], 'attack': stats['attack']}
+        for name, stats in content.enemies.items()
+    ]
+
+
+def simulate_chunk(players, enemies, fights, rng, heal_below=0.0, max_rounds=MAX_ROUNDS):
+    # Lanes are laid out pair-major: lane = pair * fights + i, with
+    # pair = class_index * len(enemies) + enemy_index.
+    num_pairs = len(players) * len(enemies)
+    per_pair = lambda values: np.repeat(np.asarray(values, dtype=np.float64), fights)
+
+    p_health = per_pair([p['health'] for p in players for _ in enemies])
+    p_max = per_pair([p['max_health'] for p in players for _ in enemies])
+    p_damage = per_pair([p['damage_rating'] for p in players for _ in enemies])
+    p_modifier = per_pair([p['damage_modifier'] for p in players for _ in enemies])
+    p_armor = per_pair([p['armor_rating'] for p in players for _ in enemies])
+    p_potions = per_pair([p['potions'] for p in players for _ in enemies])
+    e_health = per_pair([e['health'] for _ in players for e in enemies])
+    e_attack = per_pair([e['attack'] for _ in players for e in enemies])
+
+    lanes = num_pairs * fights
+    rounds = np.zeros(lanes, dtype=np.int64)
+    outcome = np.zeros(lanes, dtype=np.int8)  # 1 win, -1 loss, 0 unfinished
+    active = np.ones(lanes, dtype=bool)
+
+    for _ in range(max_rounds):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        n = idx.size
+        rounds[idx] += 1
+        health = p_health[idx]
+        enemy = e_health[idx]
+
+        heal = (health < p_max[idx] * heal_below) & (p_potions[idx] > 0)
+        attack = ~heal
+
+        # attack(): the swing, plus the odd self-inflicted armor term.
+        swing = rng.integers(ROLL_LOW, ROLL_HIGH + 1, n) * p_modifier[idx] + p_damage[idx]
+        recoil = rng.integers(ROLL_LOW, ROLL_HIGH + 1, n) * (1 - p_armor[idx] / 100) - p_armor[idx]
+        enemy = np.where(attack, enemy - np.maximum(0, swing), enemy)
+        health = np.where(attack, health - np.maximum(0, recoil), health)
+
+        # heal(): one potion, capped at max health.
+        potion = rng.integers(HEAL_LOW, HEAL_HIGH + 1, n)
+        health = np.where(heal, np.minimum(p_max[idx], health + potion), health)
+        p_potions[idx] -= heal
+
+        # defend(): skipped only when the swing just killed the enemy.
+        hit = rng.integers(ROLL_LOW, ROLL_HIGH + 1, n) * e_attack[idx]
+        defends = heal | (enemy > 0)
+        health = np.where(defends, health - np.maximum(0, hit), health)
+
+        p_health[idx] = health
+        e_health[idx] = enemy
+        lost = health <= 0
+        won = ~lost & (enemy <= 0)
+        outcome[idx[lost]] = -1
+        outcome[idx[won]] = 1
+        active[idx[lost | won]] = False
+
+    return {
+        'pair': np.repeat(np.arange(num_pairs), fights),
+        'rounds': rounds,
+        'outcome': outcome,
+        'health_left': np.maximum(0, p_health),
+    }
+
+
+def percentiles_from_hist(hist, qs=PERCENTILES):
+    # hist is (pairs, bins); returns the bin index at each percentile.
+    totals = hist.sum(axis=1, keepdims=True)
+    cumulative = np.cumsum(hist, axis=1)
+    result = []
+    for q in qs:
+        target = np.maximum(1, np.ceil(totals * q / 100))
+        result.append(np.argmax(cumulative >= target, axis=1))
+    return np.stack(result, axis=1)
+
+
+def balance(fights=100000, chunk=20000, seed=None, heal_below=0.0, player_classes=PLAYER_CLASSES, content=None):
+    players = class_stats(player_classes)
+    enemies = enemy_stats(content)
+    num_pairs = len(players) * len(enemies)
+    rng = np.random.default_rng(seed)
+
+    round_bins = MAX_ROUNDS + 1
+    health_bins = int(max(p['max_health'] for p in players)) + 1
+    wins = np.zeros(num_pairs, dtype=np.int64)
+    losses = np.zeros(num_pairs, dtype=np.int64)
+    rounds_hist = np.zeros(num_pairs * round_bins, dtype=np.int64)
+    health_hist = np.zeros(num_pairs * health_bins, dtype=np.int64)
+    health_sum = np.zeros(num_pairs, dtype=np.float64)
+
+    done = 0
+    while done < fights:
+        n = min(chunk, fights - done)
+        batch = simulate_chunk(players, enemies, n, rng, heal_below)
+        pair, outcome = batch['pair'], batch['outcome']
+        won = outcome == 1
+        wins += np.bincount(pair[won], minlength=num_pairs)
+        losses += np.bincount(pair[outcome == -1], minlength=num_pairs)
+        rounds_hist += np.bincount(pair[won] * round_bins + batch['rounds'][won], minlength=num_pairs * round_bins)
+        health_left = batch['health_left'][won]
+        health_bin = np.minimum(health_bins - 1, health_left.astype(np.int64))
+        health_hist += np.bincount(pair[won] * health_bins + health_bin, minlength=num_pairs * health_bins)
+        health_sum += np.bincount(pair[won], weights=health_left, minlength=num_pairs)
+        done += n
+
+    rounds_hist = rounds_hist.reshape(num_pairs, round_bins)
+    health_hist = health_hist.reshape(num_pairs, health_bins)
+    rounds_pct = percentiles_from_hist(rounds_hist)
+    health_pct = percentiles_from_hist(health_hist)
+
+    report = []
+    for pair in range(num_pairs):
+        player = players[pair // len(enemies)]
+        enemy = enemies[pair % len(enemies)]
+        won = int(wins[pair])
+        report.append({
+            'player_class': player['name'],
+            'enemy': enemy['name'],
+            'fights': fights,
+            'win_rate': won / fights,
+            'loss_rate': int(losses[pair]) / fights,
+            'rounds_to_kill': dict(zip(PERCENTILES, rounds_pct[pair].tolist())) if won else {},
+            'health_left_mean': float(health_sum[pair] / won) if won else 0.0,
+            'health_left': dict(zip(PERCENTILES, health_pct[pair].tolist())) if won else {},
+        })
+    return report
+
+
+def print_report(report):
+    print(f"{'class':<8} {'enemy':<12} {'win%':>6} {'rounds p10/50/90':>18} {'hp left mean':>13} {'hp p10/50/90':>14}")
+    for row in report:
+        rounds = '/'.join(str(row['rounds_to_kill'].get(q, '-')) for q in PERCENTILES)
+        health = '/'.join(str(row['health_left'].get(q, '-')) for q in PERCENTILES)
+        print(f"{row['player_class']:<8} {row['enemy']:<12} {row['win_rate'] * 100:>5.1f}% "
+              f"{rounds:>18} {row['health_left_mean']:>13.1f} {health:>14}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo win rates for every class against every enemy.")
+    parser.add_argument('-n', '--fights', type=int, default=100000, help="fights per class/enemy pair")
+    parser.add_argument('--chunk', type=int, default=20000, help="fights per pair simulated per batch")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--heal-below', type=float, default=0.0,
+                        help="drink a Health Potion below this fraction of max health (0 = always attack)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    report = balance(args.fights, args.chunk, args.seed, args.heal_below)
+    elapsed = time.perf_counter() - started
+    print_report(report)
+    total = args.fights * len(report)
+    print(f"{total} fights in {elapsed:.2f}s ({total / elapsed:.0f} fights/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import argparse
+import gc
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Adventure import Player, main as play_game
+from content import get_content
+from engine import quiet
+from persistence import NullStore, StateStore
+from policies import BatchPolicy, ScriptedPolicy
+from replay import replay, replay_paths
+from savedb import SaveDatabase
+
+BASELINE = 'bench_baseline.json'
+THRESHOLD = 0.25
+SESSION_TURNS = 10000
+
+# Audit events that mean the game touched the file system.
+FS_EVENTS = frozenset([
+    'open', 'os.remove', 'os.rename', 'os.mkdir', 'os.listdir', 'os.scandir', 'shutil.rmtree', 'sqlite3.connect',
+])
+_fs_calls = [0, False]
+
+
+def _audit(event, args):
+    if _fs_calls[1] and event in FS_EVENTS:
+        _fs_calls[0] += 1
+
+
+sys.addaudithook(_audit)
+
+
+class CalmRandom(random.Random):
+    # No encounters and no traps, so moving measures moving and not combat.
+    def random(self):
+        return 0.99
+
+
+BENCH_SCRIPT = {'save_name': ['bench'], 'load_choice': ['1'], 'battle': ['attack']}
+
+
+def bench_player(state_dir, rng=None, saves=None):
+    return Player('Warrior', store=StateStore(flush_at_exit=False), policy=ScriptedPolicy(BENCH_SCRIPT),
+                  rng=rng or random.Random(0), output=quiet, state_dir=state_dir, saves=saves)
+
+
+def reset(player, inventory):
+    player.health = player.max_health
+    player.game_over = False
+    player.inventory.restore(inventory)
+
+
+# Each benchmark is setup(state_dir) -> op, where op() runs the operation
+# once. number is how many times op runs per timing.
+def startup(state_dir):
+    get_content()
+    return lambda: bench_player(state_dir)
+
+
+def move(state_dir):
+    player = bench_player(state_dir, CalmRandom())
+    directions = itertools.cycle(('south', 'north'))
+    return lambda: player.move(next(directions))
+
+
+def describe_location(state_dir):
+    player = bench_player(state_dir)
+    return player.describe_location
+
+
+def encounter_enemy(state_dir):
+    player = bench_player(state_dir)
+    inventory = player.inventory.snapshot()
+
+    def op():
+        reset(player, inventory)
+        player.encounter_enemy()
+    return op
+
+
+def battle_enemy(state_dir):
+    player = bench_player(state_dir)
+    inventory = player.inventory.snapshot()
+    spawns = player.content.spawns
+
+    def op():
+        reset(player, inventory)
+        player.battle_enemy(spawns.enemy('Goblin'))
+    return op
+
+
+def add_to_inventory(state_dir):
+    player = bench_player(state_dir)
+
+    def op():
+        player.add_to_inventory('Health Potion')
+        player.inventory.remove('Health Potion')
+    return op
+
+
+def equip_unequip(state_dir):
+    player = bench_player(state_dir)
+
+    def op():
+        player.equip_item('Sword')
+        player.unequip_item('one-handed weapon')
+    return op
+
+
+def save_game(state_dir):
+    player = bench_player(state_dir, saves=SaveDatabase(os.path.join(state_dir, 'saves.db')))
+    return player.save_game
+
+
+def load_game(state_dir):
+    player = bench_player(state_dir, saves=SaveDatabase(os.path.join(state_dir, 'saves.db')))
+    player.save_game()
+    return player.load_game
+
+
+def session(state_dir):
+    # A whole game from the class prompt to quit, driven like a script with
+    # moves, inventory work and rewinds.
+    commands = ['move south', 'inv', 'equip sword', 'stats', 'move north', 'unequip one-handed weapon', 'rewind']
+
+    def op():
+        lines = ['warrior'] + [commands[turn % len(commands)] for turn in range(SESSION_TURNS)]
+        play_game(policy=BatchPolicy(lines), output=quiet, store=NullStore(), state_dir=state_dir,
+                  pace=0, rng=CalmRandom())
+    return op
+
+
+BENCHMARKS = {
+    'startup': (startup, 200),
+    'move': (move, 2000),
+    'describe_location': (describe_location, 20000),
+    'encounter_enemy': (encounter_enemy, 2000),
+    'battle_enemy': (battle_enemy, 2000),
+    'add_to_inventory': (add_to_inventory, 20000),
+    'equip_unequip': (equip_unequip, 20000),
+    'save_game': (save_game, 200),
+    'load_game': (load_game, 200),
+    'session_10k': (session, 1),
+}
+
+
+def replay_recording(path):
+    # A recording from the replay corpus, replayed at full speed. A replay
+    # that no longer ends the way it was recorded raises and fails the run.
+    def setup(state_dir):
+        return lambda: replay(path)
+    return setup
+
+
+# Every replay in the corpus is a benchmark too, so the baseline catches a
+# slowdown in any of them.
+BENCHMARKS.update(
+    ('replay_' + os.path.splitext(os.path.basename(path))[0], (replay_recording(path), 5))
+    for path in replay_paths([])
+)
+
+
+def measure(setup, number, repeat):
+    # Wall time is the best of `repeat` timings. Allocations and file-system
+    # calls come from one extra pass, since tracing slows everything down.
+    with tempfile.TemporaryDirectory() as state_dir:
+        op = setup(state_dir)
+        op()
+        best = float('inf')
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            for _ in range(number):
+                op()
+            best = min(best, (time.perf_counter() - started) / number)
+
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        _fs_calls[:] = [0, True]
+        for _ in range(number):
+            op()
+        _fs_calls[1] = False
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return {
+        'seconds': best,
+        'blocks': blocks / number,
+        'peak_bytes': peak - start_bytes,
+        'fs_calls': _fs_calls[0] / number,
+    }
+
+
+def regressions(results, baseline, threshold):
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['seconds'] > base['seconds'] * (1 + threshold):
+            found.append(f"{name}: {result['seconds'] / base['seconds'] - 1:+.0%} time")
+        # File-system calls are exact counts, so any increase is a regression.
+        if result['fs_calls'] > base['fs_calls']:
+            found.append(f"{name}: {base['fs_calls']:g} -> {result['fs_calls']:g} file-system calls per op")
+    return found
+
+
+def format_seconds(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the game's hot paths and compare them with a baseline.")
+    parser.add_argument('-k', dest='names', action='append', choices=BENCHMARKS,
+                        help="run only this benchmark; repeat for several")
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE, help=f"baseline file (default: {BASELINE})")
+    parser.add_argument('--save-baseline', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="fail when an operation gets this much slower than the baseline")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'benchmark':<24} {'time/op':>10} {'blocks/op':>10} {'peak':>10} {'fs/op':>7}")
+    for name in args.names or BENCHMARKS:
+        setup, number = BENCHMARKS[name]
+        result = results[name] = measure(setup, number, args.repeat)
+        print(f"{name:<24} {format_seconds(result['seconds']):>10} {result['blocks']:>10.1f} "
+              f"{result['peak_bytes'] / 1024:>8.0f} K {result['fs_calls']:>7g}")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=4)
+        print(f"Saved baseline to {args.baseline}.")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            found = regressions(results, json.load(f), args.threshold)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
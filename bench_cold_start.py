@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import timeit
+
+from bundle import read_sources
+from content import (BUNDLE_PATH, ENEMIES_JSON, ITEMS_JSON, LOCATIONS_JSON, STARTING_ITEMS,
+                     ContentRegistry, read_bundle)
+
+# Time from a fresh interpreter to a ready Player, i.e. the first prompt.
+FIRST_PROMPT = """
+import sys, time
+started = time.perf_counter()
+import content
+content._shared = content.ContentRegistry(bundle_path=sys.argv[1] or None)
+from engine import headless_player
+headless_player('Mage')
+print(time.perf_counter() - started)
+"""
+
+
+def legacy_starting_items(player_class='Mage'):
+    # What assign_starting_items used to cost: items.json parsed once per item.
+    for _ in STARTING_ITEMS[player_class]:
+        with open(ITEMS_JSON, 'r') as f:
+            json.load(f)
+
+
+def best_of(repeat, fn, number=10):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def first_prompt(bundle_path, repeat):
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', FIRST_PROMPT, bundle_path or ''],
+                                cwd=here, capture_output=True, text=True, check=True)
+        times.append(float(result.stdout.split()[-1]))
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start cost of loading content, with and without the bundle.")
+    parser.add_argument('-r', '--repeat', type=int, default=20)
+    parser.add_argument('--bundle', default=BUNDLE_PATH)
+    args = parser.parse_args(argv)
+
+    paths = {'items': ITEMS_JSON, 'enemies': ENEMIES_JSON, 'locations': LOCATIONS_JSON}
+    if len(read_bundle(args.bundle, paths)) < len(paths):
+        print(f"{args.bundle} is missing or stale; run python bundle.py first.")
+        return 1
+
+    rows = [
+        ('legacy starting items (JSON per item)', best_of(args.repeat, legacy_starting_items)),
+        ('decode JSON sources', best_of(args.repeat, lambda: read_sources(paths))),
+        ('decode bundle', best_of(args.repeat, lambda: read_bundle(args.bundle, paths))),
+        ('registry from JSON', best_of(args.repeat, lambda: ContentRegistry(bundle_path=None))),
+        ('registry from bundle', best_of(args.repeat, lambda: ContentRegistry(bundle_path=args.bundle))),
+        ('first prompt from JSON', first_prompt(None, max(3, args.repeat // 4))),
+        ('first prompt from bundle', first_prompt(args.bundle, max(3, args.repeat // 4))),
+    ]
+    for label, seconds in rows:
+        print(f"{label}: {seconds * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
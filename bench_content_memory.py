@@ -0,0 +1,83 @@
+import argparse
+import gc
+import json
+import os
+import random
+import tempfile
+import timeit
+import tracemalloc
+
+from bundle import read_sources
+from content import ContentRegistry, text_path, write_bundle
+from world import grid_world
+
+PROSE = ("The walls are worn smooth by years of travellers, and somewhere beyond them "
+         "water drips into a pool that nobody has ever found. ")
+
+
+def write_pack(directory, items, side, prose_repeat):
+    # A synthetic content pack: `items` items and a side x side grid of rooms,
+    # every one with a few hundred bytes of description.
+    rng = random.Random(0)
+    item_entries = [{
+        'name': f'Item {i}',
+        'type': f'type_{i % 40}',
+        'armor_rating': str(rng.randint(0, 20)),
+        'damage_rating': str(round(rng.random() * 2, 2)),
+        'description': f'Item {i}. ' + PROSE * prose_repeat,
+    } for i in range(items)]
+    enemy_entries = [{'name': 'Goblin', 'health': 30, 'attack': 10, 'description': PROSE}]
+    locations = grid_world(side, side)
+    for name, location in locations.items():
+        location['description'] = f'{name}. ' + PROSE * prose_repeat
+    paths = {}
+    for kind, data in (('items', item_entries), ('enemies', enemy_entries), ('locations', locations)):
+        paths[kind] = os.path.join(directory, f'{kind}.json')
+        with open(paths[kind], 'w') as f:
+            json.dump(data, f)
+    return paths
+
+
+def resident_bytes(factory):
+    gc.collect()
+    tracemalloc.start()
+    kept = factory()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resident memory of a large content pack, with and without "
+                                                 "memory-mapped descriptions.")
+    parser.add_argument('-n', '--items', type=int, default=100000)
+    parser.add_argument('--side', type=int, default=150, help="generate a SIDE x SIDE grid of rooms")
+    parser.add_argument('--prose', type=int, default=3, help="description length, in sentences")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_pack(directory, args.items, args.side, args.prose)
+        bundle_path = os.path.join(directory, 'content.bundle')
+        write_bundle(bundle_path, paths, read_sources(paths))
+
+        def registry(bundle):
+            return ContentRegistry(paths['items'], paths['enemies'], paths['locations'], bundle_path=bundle)
+
+        from_json, json_bytes = resident_bytes(lambda: registry(None))
+        from_bundle, bundle_bytes = resident_bytes(lambda: registry(bundle_path))
+        assert from_bundle.bundled == ('items', 'enemies', 'locations')
+        rooms = args.side * args.side
+        print(f"{args.items} items, {rooms} rooms, "
+              f"{os.path.getsize(text_path(bundle_path)) / 1e6:.1f} MB of descriptions")
+        print(f"resident from JSON: {json_bytes / 1e6:.1f} MB")
+        print(f"resident from bundle: {bundle_bytes / 1e6:.1f} MB ({bundle_bytes / json_bytes:.0%})")
+
+        names = [f'Room {x},{x}' for x in range(args.side)]
+        for label, content in (('JSON', from_json), ('bundle', from_bundle)):
+            seconds = min(timeit.repeat(lambda: [content.describe('locations', name) for name in names],
+                                        number=100, repeat=5)) / (100 * len(names))
+            print(f"describe from {label}: {seconds * 1e9:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
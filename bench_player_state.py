@@ -0,0 +1,108 @@
+import argparse
+import gc
+import random
+import timeit
+import tracemalloc
+
+from engine import headless_player, quiet
+from policies import GreedyPolicy
+
+
+class LegacyPlayerState:
+    # The shape Player had before it was slotted: a __dict__, a dict with
+    # one key per equipment slot and a list of visited locations.
+    def __init__(self, player):
+        self.player_class = player.player_class
+        self.state_dir = player.state_dir
+        self.content = player.content
+        self.store = player.store
+        self.policy = player.policy
+        self.rng = player.rng
+        self.say = player.say
+        self.clock = player.clock
+        self.effects = {}
+        self.inventory_file = player.inventory_file
+        self.equipped_file = player.equipped_file
+        self.inventory = list(player.inventory)
+        self.equipped_items = dict(player.equipped_items.to_dict())
+        self.poisoned = player.poisoned
+        self.poison_duration = player.poison_duration
+        self.current_location = player.current_location
+        self.visited_locations = list(player.visited_locations)
+        self.game_over = player.game_over
+        self.health = player.health
+        self.max_health = player.max_health
+        self.mana = player.mana
+        self.max_mana = player.max_mana
+        self.damage_modifier = player.damage_modifier
+        self.armor_rating = player.armor_rating
+        self.damage_rating = player.damage_rating
+
+
+def explored_player(locations):
+    # Shared policy and RNG so the numbers show per-session state, not the
+    # cost of giving every headless player its own Random instance.
+    player = headless_player('Warrior', policy=SHARED_POLICY, rng=SHARED_RNG, output=quiet)
+    player.equipped_items['one-handed weapon'] = 'Sword'
+    player.equipped_items['boots'] = 'Boots'
+    for name in locations:
+        player._visited.add(name)
+    return player
+
+
+def bytes_per_session(factory, sessions):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [factory(i) for i in range(sessions)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del kept
+    return size / sessions
+
+
+def access_cost(number, **stmts):
+    return {name: min(timeit.repeat(stmt, globals=env, number=number, repeat=5)) / number * 1e9
+            for name, (stmt, env) in stmts.items()}
+
+
+SHARED_POLICY = GreedyPolicy()
+SHARED_RNG = random.Random(0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory per session and attribute access cost of Player state.")
+    parser.add_argument('-n', '--sessions', type=int, default=2000)
+    parser.add_argument('--visited', type=int, default=40, help="locations each session has visited")
+    parser.add_argument('--number', type=int, default=200000, help="iterations per access timing")
+    args = parser.parse_args(argv)
+
+    sample = headless_player('Warrior', output=quiet)
+    names = list(sample.load_locations())[:args.visited]
+    probe = names[-1]
+
+    compact = bytes_per_session(lambda i: explored_player(names), args.sessions)
+    legacy = bytes_per_session(lambda i: LegacyPlayerState(explored_player(names)), args.sessions)
+    # The legacy objects were built from compact ones that have been freed,
+    # so only their own allocations remain in the difference.
+    print(f"memory per session: legacy {legacy:,.0f} B, compact {compact:,.0f} B "
+          f"({compact / legacy:.0%} of legacy)")
+
+    new = explored_player(names)
+    old = LegacyPlayerState(new)
+    costs = access_cost(
+        args.number,
+        legacy_attribute=('p.health', {'p': old}),
+        compact_attribute=('p.health', {'p': new}),
+        legacy_slot=("p.equipped_items['boots']", {'p': old}),
+        compact_slot=("p.equipped_items['boots']", {'p': new}),
+        legacy_visited=('name in p.visited_locations', {'p': old, 'name': probe}),
+        compact_visited=('p.has_visited(name)', {'p': new, 'name': probe}),
+    )
+    for what in ('attribute', 'slot', 'visited'):
+        print(f"{what} access: legacy {costs['legacy_' + what]:.1f} ns, compact {costs['compact_' + what]:.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import json
+import sys
+
+from content import (BUNDLE_PATH, ENEMIES_JSON, ITEMS_JSON, LOCATIONS_JSON, STARTING_ITEMS,
+                     parse_rating, write_bundle)
+from spawns import SpawnTables
+from world import EXITS, WorldGraph
+
+
+def is_text(value):
+    return isinstance(value, str)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def is_rating(value):
+    # items.json stores ratings as strings; parse_rating is what the game uses.
+    try:
+        parse_rating(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def is_exit(value):
+    return value is None or isinstance(value, str)
+
+
+def is_names(value):
+    return isinstance(value, list) and all(isinstance(name, str) for name in value)
+
+
+def is_level(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 1
+
+
+def is_weight(value):
+    return is_number(value) and value >= 0
+
+
+def is_level_band(value):
+    return isinstance(value, list) and len(value) == 2 and all(is_level(level) for level in value) \
+        and value[0] <= value[1]
+
+
+def is_spawns(value):
+    return isinstance(value, dict) and all(is_weight(weight) for weight in value.values())
+
+
+# field: (check, required)
+SCHEMA = {
+    'items': {
+        'name': (is_text, True),
+        'type': (is_text, True),
+        'armor_rating': (is_rating, False),
+        'damage_rating': (is_rating, False),
+        'description': (is_text, False),
+    },
+    'enemies': {
+        'name': (is_text, True),
+        'health': (is_number, True),
+        'attack': (is_number, True),
+        'level': (is_level, False),
+        'weight': (is_weight, False),
+        'description': (is_text, False),
+    },
+    'locations': {
+        'description': (is_text, True),
+        'random_moves': (is_names, False),
+        'enemy_levels': (is_level_band, False),
+        'spawns': (is_spawns, False),
+        **{direction: (is_exit, False) for direction in EXITS},
+    },
+}
+
+
+def check_entry(kind, label, entry):
+    if not isinstance(entry, dict):
+        return [f"{kind}: {label} is not an object"]
+    errors = []
+    schema = SCHEMA[kind]
+    for field, (check, required) in schema.items():
+        if field not in entry:
+            if required:
+                errors.append(f"{kind}: {label} is missing {field!r}")
+        elif not check(entry[field]):
+            errors.append(f"{kind}: {label} has a bad {field!r}: {entry[field]!r}")
+    for field in entry:
+        if field not in schema:
+            errors.append(f"{kind}: {label} has an unknown field {field!r}")
+    return errors
+
+
+def check_named_list(kind, entries):
+    if not isinstance(entries, list):
+        return [f"{kind}: expected a list of objects"]
+    errors = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        label = repr(entry['name']) if isinstance(entry, dict) and 'name' in entry else f"entry {index}"
+        errors.extend(check_entry(kind, label, entry))
+        if isinstance(entry, dict) and is_text(entry.get('name')):
+            if entry['name'] in seen:
+                errors.append(f"{kind}: {label} is defined more than once")
+            seen.add(entry['name'])
+    return errors
+
+
+def validate(raw):
+    # Returns (errors, warnings). Errors are content the game would trip
+    # over; warnings are legal but probably unintended.
+    errors = check_named_list('items', raw['items'])
+    errors += check_named_list('enemies', raw['enemies'])
+    warnings = []
+
+    locations = raw['locations']
+    if not isinstance(locations, dict):
+        errors.append("locations: expected an object keyed by location name")
+    else:
+        for name, location in locations.items():
+            errors.extend(check_entry('locations', repr(name), location))
+        if not errors:
+            world = WorldGraph(locations)
+            for name, direction, target in world.dangling:
+                errors.append(f"locations: {name!r} {direction} exit leads to unknown location {target!r}")
+            for name in world.unreachable:
+                warnings.append(f"locations: {name!r} is unreachable from {world.start}")
+
+    if not errors:
+        enemies = {entry['name']: entry for entry in raw['enemies']}
+        for name, location in locations.items():
+            for enemy in location.get('spawns', ()):
+                if enemy not in enemies:
+                    errors.append(f"locations: {name!r} spawns unknown enemy {enemy!r}")
+        for name in SpawnTables(locations, enemies).empty:
+            warnings.append(f"locations: {name!r} has no enemies to spawn, so it draws from all of them")
+
+    item_names = {entry.get('name') for entry in raw['items'] if isinstance(entry, dict)} \
+        if isinstance(raw['items'], list) else set()
+    for player_class, names in STARTING_ITEMS.items():
+        for name in names:
+            if name not in item_names:
+                errors.append(f"starting items: {player_class} starts with unknown item {name!r}")
+    return errors, warnings
+
+
+def read_sources(paths):
+    raw = {}
+    for kind, path in paths.items():
+        with open(path, 'r') as f:
+            raw[kind] = json.load(f)
+    return raw
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the content JSON and compile it into one bundle.")
+    parser.add_argument('--check', action='store_true', help="validate only, don't write the bundle")
+    parser.add_argument('-o', '--output', default=BUNDLE_PATH)
+    parser.add_argument('-v', '--verbose', action='store_true', help="also list warnings")
+    args = parser.parse_args(argv)
+
+    paths = {'items': ITEMS_JSON, 'enemies': ENEMIES_JSON, 'locations': LOCATIONS_JSON}
+    raw = read_sources(paths)
+    errors, warnings = validate(raw)
+    for error in errors:
+        print(f"error: {error}")
+    if args.verbose:
+        for warning in warnings:
+            print(f"warning: {warning}")
+    print(f"{len(errors)} errors, {len(warnings)} warnings")
+    if errors:
+        return 1
+    if not args.check:
+        write_bundle(args.output, paths, raw)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
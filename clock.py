@@ -0,0 +1,129 @@
+import heapq
+import itertools
+import time
+
+
+class GameClock:
+    # Counts game ticks (one per turn) and runs callbacks scheduled for a
+    # given tick. pace is presentation only: when set, a tick in which
+    # something happened is followed by that many seconds of real time.
+    # flush, if given, writes out buffered output before the pause.
+    def __init__(self, pace=0.0, sleep=time.sleep, flush=None):
+        self.tick = 0
+        self.pace = pace
+        self._sleep = sleep
+        self._flush = flush
+        self._queue = []
+        self._seq = itertools.count()
+        self._cancelled = set()
+
+    def schedule(self, delay, callback, *args):
+        # Returns a handle that can be passed to cancel().
+        handle = next(self._seq)
+        heapq.heappush(self._queue, (self.tick + max(1, delay), handle, callback, args))
+        return handle
+
+    def cancel(self, handle):
+        self._cancelled.add(handle)
+
+    def pending(self):
+        return len(self._queue) - len(self._cancelled)
+
+    def advance(self, ticks=1):
+        target = self.tick + ticks
+        while self._queue and self._queue[0][0] <= target:
+            due = self._queue[0][0]
+            self.tick = due
+            ran = False
+            while self._queue and self._queue[0][0] == due:
+                _, handle, callback, args = heapq.heappop(self._queue)
+                if handle in self._cancelled:
+                    self._cancelled.discard(handle)
+                    continue
+                callback(*args)
+                ran = True
+            if ran and self.pace:
+                self.pause()
+        self.tick = target
+
+    def pause(self):
+        # The console's real-time pause after a tick in which something happened.
+        if self._flush is not None:
+            self._flush()
+        self._sleep(self.pace)
+
+    def run_until_idle(self, limit=10000):
+        # Fast-forward through everything still scheduled.
+        while self._queue and limit > 0:
+            self.advance(self._queue[0][0] - self.tick)
+            limit -= 1
+
+
+class StatusEffect:
+    name = 'effect'
+    interval = 1
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.remaining = duration
+
+    def on_apply(self, player):
+        pass
+
+    def on_tick(self, player):
+        pass
+
+    def on_expire(self, player):
+        pass
+
+    def refresh(self, other):
+        # Re-applying an effect that is already running extends it rather
+        # than stacking a second copy.
+        self.remaining = max(self.remaining, other.remaining)
+
+
+class Poison(StatusEffect):
+    name = 'poison'
+
+    def __init__(self, duration, damage=10):
+        super().__init__(duration)
+        self.damage = damage
+
+    def on_apply(self, player):
+        player.poisoned = True
+        player.poison_duration = self.remaining
+
+    def refresh(self, other):
+        super().refresh(other)
+        self.damage = max(self.damage, other.damage)
+
+    def on_tick(self, player):
+        player.say(f"You are poisoned! {self.remaining} turns remaining.")
+        player.take_damage('poison', amount=self.damage)
+        player.poison_duration = self.remaining - 1
+
+    def on_expire(self, player):
+        player.poisoned = False
+        player.poison_duration = 0
+        if not player.game_over:
+            player.say("You recovered from the poison.")
+
+
+class StatModifier(StatusEffect):
+    # A timed change to one of the player's stats, such as an elixir's. The
+    # effect's name is the modifier's source, so drinking another of the
+    # same elixir replaces it rather than stacking.
+    def __init__(self, name, duration, field, add=0.0, multiply=1.0):
+        super().__init__(duration)
+        self.name = name
+        self.field = field
+        self.add = add
+        self.multiply = multiply
+
+    def on_apply(self, player):
+        player.stats.add_modifier(self.name, self.field, self.add, self.multiply)
+
+    def on_expire(self, player):
+        player.stats.remove_modifier(self.name)
+        if not player.game_over:
+            player.say(f"The {self.name} wears off.")
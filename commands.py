@@ -0,0 +1,122 @@
+class TrieNode:
+    __slots__ = ('children', 'command', 'below')
+
+    def __init__(self, below=None):
+        self.children = {}
+        # The command whose name or alias ends here, if any.
+        self.command = None
+        # The one command reachable from here, or None once two different
+        # commands share this prefix. Kept up to date on insert so resolving
+        # an abbreviation never has to search the subtree.
+        self.below = below
+
+
+class PrefixTrie:
+    def __init__(self):
+        self.root = TrieNode()
+
+    def insert(self, key, command):
+        node = self.root
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = TrieNode(command)
+            elif child.below is not command:
+                child.below = None
+            node = child
+        node.command = command
+
+    def match(self, line):
+        # Walks line once. Returns (command, end) for the longest command
+        # name or alias that ends at a word boundary, else for a unique
+        # abbreviation of one; line[end:] holds the arguments. For an
+        # ambiguous abbreviation returns (None, the commands it could mean).
+        node = self.root
+        best = None
+        prefix = None
+        for index, char in enumerate(line):
+            if char == ' ':
+                if node.command is not None:
+                    best = (node.command, index)
+                elif prefix is None and node is not self.root:
+                    prefix = (node, index)
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            if node.command is not None:
+                best = (node.command, len(line))
+            elif prefix is None and node is not self.root:
+                prefix = (node, len(line))
+        if best is not None:
+            return best
+        if prefix is None:
+            return None, []
+        node, end = prefix
+        if node.below is not None:
+            return node.below, end
+        return None, self.commands_below(node)
+
+    def commands_below(self, node):
+        found = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.command is not None and node.command not in found:
+                found.append(node.command)
+            stack.extend(node.children.values())
+        return sorted(found, key=lambda command: command.name)
+
+
+class Command:
+    __slots__ = ('name', 'handler', 'summary', 'usage', 'aliases')
+
+    def __init__(self, name, handler, summary, usage='', aliases=()):
+        self.name = name
+        self.handler = handler
+        self.summary = summary
+        self.usage = usage
+        self.aliases = aliases
+
+    def help_line(self):
+        names = self.name + (f" ({', '.join(self.aliases)})" if self.aliases else '')
+        usage = f" {self.usage}" if self.usage else ''
+        return f"- {names}{usage}: {self.summary}"
+
+
+class CommandTable:
+    # Commands registered by name and aliases in a prefix trie, so any
+    # unambiguous abbreviation works and matching costs one walk of the
+    # input. Handlers take (player, args) and return True to leave the game.
+    def __init__(self):
+        self.trie = PrefixTrie()
+        self.commands = []
+
+    def register(self, name, handler, summary, usage='', aliases=()):
+        command = Command(name, handler, summary, usage, tuple(aliases))
+        self.commands.append(command)
+        for key in (name,) + command.aliases:
+            self.trie.insert(key, command)
+        return command
+
+    def command(self, name, summary, usage='', aliases=()):
+        def decorator(handler):
+            self.register(name, handler, summary, usage, aliases)
+            return handler
+        return decorator
+
+    def help_text(self):
+        return "Available commands:\n" + '\n'.join(command.help_line() for command in self.commands)
+
+    def dispatch(self, player, line):
+        # Command names match case-insensitively; the arguments keep their
+        # case, since item names are capitalised.
+        line = ' '.join(line.split())
+        command, end = self.trie.match(line.lower())
+        if command is None:
+            if end:
+                player.say(f"Did you mean {' or '.join(candidate.name for candidate in end)}?")
+            elif line:
+                player.say("Invalid command. Type 'help' for available commands.")
+            return False
+        return bool(command.handler(player, line[end:].strip()))
@@ -0,0 +1,395 @@
+import bisect
+import json
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+from collections.abc import Mapping
+from enum import IntEnum
+from types import MappingProxyType
+
+from descriptions import BlobTexts, TextBlob, split_descriptions, write_texts
+
+CONTENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ITEMS_JSON = os.path.join(CONTENT_DIR, 'items.json')
+ENEMIES_JSON = os.path.join(CONTENT_DIR, 'enemies.json')
+LOCATIONS_JSON = os.path.join(CONTENT_DIR, 'locations.json')
+BUNDLE_PATH = os.path.join(CONTENT_DIR, 'content.bundle')
+BUNDLE_MAGIC = 'word-adventure-content'
+BUNDLE_FORMAT = 2
+
+STARTING_ITEMS = {
+    'Warrior': ('Sword', 'Shield', 'Chestplate', 'Boots', 'Leggings', 'Health Potion'),
+    'Mage': ('Staff', 'Robe', 'Magic Amulet', 'Leggings', 'Boots', 'Gloves', 'Health Potion', 'Mana Potion'),
+    'Rogue': ('Dagger', 'Dagger', 'Cloak', 'Boots', 'Gloves', 'Bracers', 'Health Potion'),
+}
+
+
+def freeze(value):
+    # Content is shared by every Player, so nothing handed out may be mutated.
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(val) for key, val in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(val) for val in value)
+    return value
+
+
+def index_by_name(entries):
+    # items.json and enemies.json are lists of objects, but the game looks
+    # them up by name.
+    return {entry['name']: entry for entry in entries}
+
+
+# Descriptions are kept apart from the stats; see ContentRegistry.describe.
+Item = namedtuple('Item', ['name', 'type', 'armor_rating', 'damage_rating'])
+
+CONSUMABLE_TYPE_PREFIXES = ('elixir_', 'scroll_')
+CONSUMABLE_TYPE_SUFFIXES = ('_potion',)
+STAT_FIELDS = ('armor_rating', 'damage_rating')
+# How many of one item an inventory holds.
+CONSUMABLE_STACK_LIMIT = 10
+STACK_LIMIT = 3
+# Consumables that change a stat for a few turns:
+# item type -> (stat, added, multiplied by, turns).
+STAT_BUFFS = {
+    'elixir_power': ('damage_modifier', 0, 1.5, 5),
+    'elixir_speed': ('armor_rating', 5, 1.0, 5),
+}
+
+
+def parse_rating(value):
+    # Ratings are stored as strings in items.json, and some are empty.
+    if value in (None, ''):
+        return 0.0
+    return float(value)
+
+
+def is_consumable_type(item_type):
+    return item_type.startswith(CONSUMABLE_TYPE_PREFIXES) or item_type.endswith(CONSUMABLE_TYPE_SUFFIXES)
+
+
+class ItemCatalog(Mapping):
+    def __init__(self, entries):
+        by_name = {}
+        for entry in entries:
+            item = Item(
+                name=entry['name'],
+                type=entry['type'],
+                armor_rating=parse_rating(entry.get('armor_rating')),
+                damage_rating=parse_rating(entry.get('damage_rating')),
+            )
+            by_name[item.name] = item
+        self._by_name = by_name
+        self._names = tuple(by_name)
+        # Item IDs are positions in names, fixed for the life of the catalog.
+        self._ids = {name: item_id for item_id, name in enumerate(self._names)}
+        self._by_lower = {name.lower(): name for name in by_name}
+
+        by_type = {}
+        for item in by_name.values():
+            by_type.setdefault(item.type, []).append(item.name)
+        self._by_type = {item_type: tuple(names) for item_type, names in by_type.items()}
+        # Every item type is an equipment slot; players index gear by these.
+        self.slots = IntEnum('Slot', list(self._by_type), start=0)
+
+        self._consumables = frozenset(
+            item.name for item in by_name.values() if is_consumable_type(item.type)
+        )
+
+        # Sorted (value, name) pairs so stat range queries are a pair of bisects.
+        self._by_stat = {}
+        for field in STAT_FIELDS:
+            pairs = sorted((getattr(item, field), item.name) for item in by_name.values())
+            self._by_stat[field] = ([value for value, _ in pairs], tuple(name for _, name in pairs))
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def types(self):
+        return tuple(self._by_type)
+
+    def of_type(self, item_type):
+        return self._by_type.get(item_type, ())
+
+    def find(self, name):
+        # The catalog's spelling of a name typed in any case, or None.
+        return self._by_lower.get(name.strip().lower())
+
+    def type_of(self, name):
+        return self._by_name[name].type
+
+    def is_consumable(self, name):
+        return name in self._consumables
+
+    def id_of(self, name):
+        return self._ids.get(name)
+
+    def name_of(self, item_id):
+        return self._names[item_id]
+
+    def stack_limit(self, name):
+        return CONSUMABLE_STACK_LIMIT if name in self._consumables else STACK_LIMIT
+
+    @property
+    def consumables(self):
+        return self._consumables
+
+    def in_stat_range(self, field, low=None, high=None):
+        values, names = self._by_stat[field]
+        start = 0 if low is None else bisect.bisect_left(values, low)
+        end = len(values) if high is None else bisect.bisect_right(values, high)
+        return names[start:end]
+
+    def random_item(self, rng=random):
+        return rng.choice(self._names)
+
+    def random_item_of_type(self, item_type, rng=random):
+        names = self._by_type.get(item_type)
+        if not names:
+            return None
+        return rng.choice(names)
+
+
+class LocationIds:
+    # Interns location names to small integers. IDs are only ever added, so
+    # they stay valid for a player even if locations.json is reloaded.
+    def __init__(self, names=()):
+        self._ids = {}
+        self._names = []
+        self._lock = threading.Lock()
+        for name in names:
+            self.id_of(name)
+
+    def id_of(self, name):
+        location_id = self._ids.get(name)
+        if location_id is None:
+            with self._lock:
+                location_id = self._ids.get(name)
+                if location_id is None:
+                    location_id = len(self._names)
+                    self._names.append(name)
+                    self._ids[name] = location_id
+        return location_id
+
+    def get(self, name):
+        return self._ids.get(name)
+
+    def name_of(self, location_id):
+        return self._names[location_id]
+
+    def __len__(self):
+        return len(self._names)
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def text_path(bundle_path):
+    return os.path.splitext(bundle_path)[0] + '.text'
+
+
+def read_bundle(path, paths):
+    # The content kinds a bundle built by bundle.py can serve, as
+    # {kind: (raw, mtime, texts)}. A kind whose source file has changed since
+    # the bundle was built is left out so it gets read from its JSON instead.
+    try:
+        # One read, then decode from memory; marshal.load on the file object
+        # itself reads in small pieces and is several times slower.
+        with open(path, 'rb') as f:
+            header, stamps, raw, text_index, token = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+    if header != (BUNDLE_MAGIC, BUNDLE_FORMAT, marshal.version):
+        return {}
+    try:
+        blob = TextBlob(text_path(path))
+    except (OSError, ValueError):
+        return {}
+    if blob.token != token:
+        # The descriptions belong to a different build.
+        return {}
+    fresh = {}
+    for kind, source in paths.items():
+        try:
+            stamp = source_stamp(source)
+        except FileNotFoundError:
+            continue
+        if kind in raw and stamps.get(kind) == stamp:
+            fresh[kind] = (raw[kind], stamp[2], BlobTexts(blob, text_index[kind]))
+    return fresh
+
+
+def write_bundle(path, paths, raw):
+    # Stats go in the bundle, descriptions in a memory-mapped text file next
+    # to it. raw is consumed: its descriptions are removed.
+    stamps = {kind: source_stamp(source) for kind, source in paths.items()}
+    texts = []
+    text_index = {}
+    for kind in paths:
+        text_index[kind] = {}
+        for name, text in split_descriptions(kind, raw[kind]).items():
+            text_index[kind][name] = len(texts)
+            texts.append(text)
+    token = int.from_bytes(os.urandom(8), 'little')
+    write_texts(text_path(path), texts, token)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        marshal.dump(((BUNDLE_MAGIC, BUNDLE_FORMAT, marshal.version), stamps, raw, text_index, token), f)
+    os.replace(tmp_path, path)
+
+
+class ContentRegistry:
+    def __init__(self, items_path=ITEMS_JSON, enemies_path=ENEMIES_JSON,
+                 locations_path=LOCATIONS_JSON, hot_reload=False, reload_interval=1.0,
+                 bundle_path=BUNDLE_PATH):
+        self.paths = {
+            'items': items_path,
+            'enemies': enemies_path,
+            'locations': locations_path,
+        }
+        self.hot_reload = hot_reload
+        self.reload_interval = reload_interval
+        self.loads = 0
+        self.location_ids = LocationIds()
+        self._data = {}
+        self._texts = {}
+        self._mtimes = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        bundled = read_bundle(bundle_path, self.paths) if bundle_path else {}
+        self.bundled = tuple(bundled)
+        for kind in self.paths:
+            if kind in bundled:
+                self._install(kind, *bundled[kind])
+            else:
+                self._load(kind)
+
+    def _parse(self, kind, raw):
+        if kind == 'items':
+            return ItemCatalog(raw)
+        if kind == 'enemies':
+            raw = index_by_name(raw)
+        if kind == 'locations':
+            for name in raw:
+                self.location_ids.id_of(name)
+        return freeze(raw)
+
+    def _load(self, kind):
+        path = self.paths[kind]
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, 'r') as f:
+            raw = json.load(f)
+        self._install(kind, raw, mtime)
+
+    def _install(self, kind, raw, mtime, texts=None):
+        if texts is None:
+            texts = split_descriptions(kind, raw)
+        self._data[kind] = self._parse(kind, raw)
+        self._texts[kind] = texts
+        self._mtimes[kind] = mtime
+        self.loads += 1
+
+    def _check_for_changes(self):
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._last_check < self.reload_interval:
+                return
+            self._last_check = now
+            for kind, path in self.paths.items():
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                if mtime != self._mtimes[kind]:
+                    try:
+                        self._load(kind)
+                    except (ValueError, KeyError) as e:
+                        # Keep serving the last good copy while a file is mid-edit.
+                        sys.stderr.write(f"Could not reload {path}: {e}\n")
+
+    def get(self, kind):
+        if self.hot_reload:
+            self._check_for_changes()
+        return self._data[kind]
+
+    def describe(self, kind, name):
+        # Descriptions are only needed when something is shown, so they live
+        # outside the stat tables: in a dict when loaded from JSON, and read
+        # from the memory-mapped text file when loaded from the bundle.
+        if self.hot_reload:
+            self._check_for_changes()
+        return self._texts[kind].get(name, '')
+
+    @property
+    def items(self):
+        return self.get('items')
+
+    @property
+    def enemies(self):
+        return self.get('enemies')
+
+    @property
+    def locations(self):
+        return self.get('locations')
+
+    @property
+    def world(self):
+        # Compiled once per load of locations.json, sharing its location IDs.
+        from world import WorldGraph
+        locations = self.locations
+        compiled = self._data.get('world')
+        if compiled is None or compiled[0] is not locations:
+            with self._lock:
+                compiled = self._data.get('world')
+                if compiled is None or compiled[0] is not locations:
+                    compiled = self._data['world'] = (locations, WorldGraph(locations, self.location_ids))
+        return compiled[1]
+
+    @property
+    def spawns(self):
+        # Compiled once per load of locations.json or enemies.json.
+        from spawns import SpawnTables
+        locations, enemies = self.locations, self.enemies
+        compiled = self._data.get('spawns')
+        if compiled is None or compiled[0] is not locations or compiled[1] is not enemies:
+            with self._lock:
+                compiled = self._data.get('spawns')
+                if compiled is None or compiled[0] is not locations or compiled[1] is not enemies:
+                    compiled = self._data['spawns'] = (locations, enemies, SpawnTables(locations, enemies))
+        return compiled[2]
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_content(hot_reload=None):
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = ContentRegistry(hot_reload=bool(hot_reload))
+    if hot_reload is not None:
+        _shared.hot_reload = hot_reload
+    return _shared
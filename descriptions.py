@@ -0,0 +1,73 @@
+import mmap
+import os
+import struct
+from array import array
+
+TEXT_MAGIC = b'WATEXT01'
+# magic, build token, number of texts; native byte order like the offsets,
+# since the file is built on the machine that reads it.
+HEADER = struct.Struct('=8sQQ')
+OFFSET_SIZE = array('Q').itemsize
+
+
+def write_texts(path, texts, token):
+    # Layout: header, count + 1 offsets into the text area, then the UTF-8
+    # texts back to back. Text i is text_area[offsets[i]:offsets[i + 1]].
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = array('Q', [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(TEXT_MAGIC, token, len(encoded)))
+        f.write(offsets.tobytes())
+        for data in encoded:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+class TextBlob:
+    # A text file written by write_texts, memory-mapped so only the pages
+    # holding texts that are actually shown are ever read in.
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.token, count = HEADER.unpack_from(self._map)
+        if magic != TEXT_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a text blob.")
+        view = memoryview(self._map)
+        start = HEADER.size + (count + 1) * OFFSET_SIZE
+        self._offsets = view[HEADER.size:start].cast('Q')
+        self._text = view[start:]
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def view(self, index):
+        # Zero-copy: a slice of the mapping itself.
+        return self._text[self._offsets[index]:self._offsets[index + 1]]
+
+    def text(self, index):
+        return str(self.view(index), 'utf-8')
+
+
+class BlobTexts:
+    # name -> text for one kind of content, read from a TextBlob on demand.
+    def __init__(self, blob, index):
+        self._blob = blob
+        self._index = index
+
+    def get(self, name, default=''):
+        slot = self._index.get(name)
+        if slot is None:
+            return default
+        return self._blob.text(slot)
+
+
+def split_descriptions(kind, raw):
+    # Takes the description out of every entry, leaving only the stats in
+    # raw, and returns {name: description}.
+    if kind == 'locations':
+        return {name: entry.pop('description', '') for name, entry in raw.items()}
+    return {entry['name']: entry.pop('description', '') for entry in raw}
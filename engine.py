@@ -0,0 +1,127 @@
+import argparse
+import random
+import time
+
+from Adventure import Player
+from content import get_content
+from persistence import NullStore
+from policies import PLAYER_CLASSES, GreedyPolicy, RandomPolicy
+from render import Quiet
+
+# Simulations neither format nor print anything.
+quiet = Quiet()
+
+
+def headless_player(player_class, policy=None, rng=None, seed=None, content=None, output=quiet):
+    # A Player with no console, no disk access and its own RNG stream.
+    if rng is None:
+        rng = random.Random(seed)
+    return Player(
+        player_class,
+        content=content,
+        store=NullStore(),
+        policy=policy if policy is not None else GreedyPolicy(),
+        rng=rng,
+        output=output,
+    )
+
+
+def make_policy(name, rng):
+    if name == 'random':
+        return RandomPolicy(rng)
+    if name == 'greedy':
+        return GreedyPolicy()
+    raise ValueError(f"Policy {name!r} needs to be built by the caller.")
+
+
+class CountingPolicy:
+    # Wraps another policy and counts how often each decision came up.
+    def __init__(self, inner):
+        self.inner = inner
+        self.counts = {}
+
+    def decide(self, player, decision, options, prompt):
+        self.counts[decision] = self.counts.get(decision, 0) + 1
+        return self.inner.decide(player, decision, options, prompt)
+
+
+def run_battles(player_class, enemy_name, runs, policy_factory=GreedyPolicy, seed=None, content=None):
+    content = content if content is not None else get_content()
+    spawns = content.spawns
+    rng = random.Random(seed)
+    wins = 0
+    rounds = 0
+    health_left = 0
+    for _ in range(runs):
+        policy = CountingPolicy(policy_factory())
+        player = headless_player(player_class, policy=policy, rng=rng, content=content)
+        if player.battle_enemy(spawns.enemy(enemy_name)) and player.health > 0:
+            wins += 1
+            health_left += player.health
+        rounds += policy.counts.get('battle', 0)
+    return {
+        'player_class': player_class,
+        'enemy': enemy_name,
+        'runs': runs,
+        'wins': wins,
+        'win_rate': wins / runs if runs else 0.0,
+        'avg_rounds': rounds / runs if runs else 0.0,
+        'avg_health_left_on_win': health_left / wins if wins else 0.0,
+    }
+
+
+def run_traps(player_class, runs, policy_factory=GreedyPolicy, seed=None, content=None):
+    content = content if content is not None else get_content()
+    rng = random.Random(seed)
+    traps = 0
+    deaths = 0
+    damage = 0
+    for _ in range(runs):
+        policy = CountingPolicy(policy_factory())
+        player = headless_player(player_class, policy=policy, rng=rng, content=content)
+        start_health = player.health
+        player.detect_trap()
+        # Poison is scheduled on the clock; let it run its course so its
+        # damage (and any death) is counted with the trap that caused it.
+        player.clock.run_until_idle()
+        # Traps that ask for a decision were spotted; others just went off or
+        # never appeared, so count any health loss as a triggered trap too.
+        if policy.counts.get('trap') or player.health < start_health:
+            traps += 1
+        damage += max(0, start_health - player.health)
+        if player.game_over:
+            deaths += 1
+    return {
+        'player_class': player_class,
+        'runs': runs,
+        'traps': traps,
+        'deaths': deaths,
+        'avg_damage': damage / runs if runs else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run battles or trap encounters without a console.")
+    parser.add_argument('mode', choices=['battles', 'traps'])
+    parser.add_argument('--class', dest='player_class', choices=PLAYER_CLASSES, default='Warrior')
+    parser.add_argument('--enemy', default='Goblin')
+    parser.add_argument('--policy', choices=['greedy', 'random'], default='greedy')
+    parser.add_argument('-n', '--runs', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    policy_rng = random.Random(args.seed)
+    policy_factory = lambda: make_policy(args.policy, policy_rng)
+    started = time.perf_counter()
+    if args.mode == 'battles':
+        result = run_battles(args.player_class, args.enemy, args.runs, policy_factory, args.seed)
+    else:
+        result = run_traps(args.player_class, args.runs, policy_factory, args.seed)
+    elapsed = time.perf_counter() - started
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    print(f"elapsed: {elapsed:.2f}s ({args.runs / elapsed:.0f} runs/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from Adventure import Player
+from content import get_content
+from engine import quiet
+from persistence import NullStore
+from policies import PLAYER_CLASSES, GreedyPolicy, Policy, RandomPolicy
+
+
+class WalkerPolicy(Policy):
+    # Picks directions at random and hands every other decision to `inner`.
+    def __init__(self, rng, inner):
+        self.rng = rng
+        self.inner = inner
+
+    def decide(self, player, decision, options, prompt):
+        if decision == 'direction':
+            return self.rng.choice(options)
+        return self.inner.decide(player, decision, options, prompt)
+
+
+class ExplorerPlayer(Player):
+    # Counts the events the run statistics need as the normal game code fires.
+    __slots__ = ('traps_triggered', 'items_gained')
+
+    def __init__(self, *args, **kwargs):
+        self.traps_triggered = 0
+        self.items_gained = 0
+        super().__init__(*args, **kwargs)
+        # Starting items are not loot.
+        self.items_gained = 0
+
+    def trigger_trap(self, trap, damage_multiplier=1.0):
+        self.traps_triggered += 1
+        super().trigger_trap(trap, damage_multiplier)
+
+    def add_to_inventory(self, item_name):
+        added = super().add_to_inventory(item_name)
+        self.items_gained += added
+        return added
+
+
+def run_seed(seed, run_index):
+    # Seeding from a string hashes it, so every run gets its own stream no
+    # matter which worker picks it up or how many workers there are.
+    return f"{seed}:{run_index}"
+
+
+def explore_once(player_class, rng, max_turns, policy_name='greedy', content=None):
+    inner = GreedyPolicy() if policy_name == 'greedy' else RandomPolicy(rng)
+    player = ExplorerPlayer(
+        player_class,
+        content=content,
+        store=NullStore(),
+        policy=WalkerPolicy(rng, inner),
+        rng=rng,
+        output=quiet,
+    )
+    world = player.content.world
+    turns = 0
+    while turns < max_turns and not player.game_over:
+        options = tuple(world.open_exits(player.current_location)) + ('random',)
+        direction = player.policy.decide(player, 'direction', options, '')
+        player.move(direction)
+        player.end_turn()
+        turns += 1
+    return {
+        'turns': turns,
+        'died_at': player.current_location if player.game_over else None,
+        'traps_triggered': player.traps_triggered,
+        'items_gained': player.items_gained,
+        'visited': len(player.visited_locations),
+    }
+
+
+def explore_batch(seed, start, count, max_turns, player_classes, policy_name):
+    content = get_content()
+    stats = {
+        'runs': 0,
+        'turns': 0,
+        'deaths': 0,
+        'traps_triggered': 0,
+        'items_gained': 0,
+        'visited': 0,
+        'deaths_by_location': Counter(),
+        'deaths_by_class': Counter(),
+        'runs_by_class': Counter(),
+    }
+    for run_index in range(start, start + count):
+        player_class = player_classes[run_index % len(player_classes)]
+        rng = random.Random(run_seed(seed, run_index))
+        result = explore_once(player_class, rng, max_turns, policy_name, content)
+        stats['runs'] += 1
+        stats['turns'] += result['turns']
+        stats['traps_triggered'] += result['traps_triggered']
+        stats['items_gained'] += result['items_gained']
+        stats['visited'] += result['visited']
+        stats['runs_by_class'][player_class] += 1
+        if result['died_at'] is not None:
+            stats['deaths'] += 1
+            stats['deaths_by_location'][result['died_at']] += 1
+            stats['deaths_by_class'][player_class] += 1
+    return stats
+
+
+def merge_stats(total, part):
+    for key, value in part.items():
+        if key not in total:
+            total[key] = Counter() if isinstance(value, Counter) else 0
+        total[key] += value
+    return total
+
+
+def split_runs(runs, jobs):
+    size, extra = divmod(runs, jobs)
+    start = 0
+    for job in range(jobs):
+        count = size + (1 if job < extra else 0)
+        if count:
+            yield start, count
+        start += count
+
+
+def explore(runs, max_turns=200, seed=0, workers=None, player_classes=PLAYER_CLASSES,
+            policy_name='greedy', jobs_per_worker=4):
+    workers = workers or os.cpu_count() or 1
+    chunks = list(split_runs(runs, workers * jobs_per_worker))
+    total = {}
+    if workers == 1:
+        for start, count in chunks:
+            merge_stats(total, explore_batch(seed, start, count, max_turns, player_classes, policy_name))
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(explore_batch, seed, start, count, max_turns, player_classes, policy_name)
+            for start, count in chunks
+        ]
+        for future in futures:
+            merge_stats(total, future.result())
+    return total
+
+
+def print_stats(stats, top=10):
+    runs = stats['runs'] or 1
+    print(f"runs: {stats['runs']}")
+    print(f"average turns survived: {stats['turns'] / runs:.1f}")
+    print(f"deaths: {stats['deaths']} ({stats['deaths'] / runs:.1%})")
+    print(f"traps triggered: {stats['traps_triggered']} ({stats['traps_triggered'] / runs:.2f} per run)")
+    print(f"items gained: {stats['items_gained']} ({stats['items_gained'] / runs:.2f} per run)")
+    print(f"average locations visited: {stats['visited'] / runs:.2f}")
+    print("deaths by class:")
+    for player_class, count in stats['deaths_by_class'].most_common():
+        print(f"  {player_class}: {count}/{stats['runs_by_class'][player_class]}")
+    print("deaths by location:")
+    for location, count in stats['deaths_by_location'].most_common(top):
+        print(f"  {location}: {count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Random-walk seeded headless players through the world.")
+    parser.add_argument('-n', '--runs', type=int, default=1000)
+    parser.add_argument('--turns', type=int, default=200, help="maximum turns per run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--class', dest='player_classes', action='append', choices=PLAYER_CLASSES,
+                        help="class to play; repeat to rotate through several (default: all)")
+    parser.add_argument('--policy', choices=['greedy', 'random'], default='greedy')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = explore(args.runs, args.turns, args.seed, args.workers,
+                    tuple(args.player_classes or PLAYER_CLASSES), args.policy)
+    elapsed = time.perf_counter() - started
+    print_stats(stats)
+    print(f"elapsed: {elapsed:.2f}s ({args.runs / elapsed:.0f} runs/s)")
+
+
+if __name__ == "__main__":
+    main()
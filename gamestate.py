@@ -0,0 +1,240 @@
+# A side-effect-free model of the decisions the game asks about in combat
+# and traps, for agents that look ahead. A Player carries files, a save
+# database, output and a content registry; a GameState is a handful of
+# numbers, so it can be cloned, stepped and rolled back tens of thousands of
+# times a decision, or pickled to another process.
+#
+# The rules mirror Player.battle_enemy, fight, detect_trap, trigger_trap and
+# take_damage. Rewards only add their damage modifier, and poison is taken
+# up front.
+
+BATTLE = 'battle'
+ENCOUNTER = 'encounter'
+TRAP = 'trap'
+DONE = 'done'
+
+ACTIONS = {
+    BATTLE: ('attack', 'block', 'heal'),
+    ENCOUNTER: ('fight', 'evade', 'negotiate'),
+    TRAP: ('disarm', 'avoid'),
+    DONE: (),
+}
+
+TRAP_DAMAGE = {'spike': 20, 'pitfall': 30, 'net': 0, 'poison dart': 0}
+POISON_DAMAGE = 10
+ENCOUNTER_CHANCE = 0.4
+HEAL_BELOW = 0.35
+REWARD_MODIFIER = 0.2
+# What a Health Potion and a trap kit left over are worth, in health points.
+POTION_WORTH = 15
+TOOL_WORTH = 10
+
+POTION = 'Health Potion'
+TOOL_TYPE = 'trap_disarmament_item'
+
+
+def roll(rng, low, high):
+    # Same distribution as rng.randint(low, high) for a fraction of the cost.
+    return low + int(rng.random() * (high - low + 1))
+
+
+class GameState:
+    __slots__ = (
+        'player_class', 'max_health', 'damage_rating', 'armor_rating', 'spawns',
+        'phase', 'health', 'damage_modifier', 'potions', 'tools', 'enemy', 'enemy_health', 'pending', 'trap',
+    )
+
+    def __init__(self, player_class, health, max_health, damage_modifier, damage_rating, armor_rating,
+                 potions=0, tools=0, phase=DONE, enemy=None, enemy_health=None, pending=0, trap=None, spawns=None):
+        self.player_class = player_class
+        self.max_health = max_health
+        self.damage_rating = damage_rating
+        self.armor_rating = armor_rating
+        # An AliasTable of EnemyTemplates, for enemies a net trap brings in.
+        self.spawns = spawns
+        self.phase = phase
+        self.health = health
+        self.damage_modifier = damage_modifier
+        self.potions = potions
+        self.tools = tools
+        self.enemy = enemy
+        if enemy_health is None:
+            enemy_health = enemy.health if enemy is not None else 0
+        self.enemy_health = enemy_health
+        self.pending = pending
+        self.trap = trap
+
+    @classmethod
+    def from_player(cls, player, decision):
+        # The state a Player is in when asked `decision`: its current
+        # opponent for battle and encounter, its current trap for trap.
+        enemy = player.opponent
+        return cls(
+            player.player_class,
+            player.health,
+            player.max_health,
+            player.damage_modifier,
+            player.damage_rating,
+            player.armor_rating,
+            potions=player.inventory.count(POTION),
+            tools=player.inventory.type_count(TOOL_TYPE),
+            phase=decision,
+            enemy=None if enemy is None else enemy.template,
+            enemy_health=None if enemy is None else enemy.health,
+            trap=player.trap,
+            spawns=player.content.spawns.table(player.world.archetype(player.current_location)),
+        )
+
+    def clone(self):
+        state = GameState.__new__(GameState)
+        for name in GameState.__slots__:
+            setattr(state, name, getattr(self, name))
+        return state
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in GameState.__slots__)
+
+    def __setstate__(self, values):
+        for name, value in zip(GameState.__slots__, values):
+            setattr(self, name, value)
+
+    def terminal(self):
+        return self.phase == DONE
+
+    def actions(self):
+        if self.phase == BATTLE and not self.potions:
+            # Healing with no potions only gives the enemy a free hit.
+            return ('attack', 'block')
+        return ACTIONS[self.phase]
+
+    def default_action(self):
+        # The greedy policy's choice, used to play rollouts out.
+        if self.phase == BATTLE:
+            if self.potions and self.health < self.max_health * HEAL_BELOW:
+                return 'heal'
+            return 'attack'
+        if self.phase == ENCOUNTER:
+            return 'fight'
+        if self.phase == TRAP:
+            return 'disarm' if self.tools else 'avoid'
+        return None
+
+    def value(self):
+        # 0 for dead, otherwise 0.5 to 1 by what is left.
+        if self.health <= 0:
+            return 0.0
+        worth = self.health + POTION_WORTH * self.potions + TOOL_WORTH * self.tools
+        return 0.5 + 0.5 * min(1.0, worth / self.max_health)
+
+    def apply(self, action, rng):
+        # Plays one decision and returns what undo() needs to take it back.
+        # Undoing the first of several applies takes them all back.
+        saved = (self.phase, self.health, self.damage_modifier, self.potions, self.tools, self.enemy,
+                 self.enemy_health, self.pending, self.trap)
+        self._step(action, rng)
+        return saved
+
+    def undo(self, saved):
+        (self.phase, self.health, self.damage_modifier, self.potions, self.tools, self.enemy,
+         self.enemy_health, self.pending, self.trap) = saved
+
+    def rollout(self, rng):
+        # Plays the greedy policy to the end without keeping undo records.
+        while self.phase != DONE:
+            self._step(self.default_action(), rng)
+        return self.value()
+
+    def _step(self, action, rng):
+        if self.phase == BATTLE:
+            self._battle_round(action, rng)
+        elif self.phase == ENCOUNTER:
+            self._encounter(action, rng)
+        elif self.phase == TRAP:
+            self._trap(action, rng)
+
+    def _battle_round(self, action, rng):
+        enemy = self.enemy
+        if action == 'attack':
+            attack_damage = roll(rng, 5, 15) * self.damage_modifier + self.damage_rating
+            enemy_damage = roll(rng, 5, 15) * (1 - self.armor_rating / 100) - self.armor_rating
+            self.enemy_health -= max(0, attack_damage)
+            self.health -= max(0, enemy_damage)
+            if self.enemy_health > 0:
+                self.health -= max(0, roll(rng, 5, 15) * enemy.attack)
+        elif action == 'block':
+            self.health -= roll(rng, 0, 5)
+            self.health -= max(0, roll(rng, 5, 15) * enemy.attack)
+        elif action == 'heal':
+            if self.potions:
+                self.health = min(self.max_health, self.health + roll(rng, 10, 20))
+                self.potions -= 1
+            self.health -= max(0, roll(rng, 5, 15) * enemy.attack)
+
+        if self.health <= 0:
+            self.phase = DONE
+        elif self.enemy_health <= 0:
+            self.damage_modifier += REWARD_MODIFIER
+            self._next_enemy(rng)
+
+    def _next_enemy(self, rng):
+        if self.pending and self.spawns is not None:
+            self.pending -= 1
+            self.enemy = self.spawns.sample(rng)
+            self.enemy_health = self.enemy.health
+            self.phase = BATTLE
+        else:
+            self.enemy = None
+            self.phase = DONE
+
+    def _encounter(self, action, rng):
+        if action == 'evade' and rng.random() < 0.5:
+            self.phase = DONE
+        elif action == 'negotiate' and rng.random() < 0.5:
+            self.damage_modifier += REWARD_MODIFIER
+            self.phase = DONE
+        else:
+            self.phase = BATTLE
+
+    def _trap(self, action, rng):
+        self.phase = DONE
+        trap = self.trap
+        rogue = self.player_class == 'Rogue'
+        if action == 'disarm':
+            if self.tools:
+                if rng.random() < (0.9 if rogue else 0.5):
+                    if rng.random() >= (0.7 if rogue else 0):
+                        self.tools -= 1
+                    return
+                self.tools -= 1
+                # A Rogue's failed disarm sets the trap off at half damage.
+                self._trigger(trap, rng, 0.5 if rogue else 1.0)
+            elif rng.random() >= (0.2 if rogue else 0.5):
+                self._trigger(trap, rng)
+        elif rng.random() >= (0.6 if rogue else 0.4):
+            self._trigger(trap, rng)
+
+    def _trigger(self, trap, rng, damage_multiplier=1.0):
+        rogue = self.player_class == 'Rogue'
+        if trap == 'poison dart':
+            duration = roll(rng, 2, 5)
+            if rogue:
+                duration += roll(rng, 1, 2)
+            self._hurt(POISON_DAMAGE * duration)
+            return
+        if rogue and damage_multiplier < 1.0:
+            # Rogues shrug off half of any damage already reduced.
+            damage_multiplier *= 0.5
+        self._hurt(int(TRAP_DAMAGE[trap] * damage_multiplier))
+        if trap == 'net':
+            self._ambush(rng)
+
+    def _hurt(self, amount):
+        self.health -= amount
+        if self.health <= 0:
+            self.phase = DONE
+
+    def _ambush(self, rng):
+        if self.health > 0 and self.spawns is not None and rng.random() < ENCOUNTER_CHANCE:
+            self.pending = roll(rng, 1, 4)
+            self._next_enemy(rng)
+
@@ -0,0 +1,178 @@
+import atexit
+import queue
+import sys
+import threading
+import time
+
+WORKERS = 2
+QUEUE_SIZE = 256
+
+
+class IOPool:
+    # Background threads that run writes off the game loop. Each job has a
+    # key, normally the path it writes; a key always goes to the same
+    # thread, so writes to one file happen in the order they were submitted
+    # while different files are written in parallel. Each thread's queue is
+    # bounded: when it is full, submit() blocks until there is room rather
+    # than letting a slow disk pile up unbounded work.
+    def __init__(self, workers=WORKERS, queue_size=QUEUE_SIZE, flush_at_exit=True):
+        self.queue_size = queue_size
+        self.submitted = 0
+        self.completed = 0
+        self.blocked = 0
+        self.max_depth = 0
+        self.write_seconds = 0.0
+        # key -> writes that failed and nobody has flushed yet.
+        self.errors = {}
+        self._lock = threading.Lock()
+        self._written = threading.Condition(self._lock)
+        # Every job gets the next sequence number. For each key with jobs
+        # outstanding: [last submitted, last written, outstanding], so wait()
+        # can block on just the jobs before it under that key.
+        self._sequence = 0
+        self._keys = {}
+        self._queues = [queue.Queue(queue_size) for _ in range(workers)]
+        # Daemon threads, so a forgotten pool can't keep the process alive;
+        # the exit flush below is what makes sure nothing is lost.
+        self._threads = [threading.Thread(target=self._run, args=(jobs,), name=f'io-{index}', daemon=True)
+                         for index, jobs in enumerate(self._queues)]
+        for thread in self._threads:
+            thread.start()
+        if flush_at_exit:
+            atexit.register(self.close)
+
+    def _queue_for(self, key):
+        return self._queues[hash(key) % len(self._queues)]
+
+    def submit(self, key, function, *args):
+        if not self._threads:
+            # Closed: write now rather than queue work nobody will run.
+            self._execute(function, args)
+            return
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+            pending = self._keys.get(key)
+            if pending is None:
+                # Everything before this job under key has been written.
+                pending = self._keys[key] = [sequence, sequence - 1, 0]
+            pending[0] = sequence
+            pending[2] += 1
+        jobs = self._queue_for(key)
+        try:
+            jobs.put_nowait((key, sequence, function, args))
+        except queue.Full:
+            with self._lock:
+                self.blocked += 1
+            jobs.put((key, sequence, function, args))
+        with self._lock:
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, jobs.qsize())
+
+    def _run(self, jobs):
+        while True:
+            job = jobs.get()
+            try:
+                if job is None:
+                    return
+                key, sequence, function, args = job
+                started = time.perf_counter()
+                try:
+                    self._execute(function, args)
+                except Exception as error:
+                    # Nobody on this thread can handle it; flush() reports it.
+                    with self._lock:
+                        self.errors.setdefault(key, []).append(error)
+                    sys.stderr.write(f"Write to {key} failed: {error}\n")
+                with self._lock:
+                    self.completed += 1
+                    self.write_seconds += time.perf_counter() - started
+                    pending = self._keys[key]
+                    pending[1] = max(pending[1], sequence)
+                    pending[2] -= 1
+                    if not pending[2]:
+                        del self._keys[key]
+                    self._written.notify_all()
+            finally:
+                jobs.task_done()
+
+    def _execute(self, function, args):
+        # One job; metrics times this.
+        function(*args)
+
+    def depth(self):
+        return sum(jobs.qsize() for jobs in self._queues)
+
+    def wait(self, key):
+        # Blocks until everything submitted so far under key has run, so a
+        # read of a file sees the writes made before it. Jobs under other
+        # keys, and ones submitted after this call, aren't waited for.
+        with self._lock:
+            pending = self._keys.get(key)
+            if pending is None:
+                return
+            last = pending[0]
+            self._written.wait_for(lambda: self._keys.get(key, (None, last))[1] >= last)
+
+    def flush(self, keys=None):
+        # Blocks until every job submitted so far under keys has run, then
+        # raises the first of their writes that failed since they were last
+        # flushed, if any. Without keys, waits for every job and reports
+        # every key's failures.
+        if keys is None:
+            for jobs in self._queues:
+                jobs.join()
+        else:
+            for key in keys:
+                self.wait(key)
+        with self._lock:
+            if keys is None:
+                errors, self.errors = self.errors, {}
+            else:
+                errors = {key: self.errors.pop(key) for key in keys if key in self.errors}
+        if errors:
+            key, failed = next(iter(errors.items()))
+            count = sum(len(failures) for failures in errors.values())
+            raise OSError(f"{count} background write(s) failed, first to {key}: {failed[0]}") from failed[0]
+
+    def close(self):
+        if not self._threads:
+            return
+        try:
+            self.flush()
+        finally:
+            for jobs in self._queues:
+                jobs.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+    def stats(self):
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'depth': self.depth(),
+                'max_depth': self.max_depth,
+                'blocked': self.blocked,
+                'write_seconds': self.write_seconds,
+                'errors': sum(len(failures) for failures in self.errors.values()),
+            }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_io_pool():
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = IOPool()
+    return _shared
+
+
+def shared_io_pool():
+    # The shared pool if anything has started it, without starting one.
+    return _shared
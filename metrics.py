@@ -0,0 +1,222 @@
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+import persistence
+from clock import GameClock
+from content import ContentRegistry
+from iopool import IOPool, shared_io_pool
+from persistence import StateStore
+from savedb import SaveDatabase
+from snapshots import SnapshotLog
+
+# Upper bounds in seconds, from 10us to 10s.
+BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0,
+           2.5, 5.0, 10.0)
+
+# Nothing here costs anything until enable() is called: it swaps timing
+# wrappers in for the methods below, and disable() puts the originals back.
+INSTRUMENTED = (
+    (GameClock, ('advance', 'pause')),
+    (ContentRegistry, ('_load', '_install')),
+    (StateStore, ('load', 'flush')),
+    (SaveDatabase, ('load', 'catalog')),
+    (SnapshotLog, ('checkpoint', 'rewind')),
+    # Each background write, from the pool thread that ran it.
+    (IOPool, ('_execute',)),
+)
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        # The upper bound of the bucket holding the q-th observation.
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    def __init__(self):
+        self.calls = {}
+        self.commands = {}
+        self.file_opens = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    def observe(self, table, name, seconds):
+        with self._lock:
+            histogram = table.get(name)
+            if histogram is None:
+                histogram = table[name] = Histogram()
+            histogram.observe(seconds)
+
+    def wrote(self, size):
+        with self._lock:
+            self.bytes_written += size
+
+    def to_dict(self):
+        def summary(table):
+            return {
+                name: {
+                    'count': histogram.count,
+                    'seconds': histogram.total,
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99),
+                    'buckets': dict(zip([str(bound) for bound in BUCKETS] + ['+Inf'], histogram.counts)),
+                }
+                for name, histogram in sorted(table.items())
+            }
+        return {
+            'calls': summary(self.calls),
+            'commands': summary(self.commands),
+            'file_opens': self.file_opens,
+            'bytes_written': self.bytes_written,
+            'io_pool': io_pool_stats(),
+        }
+
+    def to_prometheus(self):
+        lines = []
+        for metric, label, table, what in (
+            ('game_call_seconds', 'function', self.calls, "Time spent in instrumented game functions."),
+            ('game_command_seconds', 'command', self.commands, "Time to run a player command."),
+        ):
+            lines.append(f"# HELP {metric} {what}")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, histogram in sorted(table.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.total!r}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {histogram.count}')
+        lines.append("# HELP game_file_opens_total Files opened by the game.")
+        lines.append("# TYPE game_file_opens_total counter")
+        lines.append(f"game_file_opens_total {self.file_opens}")
+        lines.append("# HELP game_file_bytes_written_total Bytes written to save, state and journal files.")
+        lines.append("# TYPE game_file_bytes_written_total counter")
+        lines.append(f"game_file_bytes_written_total {self.bytes_written}")
+        io = io_pool_stats()
+        for metric, kind, key, what in (
+            ('game_io_queue_depth', 'gauge', 'depth', "Writes waiting in the background I/O queues."),
+            ('game_io_queue_max_depth', 'gauge', 'max_depth', "Deepest any background I/O queue has been."),
+            ('game_io_blocked_total', 'counter', 'blocked', "Writes that waited for room in a full I/O queue."),
+            ('game_io_writes_total', 'counter', 'completed', "Background writes finished."),
+            ('game_io_errors', 'gauge', 'errors', "Background writes failed and not yet reported."),
+        ):
+            lines.append(f"# HELP {metric} {what}")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {io[key]}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        # .prom (or .txt) for the Prometheus text format, JSON otherwise.
+        if path.endswith(('.prom', '.txt')):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.to_dict(), indent=4)
+        with open(path, 'w') as f:
+            f.write(text)
+
+
+def io_pool_stats():
+    pool = shared_io_pool()
+    if pool is None:
+        return {'submitted': 0, 'completed': 0, 'depth': 0, 'max_depth': 0, 'blocked': 0, 'write_seconds': 0.0,
+                'errors': 0}
+    return pool.stats()
+
+
+METRICS = Metrics()
+_patched = []
+_counting_opens = [False]
+
+
+def _audit(event, args):
+    if event == 'open' and _counting_opens[0]:
+        METRICS.file_opens += 1
+
+
+def timed(function, table, name):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            METRICS.observe(table, name, time.perf_counter() - started)
+    return wrapper
+
+
+def patch(owner, name, wrapper):
+    original = owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)
+    _patched.append((owner, name, original))
+    setattr(owner, name, wrapper)
+
+
+def player_methods(player_class):
+    return ['__init__'] + [name for name, value in vars(player_class).items()
+                           if callable(value) and not name.startswith('__')]
+
+
+def enable(player_class, commands):
+    # player_class and commands are Adventure's Player and COMMANDS, passed
+    # in rather than imported so this works when Adventure runs as __main__.
+    if _patched:
+        return METRICS
+    for cls, names in ((player_class, player_methods(player_class)),) + INSTRUMENTED:
+        for name in names:
+            patch(cls, name, timed(cls.__dict__[name], METRICS.calls, f"{cls.__name__}.{name}"))
+    for command in commands.commands:
+        patch(command, 'handler', timed(command.handler, METRICS.commands, command.name))
+
+    def atomic_write_json(path, data, _original=persistence.atomic_write_json):
+        _original(path, data)
+        METRICS.wrote(os.path.getsize(path))
+    patch(persistence, 'atomic_write_json', atomic_write_json)
+
+    def journal_write(self, f, text, _original=SnapshotLog._write):
+        _original(self, f, text)
+        METRICS.wrote(len(text.encode('utf-8')))
+    patch(SnapshotLog, '_write', journal_write)
+
+    def save(self, name, data, owner='', _original=SaveDatabase.save):
+        _original(self, name, data, owner)
+        METRICS.wrote(len(json.dumps(data)))
+    patch(SaveDatabase, 'save', timed(save, METRICS.calls, 'SaveDatabase.save'))
+
+    # Audit hooks can't be removed, so this one stays and is switched off.
+    if not getattr(_audit, 'installed', False):
+        sys.addaudithook(_audit)
+        _audit.installed = True
+    _counting_opens[0] = True
+    return METRICS
+
+
+def disable():
+    _counting_opens[0] = False
+    while _patched:
+        owner, name, original = _patched.pop()
+        setattr(owner, name, original)
@@ -0,0 +1,131 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+from iopool import get_io_pool
+
+
+def atomic_write_json(path, data):
+    # Write to a temp file in the same directory and rename it over the target,
+    # so a crash leaves either the old file or the new one, never half of one.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class StateStore:
+    # With an IOPool, flush() takes each file's snapshot on the calling
+    # thread and leaves encoding and writing it to the pool; without one it
+    # writes before returning. Snapshots read the game's live state, so
+    # flush() is only called from the game thread, between turns.
+    def __init__(self, flush_interval=None, flush_at_exit=True, io=None):
+        self.flush_interval = flush_interval
+        self.io = io
+        self.writes = 0
+        self.writes_avoided = 0
+        self._dirty = {}
+        self._lock = threading.Lock()
+        # With flush_interval, when the files marked dirty are next due to
+        # be written.
+        self._due = None
+        if flush_at_exit:
+            atexit.register(self.flush)
+
+    def load(self, path):
+        if self.io is not None:
+            self.io.wait(path)
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def mark_dirty(self, path, snapshot):
+        # snapshot is called at flush time, so repeated saves of the same file
+        # within a turn collapse into a single write of the latest state.
+        with self._lock:
+            if path in self._dirty:
+                self.writes_avoided += 1
+            self._dirty[path] = snapshot
+            if self.flush_interval is not None and self._due is None:
+                self._due = time.monotonic() + self.flush_interval
+
+    def is_dirty(self, path=None):
+        if path is None:
+            return bool(self._dirty)
+        return path in self._dirty
+
+    def end_turn(self):
+        # Flushes at a turn boundary: every turn, or with flush_interval only
+        # once that long has passed since the first unwritten save.
+        if self.flush_interval is None or (self._due is not None and time.monotonic() >= self._due):
+            return self.flush()
+        return 0
+
+    def flush(self):
+        with self._lock:
+            pending, self._dirty = self._dirty, {}
+            self._due = None
+        for path, snapshot in pending.items():
+            if self.io is not None:
+                self.io.submit(path, atomic_write_json, path, snapshot())
+            else:
+                atomic_write_json(path, snapshot())
+            self.writes += 1
+        return len(pending)
+
+    def wait(self, paths):
+        # Blocks until the pool has written what was flushed to paths, and
+        # raises if one of those writes failed. Other files on the pool, such
+        # as another session's, aren't waited for.
+        if self.io is not None:
+            self.io.flush(paths)
+
+    def stats(self):
+        return {
+            'writes': self.writes,
+            'writes_avoided': self.writes_avoided,
+            'pending': len(self._dirty),
+        }
+
+
+class NullStore(StateStore):
+    # For headless runs: nothing is read from or written to disk.
+    def __init__(self):
+        super().__init__(flush_at_exit=False)
+
+    def load(self, path):
+        return None
+
+    def flush(self):
+        with self._lock:
+            pending, self._dirty = self._dirty, {}
+        self.writes_avoided += len(pending)
+        return 0
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_store():
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = StateStore(io=get_io_pool())
+    return _shared
@@ -0,0 +1,418 @@
+from collections.abc import MutableMapping
+
+from content import STAT_FIELDS
+
+# Compact containers for per-player state. A server keeps one Player per
+# session, so these trade dicts and lists for flat arrays and bitsets.
+
+# Above this many location IDs a LocationSet is sparse rather than a bitset.
+DENSE_LOCATIONS = 4096
+# IDs per chunk of a sparse LocationSet.
+SPARSE_CHUNK = 4096
+
+_slot_layouts = {}
+
+
+def slot_layout(slots):
+    # Name -> index and index -> name for a slot enum, built once per enum
+    # and shared by every Equipment that uses it.
+    layout = _slot_layouts.get(slots)
+    if layout is None:
+        layout = ({slot.name: slot.value for slot in slots}, tuple(slot.name for slot in slots))
+        _slot_layouts[slots] = layout
+    return layout
+
+
+class Equipment(MutableMapping):
+    # What is equipped in each slot, stored in a list indexed by the slot
+    # enum the item catalog derives from the item types in items.json. It
+    # still reads and writes like the old slot-name -> item dict.
+    #
+    # Given the content registry, it follows the current catalog's slots: if
+    # items.json is reloaded with new item types, the gear is moved over to
+    # the new layout on next use.
+    __slots__ = ('_content', '_slots', '_slot_index', '_slot_names', '_items')
+
+    def __init__(self, slots, equipped=None, content=None):
+        self._content = content
+        self._bind(slots)
+        self._items = [None] * len(self._slot_names)
+        if equipped:
+            self.update_known(equipped)
+
+    def _bind(self, slots):
+        self._slots = slots
+        self._slot_index, self._slot_names = slot_layout(slots)
+
+    def _follow(self):
+        # Only a hot-reloading registry ever swaps its catalog.
+        if self._content is not None and self._content.hot_reload:
+            slots = self._content.items.slots
+            if slots is not self._slots:
+                equipped = dict(self.equipped())
+                self._bind(slots)
+                self._items = [None] * len(self._slot_names)
+                self.update_known(equipped)
+
+    def update_known(self, equipped):
+        # Saved equipment may name slots that no longer exist; skip those.
+        self._follow()
+        for slot, item_name in equipped.items():
+            index = self._slot_index.get(slot)
+            if index is not None:
+                self._items[index] = item_name
+
+    def __getitem__(self, slot):
+        self._follow()
+        return self._items[self._slot_index[slot]]
+
+    def __setitem__(self, slot, item_name):
+        self._follow()
+        self._items[self._slot_index[slot]] = item_name
+
+    def __delitem__(self, slot):
+        self._follow()
+        self._items[self._slot_index[slot]] = None
+
+    def __contains__(self, slot):
+        self._follow()
+        return slot in self._slot_index
+
+    def __iter__(self):
+        self._follow()
+        return iter(self._slot_names)
+
+    def __len__(self):
+        self._follow()
+        return len(self._slot_names)
+
+    def equipped(self):
+        return [(self._slot_names[index], item) for index, item in enumerate(self._items) if item is not None]
+
+    def to_dict(self):
+        self._follow()
+        return dict(zip(self._slot_names, self._items))
+
+    def snapshot(self):
+        self._follow()
+        return tuple(self._items)
+
+    def restore(self, snapshot):
+        self._items = list(snapshot)
+
+
+class LocationSet:
+    # A set of location names kept as a bitset over the interned location IDs.
+    # Over a large ID space, such as a generated world, one bitset would grow
+    # with the highest ID visited, so the IDs are kept in a chunked bitmap
+    # instead: chunk number -> bits of SPARSE_CHUNK IDs. Adding a room touches
+    # one chunk, and a snapshot copies the chunk table, not the rooms.
+    __slots__ = ('_ids', '_bits', '_snapshot')
+
+    def __init__(self, ids, names=()):
+        self._ids = ids
+        self._bits = 0 if len(ids) <= DENSE_LOCATIONS else {}
+        self._snapshot = None
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        location_id = self._ids.id_of(name)
+        if type(self._bits) is int:
+            self._bits |= 1 << location_id
+            return
+        chunk, bit = divmod(location_id, SPARSE_CHUNK)
+        word = self._bits.get(chunk, 0)
+        if not (word >> bit) & 1:
+            self._bits[chunk] = word | (1 << bit)
+            self._snapshot = None
+
+    def __contains__(self, name):
+        location_id = self._ids.get(name)
+        if location_id is None:
+            return False
+        if type(self._bits) is int:
+            return (self._bits >> location_id) & 1 == 1
+        chunk, bit = divmod(location_id, SPARSE_CHUNK)
+        return (self._bits.get(chunk, 0) >> bit) & 1 == 1
+
+    def __iter__(self):
+        if type(self._bits) is int:
+            words = ((0, self._bits),)
+        else:
+            words = ((chunk * SPARSE_CHUNK, self._bits[chunk]) for chunk in sorted(self._bits))
+        for base, bits in words:
+            while bits:
+                lowest = bits & -bits
+                yield self._ids.name_of(base + lowest.bit_length() - 1)
+                bits ^= lowest
+
+    def __len__(self):
+        if type(self._bits) is int:
+            return self._bits.bit_count()
+        return sum(word.bit_count() for word in self._bits.values())
+
+    def clear(self):
+        self._bits = 0 if type(self._bits) is int else {}
+        self._snapshot = None
+
+    # Python ints are immutable, so the bits can be shared by a snapshot
+    # as-is. A chunk table is copied once per change and the copy is never
+    # modified, so snapshots can share that too.
+    def snapshot(self):
+        if type(self._bits) is int:
+            return self._bits
+        if self._snapshot is None:
+            self._snapshot = dict(self._bits)
+        return self._snapshot
+
+    def restore(self, bits):
+        if type(bits) is int:
+            self._bits = bits
+            self._snapshot = None
+        elif type(bits) is dict:
+            self._bits = dict(bits)
+            self._snapshot = bits
+        else:
+            # A list of IDs, from journals written before chunk tables.
+            self._bits = {}
+            self._snapshot = None
+            for location_id in bits:
+                chunk, bit = divmod(location_id, SPARSE_CHUNK)
+                self._bits[chunk] = self._bits.get(chunk, 0) | (1 << bit)
+
+
+def added_locations(before, after):
+    # The IDs set in chunk table `after` but not in `before`, or None if any
+    # ID was taken away, so a journal can record a visit as just the new IDs.
+    added = []
+    for chunk, word in after.items():
+        old = before.get(chunk, 0)
+        if word == old:
+            continue
+        if old & ~word:
+            return None
+        new = word & ~old
+        base = chunk * SPARSE_CHUNK
+        while new:
+            lowest = new & -new
+            added.append(base + lowest.bit_length() - 1)
+            new ^= lowest
+    if any(chunk not in after for chunk in before):
+        return None
+    return added
+
+
+def add_locations(bits, location_ids):
+    # A new chunk table: `bits` with location_ids set.
+    bits = dict(bits)
+    for location_id in location_ids:
+        chunk, bit = divmod(location_id, SPARSE_CHUNK)
+        bits[chunk] = bits.get(chunk, 0) | (1 << bit)
+    return bits
+
+
+class Inventory:
+    # Items carried, as counted stacks keyed by the item catalog's IDs, so
+    # holding, adding and removing an item cost a dict lookup however much
+    # is carried. Per-type totals answer "any trap kit?" the same way.
+    # Iterating and len() still see one entry per item, like the old list.
+    #
+    # Given the content registry, it follows the current catalog: item IDs
+    # are only fixed for one catalog, so after items.json is reloaded the
+    # stacks are re-keyed by name on next use.
+    __slots__ = ('_content', '_catalog', '_counts', '_type_counts', '_snapshot')
+
+    def __init__(self, catalog, items=None, content=None):
+        self._content = content
+        self._catalog = catalog
+        self._counts = {}
+        self._type_counts = {}
+        self._snapshot = ()
+        if items:
+            self.update_known(items)
+
+    def _follow(self):
+        # Only a hot-reloading registry ever swaps its catalog.
+        if self._content is not None and self._content.hot_reload:
+            catalog = self._content.items
+            if catalog is not self._catalog:
+                stacks = self._stacks()
+                self._catalog = catalog
+                self.clear()
+                self.update_known(dict(stacks))
+
+    def update_known(self, items):
+        # Saved inventories are {name: count}; older ones are lists of names.
+        # Items no longer in the catalog are skipped.
+        self._follow()
+        pairs = items.items() if isinstance(items, dict) else ((name, 1) for name in items)
+        for name, count in pairs:
+            if name in self._catalog:
+                self.add(name, count)
+
+    def add(self, name, count=1):
+        # Adds up to the item's stack limit and returns how many were added.
+        self._follow()
+        item_id = self._catalog.id_of(name)
+        held = self._counts.get(item_id, 0)
+        count = min(count, self._catalog.stack_limit(name) - held)
+        if count <= 0:
+            return 0
+        self._counts[item_id] = held + count
+        item_type = self._catalog.type_of(name)
+        self._type_counts[item_type] = self._type_counts.get(item_type, 0) + count
+        self._snapshot = None
+        return count
+
+    def remove(self, name, count=1):
+        self._follow()
+        item_id = self._catalog.id_of(name)
+        held = self._counts.get(item_id, 0)
+        if held < count:
+            raise ValueError(f"{name} x{count} is not in the inventory")
+        if held == count:
+            del self._counts[item_id]
+        else:
+            self._counts[item_id] = held - count
+        item_type = self._catalog.type_of(name)
+        self._type_counts[item_type] -= count
+        self._snapshot = None
+
+    def count(self, name):
+        self._follow()
+        return self._counts.get(self._catalog.id_of(name), 0)
+
+    def __contains__(self, name):
+        self._follow()
+        return self._catalog.id_of(name) in self._counts
+
+    def has_type(self, item_type):
+        self._follow()
+        return self._type_counts.get(item_type, 0) > 0
+
+    def type_count(self, item_type):
+        self._follow()
+        return self._type_counts.get(item_type, 0)
+
+    def first_of_type(self, item_type):
+        # The first item carried of a type, e.g. which trap kit to use.
+        if not self.has_type(item_type):
+            return None
+        for name in self._catalog.of_type(item_type):
+            if name in self:
+                return name
+
+    def stacks(self):
+        self._follow()
+        return self._stacks()
+
+    def _stacks(self):
+        name_of = self._catalog.name_of
+        return [(name_of(item_id), count) for item_id, count in self._counts.items()]
+
+    def __iter__(self):
+        for name, count in self.stacks():
+            for _ in range(count):
+                yield name
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    def clear(self):
+        self._counts.clear()
+        self._type_counts.clear()
+        self._snapshot = ()
+
+    def to_dict(self):
+        return dict(self.stacks())
+
+    # A tuple of names like the old list's, kept until the next change so
+    # per-turn checkpoints of an unchanged inventory cost nothing.
+    def snapshot(self):
+        self._follow()
+        if self._snapshot is None:
+            self._snapshot = tuple(self)
+        return self._snapshot
+
+    def restore(self, snapshot):
+        self.clear()
+        self.update_known(snapshot)
+
+
+class Stats:
+    # Derived stats kept as cached totals of
+    #     (base + equipped gear + additive modifiers) * multiplicative modifiers.
+    # Equipping, unequipping and changing a modifier recompute only the
+    # totals they touch, so combat reads a dict entry however many slots and
+    # modifiers there are. Modifiers are keyed by their source, so a buff
+    # can be replaced or removed by name.
+    __slots__ = ('_base', '_gear', '_modifiers', '_sources', '_totals')
+
+    def __init__(self, base):
+        self._base = dict(base)
+        self._gear = dict.fromkeys(self._base, 0.0)
+        self._modifiers = {field: {} for field in self._base}
+        self._sources = {}
+        self._totals = {}
+        for field in self._base:
+            self._refresh(field)
+
+    def __getitem__(self, field):
+        return self._totals[field]
+
+    def base(self, field):
+        return self._base[field]
+
+    def set_base(self, field, value):
+        self._base[field] = value
+        self._refresh(field)
+
+    def add_base(self, field, amount):
+        self.set_base(field, self._base[field] + amount)
+
+    def equip(self, item, sign=1):
+        # item is an Item from the catalog; its ratings count towards the
+        # stats of the same name.
+        for field in STAT_FIELDS:
+            value = getattr(item, field)
+            if value and field in self._gear:
+                self._gear[field] += sign * value
+                self._refresh(field)
+
+    def unequip(self, item):
+        self.equip(item, sign=-1)
+
+    def set_gear(self, items):
+        # Recounts all gear, for when equipment is replaced wholesale (a
+        # load or a rewind) rather than changed one slot at a time.
+        for field in self._gear:
+            self._gear[field] = 0.0
+        for item in items:
+            for field in STAT_FIELDS:
+                if field in self._gear:
+                    self._gear[field] += getattr(item, field)
+        for field in self._gear:
+            self._refresh(field)
+
+    def add_modifier(self, source, field, add=0.0, multiply=1.0):
+        self.remove_modifier(source)
+        self._modifiers[field][source] = (add, multiply)
+        self._sources[source] = field
+        self._refresh(field)
+
+    def remove_modifier(self, source):
+        field = self._sources.pop(source, None)
+        if field is not None:
+            del self._modifiers[field][source]
+            self._refresh(field)
+
+    def _refresh(self, field):
+        total = self._base[field] + self._gear[field]
+        factor = 1.0
+        for add, multiply in self._modifiers[field].values():
+            total += add
+            factor *= multiply
+        total *= factor
+        # Gear ratings are floats; keep a whole total an int so it prints as one.
+        self._totals[field] = int(total) if total == int(total) else total
@@ -0,0 +1,117 @@
+import itertools
+import random
+
+# Decision points the game asks a policy about, with the answers it accepts.
+# Decisions with no fixed options (save names, commands) take free text.
+BATTLE_ACTIONS = ('attack', 'block', 'heal')
+ENCOUNTER_ACTIONS = ('fight', 'evade', 'negotiate')
+TRAP_ACTIONS = ('disarm', 'avoid')
+PLAYER_CLASSES = ('Warrior', 'Mage', 'Rogue')
+DIRECTIONS = ('north', 'south', 'east', 'west', 'random')
+
+
+class Policy:
+    def decide(self, player, decision, options, prompt):
+        raise NotImplementedError
+
+
+class ConsolePolicy(Policy):
+    def decide(self, player, decision, options, prompt):
+        return input(prompt)
+
+
+class ScriptedPolicy(Policy):
+    # Answers come from a list consumed in order, or from a dict of
+    # decision -> list that is cycled per decision. Once a list runs out the
+    # default is used, or the first option if there is no default.
+    def __init__(self, script, default=None):
+        self.default = default
+        if isinstance(script, dict):
+            self._by_decision = {decision: itertools.cycle(answers) for decision, answers in script.items() if answers}
+            self._queue = None
+        else:
+            self._by_decision = None
+            self._queue = iter(script)
+
+    def decide(self, player, decision, options, prompt):
+        if self._by_decision is not None:
+            answers = self._by_decision.get(decision)
+            if answers is not None:
+                return next(answers)
+        elif self._queue is not None:
+            answer = next(self._queue, None)
+            if answer is not None:
+                return answer
+        if self.default is not None:
+            return self.default
+        return options[0] if options else ''
+
+
+class BatchPolicy(Policy):
+    # Reads answers a line at a time from a file or pipe, skipping blank
+    # lines and # comments, so a script drives the game without prompts.
+    # When the input runs out the game is told to quit.
+    def __init__(self, lines, end='quit'):
+        self._lines = iter(lines)
+        self.end = end
+
+    def decide(self, player, decision, options, prompt):
+        for line in self._lines:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                return line
+        if decision == 'command':
+            return self.end
+        return options[0] if options else ''
+
+
+class RandomPolicy(Policy):
+    def __init__(self, rng=None, default=''):
+        self.rng = rng if rng is not None else random.Random()
+        self.default = default
+
+    def decide(self, player, decision, options, prompt):
+        if options:
+            return self.rng.choice(options)
+        return self.default
+
+
+class GreedyPolicy(Policy):
+    # Always takes the locally best-looking option: heal when low and able,
+    # otherwise attack; always stand and fight; disarm only with a kit.
+    def __init__(self, heal_below=0.35, default=''):
+        self.heal_below = heal_below
+        self.default = default
+
+    def decide(self, player, decision, options, prompt):
+        if decision == 'battle':
+            if player.health < player.max_health * self.heal_below and 'Health Potion' in player.inventory:
+                return 'heal'
+            return 'attack'
+        if decision == 'encounter':
+            return 'fight'
+        if decision == 'trap':
+            if player.inventory.has_type('trap_disarmament_item'):
+                return 'disarm'
+            return 'avoid'
+        if options:
+            return options[0]
+        return self.default
+
+
+class CallbackPolicy(Policy):
+    def __init__(self, callback):
+        self.callback = callback
+
+    def decide(self, player, decision, options, prompt):
+        return self.callback(player, decision, options, prompt)
+
+
+POLICIES = {
+    'console': ConsolePolicy,
+    'scripted': ScriptedPolicy,
+    'batch': BatchPolicy,
+    'random': RandomPolicy,
+    'greedy': GreedyPolicy,
+    'callback': CallbackPolicy,
+}
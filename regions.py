@@ -0,0 +1,414 @@
+import argparse
+import heapq
+import json
+import mmap
+import os
+import random
+import re
+import struct
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from content import get_content
+from world import EXITS
+
+# Generated worlds: a width x height grid of rooms, each one of the
+# hand-written locations used as an archetype (its description and spawn
+# table), named like "Forest (12, 40)". Rooms are made a square chunk at a
+# time, either generated on demand from a seed or read from a chunk file
+# built ahead of time, and only the chunks around the player are kept, in a
+# small LRU cache. A move touches the current room's chunk and at most one
+# neighbour, whatever the size of the world.
+
+CHUNK_SIZE = 32
+REGION_CACHE_SIZE = 64
+# Rooms a route search may visit before giving up.
+ROUTE_BUDGET = 100000
+# Rooms in a biome: neighbours mostly share an archetype.
+BIOME_SIZE = 8
+STRAY_CHANCE = 1 / 8
+# Extra openings on top of the spanning maze, so there is more than one way round.
+LOOP_CHANCE = 0.35
+
+CHUNK_MAGIC = b'WAREGION'
+CHUNK_FORMAT = 1
+# magic, format, width, height, chunk size, length of the archetype list, seed
+CHUNK_HEADER = struct.Struct('=8sIIIIIQ')
+
+EXIT_BITS = {'north': 1, 'south': 2, 'east': 4, 'west': 8}
+STEPS = (('north', 1, 0, -1), ('south', 2, 0, 1), ('east', 4, 1, 0), ('west', 8, -1, 0))
+ROOM_NAME = re.compile(r'^(.*) \((\d+), (\d+)\)$')
+MASK = (1 << 64) - 1
+
+
+def mix(seed, x, y, salt):
+    # A 64-bit hash of a position, so any room can be generated on its own
+    # and two neighbouring chunks agree on the passage between them.
+    h = (seed * 0x9E3779B97F4A7C15 + x * 0xBF58476D1CE4E5B9 + y * 0x94D049BB133111EB + salt) & MASK
+    h ^= h >> 31
+    h = (h * 0xD6E8FEB86659FD93) & MASK
+    h ^= h >> 32
+    h = (h * 0xD6E8FEB86659FD93) & MASK
+    return h ^ (h >> 32)
+
+
+class Region:
+    # One chunk: a byte per room for its archetype and a byte for its exits,
+    # row by row.
+    __slots__ = ('cx', 'cy', 'archetypes', 'exits')
+
+    def __init__(self, cx, cy, archetypes, exits):
+        self.cx = cx
+        self.cy = cy
+        self.archetypes = archetypes
+        self.exits = exits
+
+
+class RegionGenerator:
+    # Rooms from a seed. Passages form a binary-tree maze (every room opens
+    # north or west, back towards the corner) so every room can reach every
+    # other one, plus LOOP_CHANCE of the remaining walls knocked through.
+    # Each chunk draws from its own random stream, seeded from the world seed
+    # and its position, so any chunk can be made without the others; a
+    # chunk's south and east exits are the walls its neighbours own.
+    def __init__(self, seed, width, height, archetypes, chunk_size=CHUNK_SIZE, start_archetype='Town'):
+        if not 0 < len(archetypes) < 256:
+            raise ValueError("a generated world needs between 1 and 255 archetypes")
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.archetypes = tuple(archetypes)
+        self.chunk_size = chunk_size
+        self.start = (width // 2, height // 2)
+        self._start_archetype = self.archetypes.index(start_archetype) if start_archetype in self.archetypes else None
+
+    def _walls(self, cx, cy):
+        # The open north and west walls of every room in a chunk, as exit bits.
+        size = self.chunk_size
+        rng = random.Random(mix(self.seed, cx, cy, 3))
+        loop = int(LOOP_CHANCE * 1024)
+        walls = bytearray(size * size)
+        for row in range(size):
+            y = cy * size + row
+            for column in range(size):
+                x = cx * size + column
+                bits = rng.getrandbits(21)
+                if y == 0:
+                    north, west = False, x > 0
+                elif x == 0:
+                    north, west = True, False
+                else:
+                    north = bool(bits & 1)
+                    west = not north
+                    if not north:
+                        north = (bits >> 1) & 1023 < loop
+                    else:
+                        west = (bits >> 11) & 1023 < loop
+                walls[row * size + column] = (1 if north else 0) | (8 if west else 0)
+        return walls
+
+    def _archetypes(self, cx, cy):
+        size = self.chunk_size
+        count = len(self.archetypes)
+        rng = random.Random(mix(self.seed, cx, cy, 1))
+        biomes = {}
+        archetypes = bytearray(size * size)
+        for row in range(size):
+            y = cy * size + row
+            for column in range(size):
+                x = cx * size + column
+                if rng.random() < STRAY_CHANCE:
+                    archetypes[row * size + column] = rng.randrange(count)
+                    continue
+                block = (x // BIOME_SIZE, y // BIOME_SIZE)
+                biome = biomes.get(block)
+                if biome is None:
+                    biome = biomes[block] = mix(self.seed, block[0], block[1], 2) % count
+                archetypes[row * size + column] = biome
+        start_x, start_y = self.start
+        if self._start_archetype is not None and start_x // size == cx and start_y // size == cy:
+            archetypes[(start_y % size) * size + start_x % size] = self._start_archetype
+        return archetypes
+
+    def load(self, cx, cy):
+        size = self.chunk_size
+        walls = self._walls(cx, cy)
+        below = self._walls(cx, cy + 1) if (cy + 1) * size < self.height else None
+        right = self._walls(cx + 1, cy) if (cx + 1) * size < self.width else None
+        exits = bytearray(size * size)
+        for row in range(size):
+            y = cy * size + row
+            if y >= self.height:
+                break
+            for column in range(size):
+                x = cx * size + column
+                if x >= self.width:
+                    break
+                index = row * size + column
+                room = walls[index]
+                # South: the north wall of the room below; east: the west
+                # wall of the room to the right, possibly in the next chunk.
+                if y + 1 < self.height:
+                    south = walls[index + size] if row + 1 < size else below[column]
+                    if south & 1:
+                        room |= 2
+                if x + 1 < self.width:
+                    east = walls[index + 1] if column + 1 < size else right[row * size]
+                    if east & 8:
+                        room |= 4
+                exits[index] = room
+        return Region(cx, cy, bytes(self._archetypes(cx, cy)), bytes(exits))
+
+
+class ChunkFile:
+    # A world written by write_chunks: a header, the archetype names as JSON,
+    # then every chunk as a fixed-size record, so chunk (cx, cy) is one slice
+    # of the memory-mapped file and only the pages of visited chunks are read.
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, self.chunk_size, names_size, self.seed = \
+            CHUNK_HEADER.unpack_from(self._map)
+        if magic != CHUNK_MAGIC or version != CHUNK_FORMAT:
+            self._map.close()
+            raise ValueError(f"{path} is not a format {CHUNK_FORMAT} chunk file.")
+        start = CHUNK_HEADER.size
+        header = json.loads(self._map[start:start + names_size])
+        self.archetypes = tuple(header['archetypes'])
+        self.start = tuple(header['start'])
+        self._data = start + names_size
+        self._chunks_across = -(-self.width // self.chunk_size)
+        self._record = 2 * self.chunk_size * self.chunk_size
+
+    def load(self, cx, cy):
+        offset = self._data + (cy * self._chunks_across + cx) * self._record
+        half = self._record // 2
+        return Region(cx, cy, self._map[offset:offset + half], self._map[offset + half:offset + self._record])
+
+    def close(self):
+        self._map.close()
+
+
+def write_chunks(path, source):
+    header = json.dumps({'archetypes': list(source.archetypes), 'start': list(source.start)}).encode('utf-8')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(CHUNK_HEADER.pack(CHUNK_MAGIC, CHUNK_FORMAT, source.width, source.height, source.chunk_size,
+                                  len(header), source.seed))
+        f.write(header)
+        for cy in range(-(-source.height // source.chunk_size)):
+            for cx in range(-(-source.width // source.chunk_size)):
+                region = source.load(cx, cy)
+                f.write(region.archetypes)
+                f.write(region.exits)
+    os.replace(tmp_path, path)
+
+
+class RoomIds:
+    # Location IDs for LocationSet: a room's ID is its index in the grid, so
+    # it needs no table and is the same in every process.
+    def __init__(self, world):
+        self._world = world
+
+    def id_of(self, name):
+        location_id = self.get(name)
+        if location_id is None:
+            raise KeyError(name)
+        return location_id
+
+    def get(self, name):
+        position = self._world.locate(name)
+        if position is None:
+            return None
+        return position[1] * self._world.width + position[0]
+
+    def name_of(self, location_id):
+        return self._world.room_name(location_id % self._world.width, location_id // self._world.width)
+
+    def __len__(self):
+        return self._world.width * self._world.height
+
+
+class RegionWorld:
+    # The world interface the Player moves through (see WorldGraph) over
+    # generated rooms. archetype() maps a room to the hand-written location
+    # whose description and spawn table it uses.
+    def __init__(self, source, cache_size=REGION_CACHE_SIZE):
+        self.source = source
+        self.width = source.width
+        self.height = source.height
+        self.chunk_size = source.chunk_size
+        self.archetypes = source.archetypes
+        self._by_lower = {name.lower(): index for index, name in enumerate(self.archetypes)}
+        self.cache_size = cache_size
+        self._regions = OrderedDict()
+        self.loads = 0
+        self.ids = RoomIds(self)
+        self.start = self.room_name(*source.start)
+        # A chunk file and the generator it was built from make the same
+        # rooms, so either can pick up the other's saves.
+        self.identity = f"regions:{source.seed}:{self.width}x{self.height}:{self.chunk_size}"
+
+    def __len__(self):
+        return self.width * self.height
+
+    def region(self, cx, cy):
+        key = (cx, cy)
+        region = self._regions.get(key)
+        if region is not None:
+            self._regions.move_to_end(key)
+            return region
+        region = self._regions[key] = self.source.load(cx, cy)
+        self.loads += 1
+        if len(self._regions) > self.cache_size:
+            self._regions.popitem(last=False)
+        return region
+
+    def _room(self, x, y):
+        # (archetype index, exit bits) of the room at x, y.
+        size = self.chunk_size
+        region = self.region(x // size, y // size)
+        index = (y % size) * size + x % size
+        return region.archetypes[index], region.exits[index]
+
+    def room_name(self, x, y):
+        return f"{self.archetypes[self._room(x, y)[0]]} ({x}, {y})"
+
+    def locate(self, name, any_case=False):
+        # The (x, y) of a room name, or None if there is no such room.
+        match = ROOM_NAME.match(name)
+        if match is None:
+            return None
+        archetype, x, y = match.group(1), int(match.group(2)), int(match.group(3))
+        if x >= self.width or y >= self.height:
+            return None
+        actual = self.archetypes[self._room(x, y)[0]]
+        if actual != archetype and not (any_case and actual.lower() == archetype.lower()):
+            return None
+        return x, y
+
+    def archetype(self, location):
+        position = self.locate(location)
+        if position is None:
+            return None
+        return self.archetypes[self._room(*position)[0]]
+
+    def find(self, name):
+        position = self.locate(name.strip(), any_case=True)
+        return None if position is None else self.room_name(*position)
+
+    def destination(self, location, direction):
+        position = self.locate(location)
+        if position is None:
+            return None
+        x, y = position
+        bit = EXIT_BITS[direction]
+        if not self._room(x, y)[1] & bit:
+            return None
+        for name, step_bit, dx, dy in STEPS:
+            if step_bit == bit:
+                return self.room_name(x + dx, y + dy)
+
+    def open_exits(self, location):
+        position = self.locate(location)
+        if position is None:
+            return []
+        exits = self._room(*position)[1]
+        return [direction for direction in EXITS if exits & EXIT_BITS[direction]]
+
+    def wander_targets(self, location):
+        position = self.locate(location)
+        if position is None:
+            return ()
+        x, y = position
+        exits = self._room(x, y)[1]
+        return tuple(self.room_name(x + dx, y + dy) for _, bit, dx, dy in STEPS if exits & bit)
+
+    def route(self, source, target, budget=ROUTE_BUDGET):
+        # A* over the grid with the Manhattan distance, giving up (None) after
+        # visiting budget rooms so a far-off target can't load the whole world.
+        start, goal = self.locate(source), self.locate(target)
+        if start is None or goal is None:
+            return None
+        gx, gy = goal
+        came_from = {start: None}
+        cost = {start: 0}
+        frontier = [(abs(start[0] - gx) + abs(start[1] - gy), 0, start)]
+        while frontier and len(came_from) <= budget:
+            _, steps, position = heapq.heappop(frontier)
+            if position == goal:
+                route = []
+                while came_from[position] is not None:
+                    position, direction = came_from[position]
+                    route.append(direction)
+                route.reverse()
+                return route
+            if steps > cost[position]:
+                continue
+            x, y = position
+            exits = self._room(x, y)[1]
+            for direction, bit, dx, dy in STEPS:
+                if exits & bit:
+                    neighbour = (x + dx, y + dy)
+                    if steps + 1 < cost.get(neighbour, steps + 2):
+                        cost[neighbour] = steps + 1
+                        came_from[neighbour] = (position, direction)
+                        heapq.heappush(frontier, (steps + 1 + abs(neighbour[0] - gx) + abs(neighbour[1] - gy),
+                                                  steps + 1, neighbour))
+        return None
+
+
+def open_world(path=None, seed=0, width=1000, height=None, cache_size=REGION_CACHE_SIZE, content=None):
+    # A chunk file if path is given, otherwise rooms generated on demand from
+    # seed using every hand-written location as an archetype.
+    if path is not None:
+        return RegionWorld(ChunkFile(path), cache_size)
+    content = content if content is not None else get_content()
+    generator = RegionGenerator(seed, width, height if height is not None else width, list(content.locations))
+    return RegionWorld(generator, cache_size)
+
+
+def walk(world, moves, rng):
+    # A random walk through open exits; returns seconds per move.
+    location = world.start
+    started = time.perf_counter()
+    for _ in range(moves):
+        location = rng.choice(world.wander_targets(location))
+    return (time.perf_counter() - started) / moves
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a generated world into a chunk file, or time walking one.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    builder = commands.add_parser('build', help="generate a world and write it as a chunk file")
+    builder.add_argument('path')
+    walker = commands.add_parser('walk', help="time a random walk (on a chunk file, or generated on demand)")
+    walker.add_argument('path', nargs='?')
+    walker.add_argument('-n', '--moves', type=int, default=100000)
+    for command in (builder, walker):
+        command.add_argument('--seed', type=int, default=0)
+        command.add_argument('--size', type=int, default=1000, help="rooms along each side (default: 1000)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        generator = RegionGenerator(args.seed, args.size, args.size, list(get_content().locations))
+        started = time.perf_counter()
+        write_chunks(args.path, generator)
+        print(f"Wrote {args.size * args.size:,} rooms to {args.path} ({os.path.getsize(args.path):,} bytes) "
+              f"in {time.perf_counter() - started:.1f}s.")
+        return
+
+    per_move = walk(open_world(args.path, args.seed, args.size), args.moves, random.Random(args.seed))
+    # Memory from a second walk, since tracing slows every move down.
+    tracemalloc.start()
+    world = open_world(args.path, args.seed, args.size)
+    walk(world, args.moves, random.Random(args.seed))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{len(world):,} rooms: {per_move * 1e6:.1f} us/move over {args.moves:,} moves, "
+          f"{world.loads} chunk loads, peak {peak / 1024:.0f} K")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import sys
+from collections import namedtuple
+
+from policies import Policy
+
+Event = namedtuple('Event', ['kind', 'fields'])
+
+# Game output goes to a print-compatible callable: plain text through
+# say(...), and typed happenings through say.event(kind, template, fields),
+# which a text renderer formats and an event log keeps as data. Player.event
+# falls back to formatting and calling say for plain callables like print.
+
+
+class Renderer:
+    # Collects a turn's output and writes it with one write and one flush,
+    # to stdout or to any stream with write() and flush().
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.writes = 0
+        self._parts = []
+
+    def __call__(self, *values, sep=' ', end='\n', **kwargs):
+        self._parts.append(sep.join(str(value) for value in values) + end)
+
+    def event(self, kind, template, fields):
+        self._parts.append(template.format(**fields) + '\n')
+
+    def flush(self):
+        if not self._parts:
+            return
+        text = ''.join(self._parts)
+        self._parts.clear()
+        # Looked up at flush time so a redirected sys.stdout is honoured.
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(text)
+        stream.flush()
+        self.writes += 1
+
+
+class EventLog:
+    # Structured mode for simulations: events are kept as Event tuples and
+    # never formatted. Plain text is dropped unless messages is set, in
+    # which case it is kept as 'message' events.
+    def __init__(self, messages=False):
+        self.messages = messages
+        self.events = []
+
+    def __call__(self, *values, sep=' ', end='\n', **kwargs):
+        if self.messages:
+            self.events.append(Event('message', {'text': sep.join(str(value) for value in values)}))
+
+    def event(self, kind, template, fields):
+        self.events.append(Event(kind, fields))
+
+    def of_kind(self, kind):
+        return [event for event in self.events if event.kind == kind]
+
+    def clear(self):
+        self.events.clear()
+
+    def flush(self):
+        pass
+
+
+class Quiet:
+    # Discards everything without formatting it.
+    def __call__(self, *values, **kwargs):
+        pass
+
+    def event(self, kind, template, fields):
+        pass
+
+    def flush(self):
+        pass
+
+
+class FlushBeforePrompt(Policy):
+    # Whatever a turn has printed so far must be on screen before the player
+    # is asked anything.
+    def __init__(self, inner, flush):
+        self.inner = inner
+        self.flush = flush
+
+    def decide(self, player, decision, options, prompt):
+        self.flush()
+        return self.inner.decide(player, decision, options, prompt)
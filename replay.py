@@ -0,0 +1,196 @@
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from Adventure import main as play_game
+from engine import quiet
+from persistence import NullStore
+from policies import BatchPolicy, ConsolePolicy, Policy
+
+REPLAY_FORMAT = 1
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replays')
+
+# A replay file is JSON lines: a header with the RNG seed, one
+# [decision, answer] line per answer the game asked for, and a last line with
+# the final state. The answers are written as they are given, so a session
+# that crashes still leaves a replay of everything up to the crash.
+
+
+class ReplayDivergence(Exception):
+    pass
+
+
+class ReplayExhausted(Exception):
+    pass
+
+
+class RecordingPolicy(Policy):
+    def __init__(self, inner, log):
+        self.inner = inner
+        self.log = log
+
+    def decide(self, player, decision, options, prompt):
+        answer = self.inner.decide(player, decision, options, prompt)
+        self.log.write(json.dumps([decision, answer], separators=(',', ':')) + '\n')
+        self.log.flush()
+        return answer
+
+
+class ReplayPolicy(Policy):
+    def __init__(self, answers):
+        self.answers = answers
+        self.position = 0
+
+    def decide(self, player, decision, options, prompt):
+        if self.position >= len(self.answers):
+            raise ReplayExhausted()
+        recorded, answer = self.answers[self.position]
+        if recorded != decision:
+            raise ReplayDivergence(f"answer {self.position}: the game asked for {decision!r} "
+                                   f"but the recording has {recorded!r}")
+        self.position += 1
+        return answer
+
+
+def final_state(player):
+    # By name rather than by slot or location ID, so the check doesn't depend
+    # on how content happened to be numbered. Round-tripped through JSON so
+    # it compares equal to a recorded one.
+    return json.loads(json.dumps({
+        'turn': player.snapshots.turn,
+        'game_over': player.game_over,
+        'health': player.health,
+        'mana': player.mana,
+        'inventory': list(player.inventory),
+        'equipped': player.equipped_items.to_dict(),
+        'location': player.current_location,
+        'visited': sorted(player.visited_locations),
+    }))
+
+
+def run_session(policy, seed, output, pace):
+    # Every session starts from a fresh game: no saved inventory, no autosave
+    # to resume, nothing written where the player's real files live.
+    with tempfile.TemporaryDirectory() as state_dir:
+        return play_game(policy=policy, output=output, store=NullStore(), state_dir=state_dir,
+                         pace=pace, rng=random.Random(seed))
+
+
+def record(path, seed=None, script=None, output=print):
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    with open(path, 'w') as log:
+        log.write(json.dumps({'format': REPLAY_FORMAT, 'seed': seed}) + '\n')
+        if script is None:
+            policy, pace = RecordingPolicy(ConsolePolicy(), log), 1.0
+        else:
+            policy, pace = RecordingPolicy(BatchPolicy(script), log), 0
+        player = run_session(policy, seed, output, pace)
+        log.write(json.dumps({'final': final_state(player)}, separators=(',', ':')) + '\n')
+    return seed
+
+
+def load(path):
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    header = json.loads(lines[0])
+    if header.get('format') != REPLAY_FORMAT:
+        raise ValueError(f"{path} is not a format {REPLAY_FORMAT} replay.")
+    answers = []
+    final = None
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # A torn last line from a crash mid-write.
+            break
+        if isinstance(record, dict):
+            final = record['final']
+        else:
+            answers.append(tuple(record))
+    return header['seed'], answers, final
+
+
+def replay(path, output=quiet):
+    # Re-runs a recording at full speed and returns (seconds, turns). Raises
+    # ReplayDivergence if the game asks for different input than was
+    # recorded or finishes in a different state.
+    seed, answers, final = load(path)
+    policy = ReplayPolicy(answers)
+    started = time.perf_counter()
+    try:
+        player = run_session(policy, seed, output, pace=0)
+    except ReplayExhausted:
+        if final is not None:
+            raise ReplayDivergence(f"the game asked for more than the {len(answers)} recorded answers")
+        # An unfinished recording, e.g. of a crash: running it to the end is
+        # all there is to check.
+        return time.perf_counter() - started, None
+    elapsed = time.perf_counter() - started
+    if policy.position != len(answers):
+        raise ReplayDivergence(f"the game ended with {len(answers) - policy.position} answers left")
+    if final is not None:
+        state = final_state(player)
+        if state != final:
+            raise ReplayDivergence(f"final state differs: recorded {final}, replayed {state}")
+    return elapsed, player.snapshots.turn
+
+
+def replay_paths(paths):
+    if not paths:
+        paths = [REPLAY_DIR]
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, '*.replay'))))
+        else:
+            found.append(path)
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record a session, or replay recordings and check they still "
+                                                 "end the same way.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    recorder = commands.add_parser('record', help="play a game and record it")
+    recorder.add_argument('path')
+    recorder.add_argument('--seed', type=int, default=None)
+    recorder.add_argument('--script', metavar='FILE', help="take the input from FILE instead of prompting")
+    player = commands.add_parser('play', help="replay recordings (default: the replays/ corpus)")
+    player.add_argument('paths', nargs='*')
+    player.add_argument('-r', '--repeat', type=int, default=1, help="runs per replay; the fastest is reported")
+    player.add_argument('-v', '--verbose', action='store_true', help="show the game output")
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        if args.script:
+            with open(args.script, 'r') as script:
+                seed = record(args.path, args.seed, script)
+        else:
+            seed = record(args.path, args.seed)
+        print(f"Recorded {args.path} (seed {seed}).")
+        return 0
+
+    failed = 0
+    for path in replay_paths(args.paths):
+        try:
+            runs = [replay(path, print if args.verbose else quiet) for _ in range(args.repeat)]
+        except ReplayDivergence as e:
+            print(f"{path}: DIVERGED: {e}")
+            failed += 1
+            continue
+        elapsed, turns = min(runs)
+        if turns is None:
+            print(f"{path}: unfinished recording replayed in {elapsed * 1000:.1f} ms")
+        else:
+            print(f"{path}: ok, {turns} turns in {elapsed * 1000:.1f} ms ({turns / elapsed:,.0f} turns/s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
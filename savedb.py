@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from iopool import get_io_pool
+
+SAVES_DB = 'saves.db'
+PAGE_SIZE = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS saves (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL,
+    player_class TEXT NOT NULL,
+    current_location TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (owner, name)
+);
+CREATE INDEX IF NOT EXISTS saves_by_time ON saves (owner, saved_at DESC);
+CREATE INDEX IF NOT EXISTS saves_by_class ON saves (owner, player_class, saved_at DESC);
+CREATE INDEX IF NOT EXISTS saves_by_location ON saves (owner, current_location, saved_at DESC);
+"""
+
+# Columns a catalog listing can be filtered on.
+CATALOG_FILTERS = ('player_class', 'current_location')
+
+
+class SaveDatabase:
+    # Save slots in one SQLite file with an indexed catalog, instead of one
+    # JSON file per save found by scanning the directory. owner keeps server
+    # sessions' saves apart; the console game uses the empty owner.
+    # With an IOPool, saves are written in the background and reads first
+    # wait for the same owner's saves queued before them.
+    def __init__(self, path=SAVES_DB, io=None):
+        self.path = path
+        self.io = io
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def save(self, name, data, owner=''):
+        if self.io is not None:
+            self.io.submit((self.path, owner), self._save, name, data, owner)
+        else:
+            self._save(name, data, owner)
+
+    def flush(self, owner=''):
+        # Blocks until owner's queued saves are written; raises if one failed.
+        if self.io is not None:
+            self.io.flush([(self.path, owner)])
+
+    def _settle(self, owner):
+        if self.io is not None:
+            self.io.wait((self.path, owner))
+
+    def _save(self, name, data, owner):
+        # One transaction per save: the catalog row and the data land together.
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO saves (owner, name, player_class, current_location, saved_at, data)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (owner, name) DO UPDATE SET
+                    player_class = excluded.player_class,
+                    current_location = excluded.current_location,
+                    saved_at = excluded.saved_at,
+                    data = excluded.data
+                """,
+                (owner, name, data['player_class'], data['current_location'], time.time(), json.dumps(data)),
+            )
+
+    def load(self, name, owner=''):
+        self._settle(owner)
+        row = self._connect().execute(
+            'SELECT data FROM saves WHERE owner = ? AND name = ?', (owner, name)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row['data'])
+
+    def delete(self, name, owner=''):
+        self._settle(owner)
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM saves WHERE owner = ? AND name = ?', (owner, name)).rowcount > 0
+
+    def _where(self, owner, filters):
+        clauses = ['owner = ?']
+        params = [owner]
+        for column, value in filters.items():
+            if column not in CATALOG_FILTERS:
+                raise ValueError(f"Can't filter saves on {column!r}.")
+            clauses.append(f'{column} = ?')
+            params.append(value)
+        return ' AND '.join(clauses), params
+
+    def count(self, owner='', **filters):
+        where, params = self._where(owner, filters)
+        self._settle(owner)
+        return self._connect().execute(f'SELECT COUNT(*) FROM saves WHERE {where}', params).fetchone()[0]
+
+    def catalog(self, owner='', page=0, page_size=PAGE_SIZE, **filters):
+        # Newest first, served straight from the (owner, saved_at) index.
+        where, params = self._where(owner, filters)
+        self._settle(owner)
+        rows = self._connect().execute(
+            f"""
+            SELECT name, player_class, current_location, saved_at FROM saves
+            WHERE {where} ORDER BY saved_at DESC, id DESC LIMIT ? OFFSET ?
+            """,
+            params + [page_size, page * page_size],
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def import_json_saves(self, directory='.', owner=''):
+        # One-off migration of old <name>_save.json files.
+        imported = 0
+        for filename in os.listdir(directory):
+            if not filename.endswith('_save.json'):
+                continue
+            with open(os.path.join(directory, filename), 'r') as f:
+                data = json.load(f)
+            self.save(filename[:-len('_save.json')], data, owner)
+            imported += 1
+        return imported
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_save_db(path=SAVES_DB):
+    with _shared_lock:
+        db = _shared.get(path)
+        if db is None:
+            db = _shared[path] = SaveDatabase(path, io=get_io_pool())
+    return db
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the save-game database.")
+    parser.add_argument('--db', default=SAVES_DB)
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help="import <name>_save.json files from a directory")
+    importer.add_argument('directory', nargs='?', default='.')
+    importer.add_argument('--owner', default='')
+    lister = commands.add_parser('list', help="list saves, newest first")
+    lister.add_argument('--owner', default='')
+    lister.add_argument('--page', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    db = SaveDatabase(args.db)
+    if args.command == 'import':
+        print(f"Imported {db.import_json_saves(args.directory, args.owner)} saves.")
+    else:
+        for save in db.catalog(args.owner, args.page):
+            saved_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(save['saved_at']))
+            print(f"{save['name']}: {save['player_class']} in {save['current_location']} ({saved_at})")
+
+
+if __name__ == "__main__":
+    main()
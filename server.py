@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import os
+import queue
+import re
+import threading
+import uuid
+
+from Adventure import main as play
+from content import get_content
+from iopool import get_io_pool
+from persistence import StateStore
+from policies import Policy
+from render import Renderer
+
+SESSIONS_DIR = 'sessions'
+# Game code is synchronous and may ask for input deep inside a battle, so each
+# session runs on its own thread. They spend nearly all their time blocked on
+# an empty queue, so a small stack lets thousands of them fit comfortably.
+SESSION_STACK_SIZE = 512 * 1024
+TELNET_COMMAND = re.compile(rb'\xff[\xfb-\xfe].|\xff[\xf0-\xfa]')
+UNSAFE_NAME = re.compile(r'[^A-Za-z0-9_-]')
+
+
+class SessionClosed(Exception):
+    pass
+
+
+class Session(Policy):
+    # One connected player: the policy the game asks for decisions, and the
+    # output channel it writes to. Input arrives from the event loop through
+    # a queue; output is handed back to the event loop to send.
+    def __init__(self, name, state_dir, loop, writer):
+        self.name = name
+        self.state_dir = state_dir
+        self.loop = loop
+        self.writer = writer
+        # Files are written by the shared I/O pool, so a slow disk holds up
+        # the pool rather than this session's turns.
+        self.store = StateStore(flush_at_exit=False, io=get_io_pool())
+        self.inbox = queue.Queue()
+        self.finished = False
+        # A turn's output is sent to the player as one chunk.
+        self.output = Renderer(stream=self)
+
+    def write(self, text):
+        data = text.replace('\n', '\r\n').encode()
+        self.loop.call_soon_threadsafe(self._send, data)
+
+    def flush(self):
+        pass
+
+    def _send(self, data):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def decide(self, player, decision, options, prompt):
+        self.output(prompt, end='')
+        self.output.flush()
+        line = self.inbox.get()
+        if line is None:
+            raise SessionClosed()
+        return line
+
+    def feed(self, line):
+        self.inbox.put(line)
+
+    def close(self):
+        self.inbox.put(None)
+
+    def run(self):
+        try:
+            play(policy=self, output=self.output, store=self.store, state_dir=self.state_dir, pace=0)
+        except SessionClosed:
+            pass
+        except Exception as e:
+            self.output(f"Something went wrong: {e}")
+            self.output.flush()
+        finally:
+            self.store.flush()
+            self.finished = True
+            self.loop.call_soon_threadsafe(self._hang_up)
+
+    def _hang_up(self):
+        if not self.writer.is_closing():
+            self.writer.close()
+
+
+class GameServer:
+    def __init__(self, host='0.0.0.0', port=4000, state_root=SESSIONS_DIR, max_sessions=5000):
+        self.host = host
+        self.port = port
+        self.state_root = state_root
+        self.max_sessions = max_sessions
+        self.sessions = {}
+
+    async def read_line(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        return TELNET_COMMAND.sub(b'', line).decode(errors='replace').strip()
+
+    async def ask_name(self, reader, writer):
+        while True:
+            writer.write(b"Enter your name: ")
+            await writer.drain()
+            line = await self.read_line(reader)
+            if line is None:
+                return None
+            name = UNSAFE_NAME.sub('', line)[:32] or f'guest-{uuid.uuid4().hex[:8]}'
+            if name not in self.sessions:
+                return name
+            writer.write(f"{name} is already playing.\r\n".encode())
+
+    async def handle(self, reader, writer):
+        if len(self.sessions) >= self.max_sessions:
+            writer.write(b"The server is full. Try again later.\r\n")
+            writer.close()
+            return
+        name = await self.ask_name(reader, writer)
+        if name is None:
+            writer.close()
+            return
+
+        session = Session(name, os.path.join(self.state_root, name), asyncio.get_running_loop(), writer)
+        self.sessions[name] = session
+        threading.Thread(target=session.run, name=f'session-{name}', daemon=True).start()
+        try:
+            while not session.finished:
+                line = await self.read_line(reader)
+                if line is None:
+                    break
+                session.feed(line)
+        except ConnectionError:
+            pass
+        finally:
+            session.close()
+            del self.sessions[name]
+            if not writer.is_closing():
+                writer.close()
+
+    async def serve(self):
+        # Load the shared content before the first player arrives.
+        get_content()
+        threading.stack_size(SESSION_STACK_SIZE)
+        server = await asyncio.start_server(self.handle, self.host, self.port, backlog=1024)
+        addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Serving on {addresses}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host many players over telnet, sharing one world.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=4000)
+    parser.add_argument('--state-dir', default=SESSIONS_DIR, help="directory for per-session state files")
+    parser.add_argument('--max-sessions', type=int, default=5000)
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="record latency histograms and file I/O across all sessions, written to FILE on exit")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        import metrics
+        from Adventure import COMMANDS, Player
+        metrics.enable(Player, COMMANDS)
+    server = GameServer(args.host, args.port, args.state_dir, args.max_sessions)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.metrics:
+            metrics.METRICS.write(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import bisect
+import json
+import os
+
+from playerstate import add_locations, added_locations
+
+AUTOSAVE_FILE = 'autosave.jsonl'
+FIELDS = ('health', 'mana', 'inventory', 'equipped_items', 'current_location', 'visited_locations')
+KEYFRAME_EVERY = 32
+VISITED = FIELDS.index('visited_locations')
+
+# A state is a tuple in FIELDS order made only of immutable values, so a
+# checkpoint can keep the previous turn's values without copying them.
+
+
+def capture(player):
+    return (
+        player.health,
+        player.mana,
+        player.inventory.snapshot(),
+        player.equipped_items.snapshot(),
+        player.current_location,
+        player._visited.snapshot(),
+    )
+
+
+def apply(player, state):
+    health, mana, inventory, equipment, location, visited = state
+    player.health = health
+    player.mana = mana
+    player.inventory.restore(inventory)
+    player.equipped_items.restore(equipment)
+    player.refresh_gear()
+    player.current_location = location
+    player._visited.restore(visited)
+
+
+def diff(old, new):
+    return tuple((index, value) for index, (before, value) in enumerate(zip(old, new))
+                 if value is not before and value != before)
+
+
+def patch(state, delta):
+    state = list(state)
+    for index, value in delta:
+        state[index] = value
+    return tuple(state)
+
+
+def value_to_json(value):
+    # JSON object keys are strings, so a sparse visited set's chunk numbers
+    # go out as strings and come back as ints.
+    if isinstance(value, dict):
+        return {str(chunk): word for chunk, word in value.items()}
+    return list(value) if isinstance(value, tuple) else value
+
+
+def value_from_json(value):
+    if isinstance(value, dict):
+        return {int(chunk): word for chunk, word in value.items()}
+    return tuple(value) if isinstance(value, list) else value
+
+
+def to_json(state):
+    return [value_to_json(value) for value in state]
+
+
+def from_json(values):
+    return tuple(value_from_json(value) for value in values)
+
+
+class SnapshotLog:
+    # Per-turn checkpoints of a Player: a keyframe every keyframe_every turns
+    # and a delta of the changed fields for each turn in between, so
+    # rebuilding any turn applies at most keyframe_every deltas. max_turns
+    # drops history older than that many turns.
+    #
+    # With a path, every checkpoint is also appended to a journal so a
+    # crashed session can be recovered. The journal is rewritten from the
+    # latest keyframe whenever one is taken, which keeps it short. With an
+    # IOPool the journal is encoded and written there, in order, and the
+    # game never waits on it.
+    def __init__(self, player, keyframe_every=KEYFRAME_EVERY, max_turns=None, path=None, turn=0, io=None):
+        self.keyframe_every = keyframe_every
+        self.max_turns = max_turns
+        self.path = path
+        self.io = io
+        self.player_class = player.player_class
+        self.world = player.world.identity
+        self.turn = turn
+        self._last = capture(player)
+        self._keyframe_turns = [turn]
+        self._keyframes = [self._last]
+        self._deltas = [[]]
+        self._journal = None
+        if path:
+            self._rewrite_journal()
+
+    @property
+    def oldest_turn(self):
+        return self._keyframe_turns[0]
+
+    def checkpoint(self, player):
+        state = capture(player)
+        self.turn += 1
+        if len(self._deltas[-1]) >= self.keyframe_every:
+            self._keyframe_turns.append(self.turn)
+            self._keyframes.append(state)
+            self._deltas.append([])
+            self._trim()
+            self._last = state
+            if self.path:
+                self._rewrite_journal()
+            return
+        delta = diff(self._last, state)
+        self._deltas[-1].append(delta)
+        if self.path:
+            self._run(self._append, self.turn, delta, self._last[VISITED])
+        self._last = state
+
+    def _trim(self):
+        if self.max_turns is None:
+            return
+        while len(self._keyframe_turns) > 1 and self._keyframe_turns[1] <= self.turn - self.max_turns:
+            del self._keyframe_turns[0], self._keyframes[0], self._deltas[0]
+
+    def state_at(self, turn):
+        if not self.oldest_turn <= turn <= self.turn:
+            raise ValueError(f"Turn {turn} is outside the saved history ({self.oldest_turn}-{self.turn}).")
+        index = bisect.bisect_right(self._keyframe_turns, turn) - 1
+        state = self._keyframes[index]
+        for delta in self._deltas[index][:turn - self._keyframe_turns[index]]:
+            state = patch(state, delta)
+        return state
+
+    def rewind(self, player, turn):
+        state = self.state_at(turn)
+        apply(player, state)
+        index = bisect.bisect_right(self._keyframe_turns, turn) - 1
+        del self._keyframe_turns[index + 1:], self._keyframes[index + 1:], self._deltas[index + 1:]
+        del self._deltas[index][turn - self._keyframe_turns[index]:]
+        self.turn = turn
+        self._last = state
+        if self.path:
+            self._rewrite_journal()
+        return state
+
+    def _run(self, function, *args):
+        # Journal file work, on the pool when there is one. States are
+        # immutable, so the pool can encode them after the game moves on.
+        if self.io is not None:
+            self.io.submit(self.path, function, *args)
+        else:
+            function(*args)
+
+    def _append(self, turn, delta, visited):
+        if self._journal is not None:
+            record = {'t': turn, 'd': []}
+            for index, value in delta:
+                if index == VISITED and type(value) is dict and type(visited) is dict:
+                    # A sparse visited set goes in as the rooms added this
+                    # turn rather than the whole set.
+                    added = added_locations(visited, value)
+                    if added is not None:
+                        record['v'] = added
+                        continue
+                record['d'].append([index, value_to_json(value)])
+            self._write(self._journal, json.dumps(record) + '\n')
+            self._journal.flush()
+
+    def _rewrite_journal(self):
+        self._run(self._rewrite, self.turn, self._last)
+
+    def _rewrite(self, turn, state):
+        # Start the journal over from the current state, written atomically so
+        # a crash mid-rewrite still leaves the previous journal.
+        if self._journal is not None:
+            self._journal.close()
+        header = {'class': self.player_class, 'world': self.world, 't': turn, 'k': to_json(state)}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            self._write(f, json.dumps(header) + '\n')
+        os.replace(tmp_path, self.path)
+        self._journal = open(self.path, 'a')
+
+    def _write(self, f, text):
+        # Every journal write goes through here, so metrics can count bytes.
+        f.write(text)
+
+    def close(self, discard=False):
+        if self.path:
+            self._run(self._close, discard)
+
+    def _close(self, discard):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if discard and self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def recover(path):
+        # Returns (player_class, world, turn, state) from a journal, or None.
+        # world is None in journals from before worlds were recorded. A torn
+        # last line from a crash mid-write is ignored.
+        try:
+            with open(path, 'r') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None
+        if not lines:
+            return None
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            return None
+        turn = header['t']
+        state = from_json(header['k'])
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            turn = record['t']
+            state = patch(state, [(index, value_from_json(value)) for index, value in record['d']])
+            if 'v' in record:
+                state = patch(state, [(VISITED, add_locations(state[VISITED], record['v']))])
+        return header['class'], header.get('world'), turn, state
@@ -0,0 +1,118 @@
+from collections import namedtuple
+
+# Who turns up in an encounter. Each location's spawn table comes from the
+# content: an explicit "spawns" object of enemy name -> weight, or an
+# "enemy_levels" [low, high] band that takes every enemy of those levels at
+# the enemy's own "weight". A location with neither draws from every enemy.
+# Tables are compiled once per load of the content into alias tables, so a
+# draw costs one random number whatever the number of enemies.
+
+DEFAULT_LEVEL = 1
+DEFAULT_WEIGHT = 1
+
+EnemyTemplate = namedtuple('EnemyTemplate', ['name', 'health', 'attack', 'level'])
+
+
+class Enemy:
+    # One enemy in one fight. Templates are shared and immutable; this is
+    # the only thing a battle changes.
+    __slots__ = ('template', 'name', 'health', 'attack')
+
+    def __init__(self, template):
+        self.template = template
+        self.name = template.name
+        self.health = template.health
+        self.attack = template.attack
+
+
+class AliasTable:
+    # Walker's alias method (Vose's construction): each of n columns holds
+    # its own outcome with probability prob[i] and alias[i] otherwise, so
+    # sampling is one uniform draw split into a column and a coin.
+    __slots__ = ('outcomes', 'prob', 'alias', '_n')
+
+    def __init__(self, outcomes, weights):
+        n = len(outcomes)
+        if n == 0 or sum(weights) <= 0:
+            raise ValueError("an alias table needs at least one positive weight")
+        total = float(sum(weights))
+        scaled = [weight * n / total for weight in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1 up to rounding.
+        self.outcomes = tuple(outcomes)
+        self.prob = prob
+        self.alias = alias
+        self._n = n
+
+    def sample(self, rng):
+        u = rng.random() * self._n
+        column = int(u)
+        if u - column < self.prob[column]:
+            return self.outcomes[column]
+        return self.outcomes[self.alias[column]]
+
+    def probabilities(self):
+        # The distribution the table samples from, for checks and tooling.
+        n = self._n
+        result = dict.fromkeys(self.outcomes, 0.0)
+        for column in range(n):
+            result[self.outcomes[column]] += self.prob[column] / n
+            result[self.outcomes[self.alias[column]]] += (1.0 - self.prob[column]) / n
+        return result
+
+
+def spawn_weights(location, templates, weights):
+    # (enemy names, weights) for a location's entry in locations.json.
+    spawns = location.get('spawns')
+    if spawns:
+        names = [name for name in spawns if name in templates and spawns[name] > 0]
+        return names, [spawns[name] for name in names]
+    band = location.get('enemy_levels')
+    if band:
+        low, high = band
+        names = [name for name, template in templates.items() if low <= template.level <= high]
+    else:
+        names = list(templates)
+    return names, [weights[name] for name in names]
+
+
+class SpawnTables:
+    def __init__(self, locations, enemies):
+        self.templates = {}
+        weights = {}
+        for name, stats in enemies.items():
+            self.templates[name] = EnemyTemplate(name, stats['health'], stats['attack'],
+                                                 stats.get('level', DEFAULT_LEVEL))
+            weights[name] = stats.get('weight', DEFAULT_WEIGHT)
+        everyone = list(self.templates)
+        self.default = AliasTable([self.templates[name] for name in everyone],
+                                  [weights[name] for name in everyone])
+        self.tables = {}
+        # Locations whose table came out empty, e.g. a band no enemy is in.
+        # They draw from every enemy.
+        self.empty = []
+        for location_name, location in locations.items():
+            names, weights_here = spawn_weights(location, self.templates, weights)
+            if names and sum(weights_here) > 0:
+                self.tables[location_name] = AliasTable([self.templates[name] for name in names], weights_here)
+            else:
+                self.empty.append(location_name)
+
+    def table(self, location):
+        return self.tables.get(location, self.default)
+
+    def spawn(self, location, rng):
+        return Enemy(self.table(location).sample(rng))
+
+    def enemy(self, name):
+        return Enemy(self.templates[name])
@@ -0,0 +1,48 @@
+import io
+import unittest
+
+from engine import headless_player
+from policies import ScriptedPolicy
+from render import EventLog, Renderer
+
+
+def fight(output, actions):
+    player = headless_player('Warrior', policy=ScriptedPolicy({'battle': actions}), seed=3, output=output)
+    enemy = player.content.spawns.spawn(player.world.archetype(player.current_location), player.rng)
+    output.flush()
+    player.battle_enemy(enemy)
+    return enemy
+
+
+class BattleOutputTest(unittest.TestCase):
+    def test_rounds_are_events(self):
+        output = EventLog(messages=True)
+        fight(output, ['block'] + ['attack'] * 20)
+        kinds = {event.kind for event in output.events}
+        self.assertLessEqual({'battle_status', 'attack', 'enemy_attack', 'block'}, kinds)
+        self.assertNotIn('message', kinds)
+
+    def test_rendered_text(self):
+        stream = io.StringIO()
+        output = Renderer(stream)
+        enemy = fight(output, ['block'] + ['attack'] * 20)
+        output.flush()
+        text = stream.getvalue()
+        self.assertIn(f"You block the {enemy.name}'s attack!", text)
+        self.assertIn(f"You attack the {enemy.name}!", text)
+        self.assertIn(f"{enemy.name} attacks you!", text)
+        self.assertRegex(text, r"Your Health: \d+, Enemy Health: \d+")
+
+
+class HealTest(unittest.TestCase):
+    def test_used_potion_is_saved(self):
+        player = headless_player('Warrior', seed=0)
+        player.store.flush()
+        player.health = 50
+        player.heal()
+        self.assertNotIn('Health Potion', player.inventory)
+        self.assertTrue(player.store.is_dirty(player.inventory_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
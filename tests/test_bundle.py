@@ -0,0 +1,66 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from bundle import read_sources
+from content import ENEMIES_JSON, ITEMS_JSON, LOCATIONS_JSON, ContentRegistry, text_path, write_bundle
+
+
+class BundleTest(unittest.TestCase):
+    def setUp(self):
+        self.content_dir = tempfile.mkdtemp()
+        self.paths = {}
+        for kind, source in (('items', ITEMS_JSON), ('enemies', ENEMIES_JSON), ('locations', LOCATIONS_JSON)):
+            self.paths[kind] = shutil.copy(source, self.content_dir)
+        self.bundle_path = os.path.join(self.content_dir, 'content.bundle')
+        write_bundle(self.bundle_path, self.paths, read_sources(self.paths))
+
+    def tearDown(self):
+        shutil.rmtree(self.content_dir)
+
+    def registry(self):
+        return ContentRegistry(self.paths['items'], self.paths['enemies'], self.paths['locations'],
+                               bundle_path=self.bundle_path)
+
+    def test_fresh_bundle_serves_everything(self):
+        content = self.registry()
+        self.assertEqual(sorted(content.bundled), ['enemies', 'items', 'locations'])
+        self.assertEqual(content.describe('enemies', 'Goblin'), 'A small, agile creature.')
+        self.assertEqual(content.get('enemies')['Goblin']['health'], 30)
+
+    def test_changed_source_is_read_from_its_json(self):
+        with open(self.paths['enemies']) as f:
+            enemies = json.load(f)
+        enemies[0]['health'] = 31
+        enemies[0]['description'] = 'A bigger goblin.'
+        with open(self.paths['enemies'], 'w') as f:
+            json.dump(enemies, f)
+        content = self.registry()
+        self.assertEqual(sorted(content.bundled), ['items', 'locations'])
+        self.assertEqual(content.get('enemies')['Goblin']['health'], 31)
+        self.assertEqual(content.describe('enemies', 'Goblin'), 'A bigger goblin.')
+
+    def test_unreadable_bundle_falls_back_to_json(self):
+        with open(self.bundle_path, 'wb') as f:
+            f.write(b'not a bundle')
+        content = self.registry()
+        self.assertEqual(content.bundled, ())
+        self.assertEqual(content.describe('enemies', 'Goblin'), 'A small, agile creature.')
+
+    def test_descriptions_from_another_build_are_not_used(self):
+        texts = text_path(self.bundle_path)
+        old_texts = texts + '.old'
+        shutil.copy(texts, old_texts)
+        write_bundle(self.bundle_path, self.paths, read_sources(self.paths))
+        os.replace(old_texts, texts)
+        self.assertEqual(self.registry().bundled, ())
+
+    def test_missing_descriptions_fall_back_to_json(self):
+        os.remove(text_path(self.bundle_path))
+        self.assertEqual(self.registry().bundled, ())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from Adventure import quit_command
+from commands import CommandTable
+from engine import headless_player
+from render import EventLog
+from snapshots import SnapshotLog
+
+
+class Recorder:
+    def __init__(self):
+        self.say = EventLog(messages=True)
+        self.calls = []
+
+
+def table():
+    commands = CommandTable()
+    for name, aliases in (('equip', ()), ('equipped', ('eq',)), ('examine', ('x',)), ('quit', ())):
+        commands.register(name, lambda player, args, name=name: player.calls.append((name, args)) or name == 'quit',
+                          name, aliases=aliases)
+    return commands
+
+
+class PrefixTrieTest(unittest.TestCase):
+    def setUp(self):
+        self.commands = table()
+
+    def match(self, line):
+        command, end = self.commands.trie.match(line)
+        if command is None:
+            return None, [candidate.name for candidate in end]
+        return command.name, line[end:]
+
+    def test_full_names_and_aliases(self):
+        self.assertEqual(self.match('equip sword'), ('equip', ' sword'))
+        self.assertEqual(self.match('equipped'), ('equipped', ''))
+        self.assertEqual(self.match('x door'), ('examine', ' door'))
+        self.assertEqual(self.match('eq'), ('equipped', ''))
+
+    def test_unique_abbreviations(self):
+        self.assertEqual(self.match('exa'), ('examine', ''))
+        self.assertEqual(self.match('q'), ('quit', ''))
+        self.assertEqual(self.match('equipp me'), ('equipped', ' me'))
+
+    def test_ambiguous_abbreviation_lists_candidates(self):
+        self.assertEqual(self.match('e'), (None, ['equip', 'equipped', 'examine']))
+        self.assertEqual(self.match('equ'), (None, ['equip', 'equipped']))
+
+    def test_unknown(self):
+        self.assertEqual(self.match('dance'), (None, []))
+        self.assertEqual(self.match(''), (None, []))
+
+
+class DispatchTest(unittest.TestCase):
+    def test_dispatch(self):
+        commands = table()
+        player = Recorder()
+        self.assertFalse(commands.dispatch(player, '  EXAM   Iron  Door '))
+        self.assertTrue(commands.dispatch(player, 'quit'))
+        self.assertEqual(player.calls, [('examine', 'Iron Door'), ('quit', '')])
+        commands.dispatch(player, 'e')
+        commands.dispatch(player, 'dance')
+        self.assertEqual([event.fields['text'] for event in player.say.events],
+                         ["Did you mean equip or equipped or examine?",
+                          "Invalid command. Type 'help' for available commands."])
+
+
+class QuitTest(unittest.TestCase):
+    def test_quitting_does_not_advance_the_clock(self):
+        player = headless_player('Warrior', seed=0)
+        player.snapshots = SnapshotLog(player)
+        player.apply_poison_effect(3)
+        health = player.health
+        self.assertTrue(quit_command(player, ''))
+        self.assertEqual(player.health, health)
+        self.assertEqual(player.clock.tick, 0)
+        self.assertEqual(player.snapshots.turn, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+from Adventure import Player
+from content import ENEMIES_JSON, ITEMS_JSON, LOCATIONS_JSON, ContentRegistry
+from persistence import NullStore
+from render import EventLog
+
+
+class HotReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.content_dir = tempfile.mkdtemp()
+        self.paths = [shutil.copy(source, self.content_dir) for source in (ITEMS_JSON, ENEMIES_JSON, LOCATIONS_JSON)]
+        self.content = ContentRegistry(*self.paths, hot_reload=True, reload_interval=0, bundle_path=None)
+
+    def tearDown(self):
+        shutil.rmtree(self.content_dir)
+
+    def rewrite(self, path, text):
+        stamp = os.stat(path).st_mtime_ns
+        with open(path, 'w') as f:
+            f.write(text)
+        # Make sure the change shows even on a coarse-grained clock.
+        os.utime(path, ns=(stamp + 10 ** 9, stamp + 10 ** 9))
+
+    def edit(self, path, edit):
+        with open(path) as f:
+            data = json.load(f)
+        edit(data)
+        self.rewrite(path, json.dumps(data))
+
+    def edit_items(self, edit):
+        self.edit(self.paths[0], edit)
+
+    def test_edited_file_is_seen(self):
+        self.assertEqual(self.content.get('enemies')['Bandit']['health'], 40)
+
+        def toughen(enemies):
+            for enemy in enemies:
+                if enemy['name'] == 'Bandit':
+                    enemy['health'] = 99
+        self.edit(self.paths[1], toughen)
+        self.assertEqual(self.content.get('enemies')['Bandit']['health'], 99)
+
+    def test_broken_edit_keeps_last_good_copy(self):
+        enemies = self.content.get('enemies')
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            self.rewrite(self.paths[1], '[{"name": "Bandit", ')
+            self.assertIs(self.content.get('enemies'), enemies)
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertIn(f"Could not reload {self.paths[1]}: ", stderr.getvalue())
+
+    def test_player_uses_items_added_by_a_reload(self):
+        player = Player('Warrior', content=self.content, store=NullStore(), rng=random.Random(0),
+                        output=EventLog(messages=True))
+        carried = player.inventory.to_dict()
+        equipped = player.equipped_items.equipped()
+        self.edit_items(lambda items: items.append(
+            {'name': 'Lantern', 'type': 'light', 'armor_rating': '0', 'damage_rating': '0',
+             'description': 'A lantern.'}))
+
+        self.assertTrue(player.add_to_inventory('Lantern'))
+        self.assertEqual(player.inventory.to_dict(), dict(carried, Lantern=1))
+        self.assertEqual(player.inventory.type_count('light'), 1)
+        self.assertEqual(list(player.inventory).count('Lantern'), 1)
+        player.equip_item('Lantern')
+        self.assertEqual(player.equipped_items['light'], 'Lantern')
+        self.assertEqual(player.equipped_items.equipped(), equipped + [('light', 'Lantern')])
+
+
+if __name__ == '__main__':
+    unittest.main()
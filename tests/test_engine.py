@@ -0,0 +1,48 @@
+import random
+import unittest
+
+from engine import headless_player, run_traps
+from gamestate import DONE, TRAP, GameState
+
+TRAP_TYPES = ('spike', 'pitfall', 'net', 'poison dart')
+
+
+def model_trap_damage(player_class, runs, seed):
+    # The same trap rolls as Player.detect_trap, played out on the GameState
+    # model, which takes poison up front.
+    rng = random.Random(seed)
+    player = headless_player(player_class, seed=0)
+    damage = 0
+    for _ in range(runs):
+        if rng.random() >= 0.3:
+            continue
+        player.trap = rng.choice(TRAP_TYPES)
+        if player_class == 'Rogue':
+            state = GameState.from_player(player, TRAP)
+        else:
+            # No detection kit: the trap goes off without a decision.
+            state = GameState.from_player(player, DONE)
+            state._trigger(player.trap, rng)
+        state.rollout(rng)
+        damage += max(0, player.health - state.health)
+    return damage / runs
+
+
+class RunTrapsTest(unittest.TestCase):
+    def test_poison_is_counted(self):
+        # Warriors start without a detection kit, so every trap but an
+        # uneventful net costs health: spike, pitfall and poison dart are
+        # three quarters of the 30% of runs with a trap.
+        result = run_traps('Warrior', 4000, seed=3)
+        self.assertGreater(result['traps'] / 4000, 0.3 * 0.75 * 0.9)
+
+    def test_damage_matches_the_model(self):
+        for player_class in ('Warrior', 'Rogue'):
+            with self.subTest(player_class=player_class):
+                measured = run_traps(player_class, 6000, seed=3)['avg_damage']
+                modelled = model_trap_damage(player_class, 6000, seed=4)
+                self.assertAlmostEqual(measured, modelled, delta=modelled * 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
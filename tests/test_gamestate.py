@@ -0,0 +1,143 @@
+import pickle
+import random
+import unittest
+
+from agent import SearchAgent, search
+from engine import headless_player
+from gamestate import BATTLE, DONE, ENCOUNTER, TRAP, GameState
+from policies import GreedyPolicy
+
+TRAP_TYPES = ('spike', 'pitfall', 'net', 'poison dart')
+
+
+class RollRandom(random.Random):
+    # randint drawn the way gamestate.roll draws it, from one random() each,
+    # so a Player and a GameState given the same seed roll the same dice.
+    def randint(self, low, high):
+        return low + int(self.random() * (high - low + 1))
+
+
+def fields(state):
+    return state.__getstate__()
+
+
+def battle_state(player_class='Warrior', enemy='Goblin', seed=0):
+    player = headless_player(player_class, seed=seed)
+    player.opponent = player.content.spawns.enemy(enemy)
+    return GameState.from_player(player, BATTLE)
+
+
+class ApplyUndoTest(unittest.TestCase):
+    def test_undo_restores_every_field(self):
+        rng = random.Random(1)
+        for phase in (BATTLE, ENCOUNTER, TRAP):
+            for trap in TRAP_TYPES:
+                state = battle_state()
+                state.phase = phase
+                state.trap = trap
+                for action in state.actions():
+                    before = fields(state)
+                    saved = state.apply(action, rng)
+                    state.undo(saved)
+                    self.assertEqual(fields(state), before)
+
+    def test_undoing_the_first_apply_takes_all_back(self):
+        rng = random.Random(2)
+        state = battle_state(enemy='Bandit')
+        before = fields(state)
+        first = state.apply('attack', rng)
+        while not state.terminal():
+            state.apply(state.default_action(), rng)
+        self.assertNotEqual(fields(state), before)
+        state.undo(first)
+        self.assertEqual(fields(state), before)
+
+    def test_clone_and_pickle(self):
+        state = battle_state()
+        copy = state.clone()
+        copy.apply('attack', random.Random(0))
+        self.assertNotEqual(fields(copy), fields(state))
+        restored = pickle.loads(pickle.dumps(state))
+        # The spawn table comes back as an equal copy rather than the same one.
+        self.assertEqual(restored.spawns.probabilities(), state.spawns.probabilities())
+        restored.spawns = state.spawns
+        self.assertEqual(fields(restored), fields(state))
+
+
+class ModelMatchesPlayerTest(unittest.TestCase):
+    def test_battles(self):
+        for player_class in ('Warrior', 'Mage', 'Rogue'):
+            for seed in range(40):
+                with self.subTest(player_class=player_class, seed=seed):
+                    player = headless_player(player_class, policy=GreedyPolicy(), rng=RollRandom(seed))
+                    enemy = player.content.spawns.enemy('Bandit')
+                    player.opponent = enemy
+                    state = GameState.from_player(player, BATTLE)
+                    state.rollout(RollRandom(seed))
+                    won = player.battle_enemy(enemy)
+                    self.assertAlmostEqual(state.health, player.health)
+                    self.assertEqual(state.health > 0, won)
+
+    def test_traps(self):
+        # Nets bring in enemies, and the rewards for beating them roll dice
+        # the model doesn't, so only the other traps are compared.
+        compared = 0
+        for player_class in ('Warrior', 'Rogue'):
+            for kit in (False, True):
+                for seed in range(400):
+                    rng = RollRandom(seed)
+                    if rng.random() >= 0.3 or rng.choice(TRAP_TYPES) == 'net':
+                        continue
+                    with self.subTest(player_class=player_class, kit=kit, seed=seed):
+                        player = headless_player(player_class, policy=GreedyPolicy(), rng=RollRandom(seed))
+                        if kit:
+                            player.add_to_inventory('Trap Disarming Kit')
+                        # Replay the detection rolls on the model's side.
+                        model_rng = RollRandom(seed)
+                        model_rng.random()
+                        player.trap = model_rng.choice(TRAP_TYPES)
+                        if player_class == 'Rogue':
+                            state = GameState.from_player(player, TRAP)
+                            state.apply(state.default_action(), model_rng)
+                        else:
+                            # No detection kit: the trap goes off at once.
+                            state = GameState.from_player(player, DONE)
+                            state._trigger(player.trap, model_rng)
+                        player.detect_trap()
+                        player.clock.run_until_idle()
+                        self.assertEqual(state.health, player.health)
+                        self.assertEqual(state.tools, player.inventory.type_count('trap_disarmament_item'))
+                        compared += 1
+        self.assertGreater(compared, 200)
+
+
+class AgentTest(unittest.TestCase):
+    def test_choices_are_legal(self):
+        agent = SearchAgent(seconds=None, iterations=200, seed=0)
+        for phase in (BATTLE, ENCOUNTER, TRAP):
+            state = battle_state('Rogue')
+            state.phase = phase
+            state.trap = 'spike'
+            before = fields(state)
+            action, stats = agent.choose(state)
+            self.assertIn(action, state.actions())
+            self.assertEqual(sum(visits for visits, _, _ in stats.values()), 200)
+            # The search undoes everything it plays.
+            self.assertEqual(fields(state), before)
+
+    def test_no_potions_means_no_heal(self):
+        state = battle_state()
+        state.potions = 0
+        root = search(state, random.Random(0), seconds=None, iterations=100)
+        self.assertEqual(set(root.children), {'attack', 'block'})
+
+    def test_finished_state(self):
+        state = battle_state()
+        state.phase = DONE
+        action, stats = SearchAgent(seconds=None, iterations=10).choose(state)
+        self.assertIsNone(action)
+        self.assertEqual(stats, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import threading
+import unittest
+
+from iopool import IOPool
+
+
+def fail():
+    raise OSError("disk full")
+
+
+class IOPoolTest(unittest.TestCase):
+    def setUp(self):
+        # One thread, so every key shares one queue.
+        self.pool = IOPool(workers=1, flush_at_exit=False)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.close()
+
+    def test_wait_is_for_the_key_only(self):
+        written = []
+        self.pool.submit('mine', written.append, 'mine')
+        self.pool.submit('theirs', self.release.wait)
+        self.pool.wait('mine')
+        self.assertEqual(written, ['mine'])
+        self.assertIn('theirs', self.pool._keys)
+
+    def test_wait_for_a_key_with_nothing_queued(self):
+        self.pool.submit('theirs', self.release.wait)
+        self.pool.wait('mine')
+        self.pool.flush(['mine'])
+
+    def test_errors_are_reported_to_their_key(self):
+        self.pool.submit('theirs', fail)
+        self.pool.submit('mine', len, 'ok')
+        self.pool.flush(['mine'])
+        with self.assertRaises(OSError):
+            self.pool.flush(['theirs'])
+        # Reported once.
+        self.pool.flush()
+        self.assertEqual(self.pool.stats()['errors'], 0)
+
+
+class OrderingTest(unittest.TestCase):
+    def test_each_key_is_written_in_order(self):
+        pool = IOPool(workers=4, flush_at_exit=False)
+        written = {key: [] for key in range(10)}
+        for index in range(200):
+            for key in written:
+                pool.submit(key, written[key].append, index)
+        pool.close()
+        for key in written:
+            self.assertEqual(written[key], list(range(200)))
+        self.assertEqual(pool.stats()['completed'], 2000)
+
+    def test_a_closed_pool_writes_at_once(self):
+        pool = IOPool(workers=1, flush_at_exit=False)
+        pool.close()
+        written = []
+        pool.submit('mine', written.append, 1)
+        self.assertEqual(written, [1])
+
+
+class BackPressureTest(unittest.TestCase):
+    def test_submit_blocks_while_the_queue_is_full(self):
+        pool = IOPool(workers=1, queue_size=2, flush_at_exit=False)
+        started = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            started.set()
+            release.wait()
+
+        try:
+            pool.submit('slow', hold)
+            started.wait(5)
+            pool.submit('a', len, 'queued')
+            pool.submit('b', len, 'queued')
+            submitter = threading.Thread(target=pool.submit, args=('c', len, 'blocked'))
+            submitter.start()
+            submitter.join(0.2)
+            self.assertTrue(submitter.is_alive())
+            self.assertEqual(pool.stats()['blocked'], 1)
+            release.set()
+            submitter.join(5)
+            self.assertFalse(submitter.is_alive())
+        finally:
+            release.set()
+            pool.close()
+        stats = pool.stats()
+        self.assertEqual((stats['submitted'], stats['completed'], stats['max_depth']), (4, 4, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
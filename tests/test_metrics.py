@@ -0,0 +1,87 @@
+import random
+import shutil
+import tempfile
+import unittest
+
+import metrics
+import persistence
+from Adventure import COMMANDS, Player, main
+from iopool import IOPool
+from persistence import StateStore
+from policies import BatchPolicy
+from render import EventLog
+from savedb import SaveDatabase
+from snapshots import SnapshotLog
+
+SCRIPT = ['warrior', 'inventory', 'equip sword', 'move north', 'quit']
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.io = IOPool(flush_at_exit=False)
+
+    def tearDown(self):
+        metrics.disable()
+        self.io.close()
+        shutil.rmtree(self.state_dir)
+
+    def play(self):
+        main(policy=BatchPolicy(SCRIPT), output=EventLog(), store=StateStore(flush_at_exit=False, io=self.io),
+             state_dir=self.state_dir, pace=0, rng=random.Random(0))
+        self.io.flush()
+
+    def count(self, table, name):
+        histogram = table.get(name)
+        return histogram.count if histogram is not None else 0
+
+    def test_counters_increment(self):
+        recorded = metrics.enable(Player, COMMANDS)
+        watched = [(recorded.commands, 'equip'), (recorded.commands, 'quit'), (recorded.calls, 'Player.__init__'),
+                   (recorded.calls, 'Player.equip_item'), (recorded.calls, 'SnapshotLog.checkpoint'),
+                   (recorded.calls, 'IOPool._execute')]
+        before = [self.count(table, name) for table, name in watched]
+        opened, written = recorded.file_opens, recorded.bytes_written
+
+        self.play()
+
+        after = [self.count(table, name) for table, name in watched]
+        for (_, name), was, now in zip(watched, before, after):
+            self.assertGreater(now, was, name)
+        self.assertEqual(after[0] - before[0], 1)
+        self.assertGreater(recorded.file_opens, opened)
+        self.assertGreater(recorded.bytes_written, written)
+        self.assertIn('game_command_seconds_count{command="equip"}', recorded.to_prometheus())
+        self.assertEqual(recorded.to_dict()['commands']['equip']['count'], after[0])
+
+    def test_disable_restores_originals(self):
+        originals = [(Player, name, Player.__dict__[name]) for name in metrics.player_methods(Player)]
+        for cls, names in metrics.INSTRUMENTED:
+            originals += [(cls, name, cls.__dict__[name]) for name in names]
+        originals += [(SnapshotLog, '_write', SnapshotLog._write), (SaveDatabase, 'save', SaveDatabase.save),
+                      (persistence, 'atomic_write_json', persistence.atomic_write_json)]
+        handlers = [(command, command.handler) for command in COMMANDS.commands]
+        checkpoint = SnapshotLog.__dict__['checkpoint']
+
+        metrics.enable(Player, COMMANDS)
+        self.assertIsNot(SnapshotLog.__dict__['checkpoint'], checkpoint)
+        metrics.disable()
+
+        for owner, name, original in originals:
+            current = owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)
+            self.assertIs(current, original, name)
+        for command, handler in handlers:
+            self.assertIs(command.handler, handler, command.name)
+        self.assertFalse(metrics._counting_opens[0])
+
+        # Nothing is counted once it's off.
+        recorded = metrics.METRICS
+        calls = {name: histogram.count for name, histogram in recorded.calls.items()}
+        opened = recorded.file_opens
+        self.play()
+        self.assertEqual({name: histogram.count for name, histogram in recorded.calls.items()}, calls)
+        self.assertEqual(recorded.file_opens, opened)
+
+
+if __name__ == '__main__':
+    unittest.main()
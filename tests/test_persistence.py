@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from persistence import StateStore
+
+
+class StateStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.state_dir, 'inventory.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def test_writes_at_every_turn_boundary(self):
+        store = StateStore(flush_at_exit=False)
+        store.mark_dirty(self.path, lambda: {'Sword': 1})
+        store.mark_dirty(self.path, lambda: {'Sword': 2})
+        self.assertEqual(store.end_turn(), 1)
+        self.assertEqual(store.load(self.path), {'Sword': 2})
+        self.assertEqual(store.stats(), {'writes': 1, 'writes_avoided': 1, 'pending': 0})
+
+    def test_flush_interval_waits_for_a_turn_boundary_after_it(self):
+        store = StateStore(flush_interval=60, flush_at_exit=False)
+        store.mark_dirty(self.path, lambda: {'Sword': 1})
+        self.assertEqual(store.end_turn(), 0)
+        self.assertIsNone(store.load(self.path))
+        store = StateStore(flush_interval=0, flush_at_exit=False)
+        store.mark_dirty(self.path, lambda: {'Sword': 1})
+        self.assertEqual(store.end_turn(), 1)
+        self.assertEqual(store.load(self.path), {'Sword': 1})
+        self.assertEqual(store.end_turn(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+from content import CONSUMABLE_STACK_LIMIT, STACK_LIMIT, LocationIds, get_content
+from playerstate import DENSE_LOCATIONS, SPARSE_CHUNK, Inventory, LocationSet, add_locations, added_locations
+
+
+def location_ids(count):
+    ids = LocationIds()
+    for index in range(count):
+        ids.id_of(f'Room {index}')
+    return ids
+
+
+class LocationSetTest(unittest.TestCase):
+    def check_set(self, ids):
+        last = f'Room {len(ids) - 1}'
+        names = ['Room 3', 'Room 1', last, 'Room 1']
+        visited = LocationSet(ids, names)
+        self.assertEqual(len(visited), 3)
+        self.assertIn('Room 3', visited)
+        self.assertNotIn('Room 2', visited)
+        self.assertNotIn('Nowhere', visited)
+        self.assertEqual(list(visited), ['Room 1', 'Room 3', last])
+        return visited
+
+    def test_dense(self):
+        visited = self.check_set(location_ids(DENSE_LOCATIONS))
+        self.assertIs(type(visited.snapshot()), int)
+
+    def test_sparse(self):
+        visited = self.check_set(location_ids(DENSE_LOCATIONS + SPARSE_CHUNK))
+        self.assertIs(type(visited.snapshot()), dict)
+
+    def test_sparse_snapshot_is_shared_until_a_change(self):
+        visited = LocationSet(location_ids(DENSE_LOCATIONS + 1), ['Room 5'])
+        before = visited.snapshot()
+        visited.add('Room 5')
+        self.assertIs(visited.snapshot(), before)
+        visited.add('Room 6')
+        after = visited.snapshot()
+        self.assertIsNot(after, before)
+        self.assertEqual(added_locations(before, after), [6])
+        self.assertEqual(add_locations(before, [6]), after)
+        # A snapshot taken earlier doesn't see later visits.
+        visited.restore(before)
+        self.assertNotIn('Room 6', visited)
+        self.assertEqual(after, add_locations(before, [6]))
+
+    def test_removed_locations_are_not_a_delta(self):
+        self.assertIsNone(added_locations({0: 0b11}, {0: 0b01}))
+        self.assertIsNone(added_locations({0: 1, 1: 1}, {1: 1}))
+
+    def test_restore_from_a_list_of_ids(self):
+        visited = LocationSet(location_ids(DENSE_LOCATIONS + SPARSE_CHUNK))
+        visited.restore([7, SPARSE_CHUNK + 1])
+        self.assertEqual(list(visited), ['Room 7', f'Room {SPARSE_CHUNK + 1}'])
+
+
+class InventoryTest(unittest.TestCase):
+    def setUp(self):
+        self.inventory = Inventory(get_content().items)
+
+    def test_stack_limits(self):
+        self.assertEqual(self.inventory.add('Sword', 5), STACK_LIMIT)
+        self.assertEqual(self.inventory.add('Sword'), 0)
+        self.assertEqual(self.inventory.add('Health Potion', CONSUMABLE_STACK_LIMIT - 1), CONSUMABLE_STACK_LIMIT - 1)
+        self.assertEqual(self.inventory.add('Health Potion', 5), 1)
+        self.assertEqual(self.inventory.count('Sword'), STACK_LIMIT)
+        self.assertEqual(len(self.inventory), STACK_LIMIT + CONSUMABLE_STACK_LIMIT)
+
+    def test_type_counts(self):
+        self.inventory.add('Trap Disarming Kit')
+        self.inventory.add('Sword', 2)
+        self.inventory.add('Dagger')
+        self.assertEqual(self.inventory.type_count('one-handed weapon'), 3)
+        self.assertEqual(self.inventory.type_count('trap_disarmament_item'), 1)
+        self.assertEqual(self.inventory.first_of_type('trap_disarmament_item'), 'Trap Disarming Kit')
+        self.inventory.remove('Sword')
+        self.inventory.remove('Trap Disarming Kit')
+        self.assertEqual(self.inventory.type_count('one-handed weapon'), 2)
+        self.assertFalse(self.inventory.has_type('trap_disarmament_item'))
+        self.assertIsNone(self.inventory.first_of_type('trap_disarmament_item'))
+
+    def test_removing_more_than_held(self):
+        self.inventory.add('Sword')
+        with self.assertRaises(ValueError):
+            self.inventory.remove('Sword', 2)
+        self.assertEqual(self.inventory.count('Sword'), 1)
+
+    def test_snapshot_and_restore(self):
+        self.inventory.add('Sword', 2)
+        snapshot = self.inventory.snapshot()
+        self.assertIs(self.inventory.snapshot(), snapshot)
+        self.assertEqual(snapshot, ('Sword', 'Sword'))
+        self.inventory.add('Shield')
+        self.inventory.restore(snapshot)
+        self.assertEqual(self.inventory.to_dict(), {'Sword': 2})
+        self.assertEqual(self.inventory.type_count('shield'), 0)
+
+    def test_saved_inventories(self):
+        # {name: count} and the older list of names; unknown items are dropped.
+        self.inventory.update_known({'Sword': 2, 'Excalibur': 1})
+        self.inventory.update_known(['Shield', 'Sword', 'Sword'])
+        self.assertEqual(self.inventory.to_dict(), {'Sword': STACK_LIMIT, 'Shield': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import bench
+import replay
+from engine import quiet
+
+
+class ReplayCorpusTest(unittest.TestCase):
+    def test_corpus_replays(self):
+        paths = replay.replay_paths([])
+        self.assertTrue(paths)
+        for path in paths:
+            with self.subTest(replay=os.path.basename(path)):
+                _, turns = replay.replay(path)
+                self.assertIsNotNone(turns)
+
+    def test_replay_play_command(self):
+        root = os.path.dirname(os.path.abspath(replay.__file__))
+        result = subprocess.run([sys.executable, 'replay.py', 'play'], cwd=root, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertNotIn('DIVERGED', result.stdout)
+
+
+class ReplayBenchmarkTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.baseline = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.baseline)
+
+    def compare(self, seconds):
+        with open(self.baseline, 'w') as f:
+            json.dump({'replay_warrior_market': {'seconds': seconds, 'fs_calls': 1000}}, f)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = bench.main(['-k', 'replay_warrior_market', '-r', '1', '--baseline', self.baseline])
+        return status, output.getvalue()
+
+    def test_every_replay_is_benchmarked(self):
+        for path in replay.replay_paths([]):
+            name = 'replay_' + os.path.splitext(os.path.basename(path))[0]
+            self.assertIn(name, bench.BENCHMARKS)
+
+    def test_slower_than_the_baseline_fails(self):
+        status, output = self.compare(1e-9)
+        self.assertEqual(status, 1)
+        self.assertIn('REGRESSION replay_warrior_market', output)
+
+    def test_within_the_baseline_passes(self):
+        status, output = self.compare(60.0)
+        self.assertEqual(status, 0)
+        self.assertNotIn('REGRESSION', output)
+
+
+class RecordTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.replay')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_recording_replays_and_a_changed_ending_diverges(self):
+        replay.record(self.path, seed=5, script=['rogue', 'stats', 'move north', 'quit'], output=quiet)
+        self.assertEqual(replay.replay(self.path)[1], 3)
+        with open(self.path) as f:
+            lines = f.readlines()
+        final = json.loads(lines[-1])
+        final['final']['health'] += 1
+        lines[-1] = json.dumps(final) + '\n'
+        with open(self.path, 'w') as f:
+            f.writelines(lines)
+        with self.assertRaises(replay.ReplayDivergence):
+            replay.replay(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
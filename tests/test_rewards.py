@@ -0,0 +1,34 @@
+import random
+import unittest
+
+from engine import headless_player
+from render import EventLog
+
+
+class ItemRewardRandom(random.Random):
+    # Picks the item reward and then the first item of the asked-for type.
+    def choice(self, options):
+        return 'item' if 'item' in options else options[0]
+
+
+class RewardTest(unittest.TestCase):
+    def reward(self, fill):
+        output = EventLog(messages=True)
+        player = headless_player('Warrior', rng=ItemRewardRandom(0), output=output)
+        item = player.content.items.random_item_of_type('health_potion', player.rng)
+        while fill and player.add_to_inventory(item):
+            pass
+        del output.events[:]
+        player.reward_quest('health_potion')
+        return [event.kind for event in output.events]
+
+    def test_reward_is_announced(self):
+        self.assertEqual(self.reward(fill=False), ['item_added', 'reward'])
+
+    def test_reward_that_does_not_fit_is_not_announced(self):
+        # Only the "can't carry another" message.
+        self.assertEqual(self.reward(fill=True), ['message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from Adventure import COMMANDS, Player
+from iopool import IOPool
+from persistence import NullStore
+from policies import ScriptedPolicy
+from render import EventLog
+from savedb import PAGE_SIZE, SaveDatabase
+
+
+class SaveDatabaseTest(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.saves = SaveDatabase(os.path.join(self.state_dir, 'saves.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def data(self, player_class='Warrior', location='Town'):
+        return {'player_class': player_class, 'current_location': location}
+
+    def test_listing_is_per_owner_and_paged(self):
+        for index in range(PAGE_SIZE + 5):
+            self.saves.save(f'mine {index}', self.data(), owner='alice')
+        self.saves.save('theirs', self.data('Rogue'), owner='bob')
+        self.saves.save('mine 0', self.data('Mage', 'Forest'), owner='alice')
+
+        self.assertEqual(self.saves.count('alice'), PAGE_SIZE + 5)
+        self.assertEqual(self.saves.count('bob'), 1)
+        self.assertEqual(self.saves.count(''), 0)
+        first = self.saves.catalog('alice')
+        second = self.saves.catalog('alice', page=1)
+        self.assertEqual(len(first), PAGE_SIZE)
+        self.assertEqual(len(second), 5)
+        names = [save['name'] for save in first + second]
+        # Newest first; re-saving a name moves it to the front.
+        self.assertEqual(names[0], 'mine 0')
+        self.assertEqual(names[1:], [f'mine {index}' for index in range(PAGE_SIZE + 4, 0, -1)])
+        self.assertEqual(self.saves.catalog('alice', page=2), [])
+        self.assertEqual([save['name'] for save in self.saves.catalog('alice', player_class='Mage')], ['mine 0'])
+        self.assertEqual(self.saves.load('mine 0', 'alice'), self.data('Mage', 'Forest'))
+        self.assertIsNone(self.saves.load('theirs', 'alice'))
+        with self.assertRaises(ValueError):
+            self.saves.count('alice', data='x')
+
+    def test_delete(self):
+        self.saves.save('slot', self.data(), owner='alice')
+        self.assertFalse(self.saves.delete('slot', 'bob'))
+        self.assertTrue(self.saves.delete('slot', 'alice'))
+        self.assertIsNone(self.saves.load('slot', 'alice'))
+
+    def test_background_saves_are_read_back(self):
+        pool = IOPool(flush_at_exit=False)
+        saves = SaveDatabase(self.saves.path, io=pool)
+        try:
+            for index in range(20):
+                saves.save(f'slot {index}', self.data(), owner='alice')
+            self.assertEqual(saves.count('alice'), 20)
+        finally:
+            pool.close()
+
+
+class SaveCommandsTest(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.saves = SaveDatabase(os.path.join(self.state_dir, 'saves.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def player(self, player_class='Warrior', policy=None, owner='alice'):
+        return Player(player_class, store=NullStore(), policy=policy or ScriptedPolicy([]), rng=random.Random(0),
+                      output=EventLog(messages=True), saves=self.saves,
+                      state_dir=os.path.join(self.state_dir, owner))
+
+    def messages(self, player):
+        return [event.fields['text'] for event in player.say.events if event.kind == 'message']
+
+    def test_every_field_round_trips(self):
+        saved = self.player()
+        saved.health = 77
+        saved.max_health = 130
+        saved.mana = 3
+        saved.max_mana = 9
+        saved.stats.set_base('damage_rating', 21)
+        saved.stats.set_base('armor_rating', 4)
+        saved.add_to_inventory('Mana Potion')
+        saved.equip_item('Axe')
+        saved.move('north')
+        COMMANDS.dispatch(saved, 'savegame Before the Cave')
+
+        loaded = self.player('Rogue')
+        COMMANDS.dispatch(loaded, 'loadgame Before the Cave')
+        self.assertEqual(loaded.save_data(), saved.save_data())
+        self.assertEqual(loaded.damage_rating, saved.damage_rating)
+        self.assertIn("Game 'Before the Cave' loaded.", self.messages(loaded))
+
+    def test_saves_are_per_owner(self):
+        COMMANDS.dispatch(self.player(), 'savegame mine')
+        other = self.player(owner='bob')
+        COMMANDS.dispatch(other, 'loadgame mine')
+        self.assertIn("No saved game named 'mine'.", self.messages(other))
+        COMMANDS.dispatch(other, 'loadgame')
+        self.assertIn("No saved games found.", self.messages(other))
+
+    def test_choosing_from_pages(self):
+        saver = self.player()
+        for index in range(PAGE_SIZE + 2):
+            saver.health = index + 1
+            COMMANDS.dispatch(saver, f'savegame slot {index}')
+        # The oldest save is the last on the second page.
+        loader = self.player(policy=ScriptedPolicy({'load_choice': ['next', '2']}))
+        COMMANDS.dispatch(loader, 'loadgame')
+        self.assertEqual(loader.health, 1)
+        self.assertIn("Saved games (page 2 of 2):", self.messages(loader))
+
+    def test_save_asks_for_a_name(self):
+        player = self.player(policy=ScriptedPolicy({'save_name': ['  asked  ']}))
+        COMMANDS.dispatch(player, 'savegame')
+        self.assertEqual(self.saves.catalog(player.save_owner())[0]['name'], 'asked')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from iopool import get_io_pool
+from server import GameServer
+
+
+class GameServerTest(unittest.TestCase):
+    def setUp(self):
+        self.state_root = tempfile.mkdtemp()
+        self.server = GameServer('127.0.0.1', 0, self.state_root)
+
+    def tearDown(self):
+        shutil.rmtree(self.state_root)
+
+    def equipped(self, name):
+        with open(os.path.join(self.state_root, name, 'Warrior_equipped.json')) as f:
+            return {slot: item for slot, item in json.load(f).items() if item is not None}
+
+    async def connect(self, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await reader.readuntil(b"Enter your name: ")
+        return reader, writer
+
+    async def send(self, writer, *lines):
+        writer.write(''.join(line + '\r\n' for line in lines).encode())
+        await writer.drain()
+
+    async def play_two(self):
+        listener = await asyncio.start_server(self.server.handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            alice, bob = await self.connect(port), await self.connect(port)
+            await self.send(alice[1], 'alice', 'warrior')
+            await self.send(bob[1], 'bob', 'warrior')
+            await alice[0].readuntil(b"Enter a command")
+            await bob[0].readuntil(b"Enter a command")
+
+            # A name already playing is turned away.
+            twin = await self.connect(port)
+            await self.send(twin[1], 'alice')
+            refused = await twin[0].readuntil(b"Enter your name: ")
+            twin[1].close()
+
+            await self.send(alice[1], 'equip sword', 'quit')
+            await self.send(bob[1], 'equip shield', 'quit')
+            transcripts = [await alice[0].read(), await bob[0].read()]
+            for _, writer in (alice, bob):
+                writer.close()
+            # Each connection's handler forgets its session once the client hangs up.
+            while self.server.sessions:
+                await asyncio.sleep(0.01)
+        return refused, transcripts
+
+    def test_sessions_are_separate(self):
+        refused, transcripts = asyncio.run(asyncio.wait_for(self.play_two(), 10))
+        get_io_pool().flush()
+
+        self.assertIn(b"alice is already playing.", refused)
+        self.assertEqual(sorted(os.listdir(self.state_root)), ['alice', 'bob'])
+        self.assertEqual(self.equipped('alice'), {'one-handed weapon': 'Sword'})
+        self.assertEqual(self.equipped('bob'), {'shield': 'Shield'})
+        # Each player sees only their own turns.
+        self.assertIn(b"You equipped Sword.\r\n", transcripts[0])
+        self.assertNotIn(b"Shield.", transcripts[0])
+        self.assertIn(b"You equipped Shield.\r\n", transcripts[1])
+        self.assertNotIn(b"Sword.", transcripts[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from Adventure import Player
+from engine import headless_player
+from persistence import NullStore
+from regions import open_world
+from snapshots import VISITED, SnapshotLog, capture
+
+
+def play_turns(player, log, turns):
+    for _ in range(turns):
+        player.health -= 1
+        log.checkpoint(player)
+
+
+class RewindTest(unittest.TestCase):
+    def setUp(self):
+        self.player = headless_player('Warrior', seed=0)
+        self.start = self.player.health
+
+    def test_every_turn_can_be_rebuilt(self):
+        log = SnapshotLog(self.player, keyframe_every=4)
+        play_turns(self.player, log, 10)
+        for turn in range(11):
+            self.assertEqual(log.state_at(turn)[0], self.start - turn)
+        with self.assertRaises(ValueError):
+            log.state_at(11)
+
+    def test_rewind_restores_the_player_and_drops_later_turns(self):
+        log = SnapshotLog(self.player, keyframe_every=4)
+        swords = self.player.inventory.count('Sword')
+        play_turns(self.player, log, 10)
+        self.player.add_to_inventory('Sword')
+        log.rewind(self.player, 6)
+        self.assertEqual(self.player.health, self.start - 6)
+        self.assertEqual(self.player.inventory.count('Sword'), swords)
+        self.assertEqual(log.turn, 6)
+        with self.assertRaises(ValueError):
+            log.state_at(7)
+        # Play goes on from the rewound turn.
+        play_turns(self.player, log, 3)
+        self.assertEqual(log.state_at(9)[0], self.start - 9)
+        log.rewind(self.player, 0)
+        self.assertEqual(capture(self.player), log.state_at(0))
+        self.assertEqual(self.player.health, self.start)
+
+    def test_old_turns_are_trimmed_a_keyframe_at_a_time(self):
+        log = SnapshotLog(self.player, keyframe_every=4, max_turns=8)
+        play_turns(self.player, log, 30)
+        self.assertGreaterEqual(log.oldest_turn, 30 - 8 - 4)
+        self.assertLessEqual(log.oldest_turn, 30 - 8)
+        self.assertEqual(log.state_at(30 - 8)[0], self.start - 22)
+        with self.assertRaises(ValueError):
+            log.state_at(log.oldest_turn - 1)
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.state_dir, 'autosave.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def test_sparse_visited_set_is_journalled_as_new_rooms(self):
+        player = Player('Warrior', store=NullStore(), rng=random.Random(0), world=open_world(seed=7))
+        self.assertIs(type(player._visited.snapshot()), dict)
+        log = SnapshotLog(player, path=self.path)
+        log.checkpoint(player)
+        for step in range(5):
+            # Rooms far enough apart to land in different chunks.
+            player._visited.add(player.world.room_name(step, step * 10))
+            log.checkpoint(player)
+        log.close()
+
+        with open(self.path) as f:
+            records = [json.loads(line) for line in f][1:]
+        self.assertEqual(len(records), 6)
+        self.assertNotIn('v', records[0])
+        for record in records[1:]:
+            self.assertEqual(len(record['v']), 1)
+            self.assertNotIn(VISITED, [index for index, _ in record['d']])
+
+        player_class, world, turn, state = SnapshotLog.recover(self.path)
+        self.assertEqual((player_class, world, turn), ('Warrior', player.world.identity, 6))
+        self.assertEqual(state, capture(player))
+
+    def test_rewind_rewrites_the_journal(self):
+        player = headless_player('Warrior', seed=0)
+        log = SnapshotLog(player, keyframe_every=4, path=self.path)
+        play_turns(player, log, 10)
+        log.rewind(player, 5)
+        play_turns(player, log, 1)
+        log.close()
+        _, _, turn, state = SnapshotLog.recover(self.path)
+        self.assertEqual(turn, 6)
+        self.assertEqual(state, capture(player))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from spawns import AliasTable, SpawnTables
+
+
+class AliasTableTest(unittest.TestCase):
+    def test_probabilities_match_the_weights(self):
+        table = AliasTable(['a', 'b', 'c', 'd'], [1, 2, 3, 0])
+        for outcome, expected in zip('abcd', [1 / 6, 2 / 6, 3 / 6, 0]):
+            self.assertAlmostEqual(table.probabilities()[outcome], expected)
+
+    def test_sampling_follows_the_probabilities(self):
+        table = AliasTable(['a', 'b', 'c', 'd'], [5, 1, 3, 0])
+        rng = random.Random(1)
+        draws = 90000
+        counts = dict.fromkeys('abcd', 0)
+        for _ in range(draws):
+            counts[table.sample(rng)] += 1
+        self.assertEqual(counts['d'], 0)
+        for outcome, weight in zip('abc', [5, 1, 3]):
+            self.assertAlmostEqual(counts[outcome] / draws, weight / 9, delta=0.01)
+
+    def test_single_outcome(self):
+        table = AliasTable(['only'], [0.5])
+        self.assertEqual(table.probabilities(), {'only': 1.0})
+        self.assertEqual(table.sample(random.Random(0)), 'only')
+
+    def test_needs_a_positive_weight(self):
+        with self.assertRaises(ValueError):
+            AliasTable([], [])
+        with self.assertRaises(ValueError):
+            AliasTable(['a'], [0])
+
+
+class SpawnTablesTest(unittest.TestCase):
+    def setUp(self):
+        enemies = {
+            'Rat': {'health': 10, 'attack': 1, 'level': 1, 'weight': 3},
+            'Wolf': {'health': 30, 'attack': 2, 'level': 2},
+            'Dragon': {'health': 200, 'attack': 9, 'level': 9},
+        }
+        locations = {
+            'Cellar': {'spawns': {'Rat': 1, 'Wolf': 0, 'Ghost': 5}},
+            'Woods': {'enemy_levels': [1, 2]},
+            'Sky': {'enemy_levels': [20, 30]},
+            'Town': {},
+        }
+        self.spawns = SpawnTables(locations, enemies)
+
+    def names(self, location):
+        return {template.name: round(p, 6) for template, p in self.spawns.table(location).probabilities().items()}
+
+    def test_explicit_spawns(self):
+        # Unknown enemies and zero weights are left out.
+        self.assertEqual(self.names('Cellar'), {'Rat': 1.0})
+
+    def test_level_band_uses_each_enemys_weight(self):
+        self.assertEqual(self.names('Woods'), {'Rat': 0.75, 'Wolf': 0.25})
+
+    def test_empty_band_and_unknown_locations_draw_from_everyone(self):
+        self.assertEqual(self.spawns.empty, ['Sky'])
+        self.assertEqual(self.names('Sky'), {'Rat': 0.6, 'Wolf': 0.2, 'Dragon': 0.2})
+        self.assertEqual(self.names('Town'), self.names('Sky'))
+        self.assertEqual(self.names('Nowhere'), self.names('Sky'))
+
+    def test_spawned_enemies_are_fresh(self):
+        rng = random.Random(0)
+        first = self.spawns.spawn('Cellar', rng)
+        first.health -= 5
+        self.assertEqual(self.spawns.spawn('Cellar', rng).health, 10)
+        self.assertEqual(first.template.health, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
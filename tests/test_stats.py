@@ -0,0 +1,44 @@
+import unittest
+
+from engine import headless_player
+from playerstate import Stats
+
+
+class StatsTest(unittest.TestCase):
+    def test_whole_totals_are_ints(self):
+        stats = Stats({'damage_rating': 10, 'damage_modifier': 1})
+        self.assertIs(type(stats['damage_rating']), int)
+        stats.add_modifier('buff', 'damage_modifier', multiply=1.5)
+        self.assertEqual(stats['damage_modifier'], 1.5)
+        stats.remove_modifier('buff')
+        self.assertIs(type(stats['damage_modifier']), int)
+
+
+class ElixirTest(unittest.TestCase):
+    def test_elixir_lasts_its_turns(self):
+        player = headless_player('Warrior', seed=0)
+        armor = player.armor_rating
+        player.add_to_inventory('Elixir of Speed')
+        player.use_consumable('Elixir of Speed')
+        self.assertEqual(player.armor_rating, armor + 5)
+        # Drinking another only restarts it.
+        player.add_to_inventory('Elixir of Speed')
+        player.use_consumable('Elixir of Speed')
+        self.assertEqual(player.armor_rating, armor + 5)
+        player.clock.advance(4)
+        self.assertEqual(player.armor_rating, armor + 5)
+        player.clock.advance()
+        self.assertEqual(player.armor_rating, armor)
+        self.assertNotIn('Elixir of Speed', player.effects)
+
+    def test_multiplying_elixir(self):
+        player = headless_player('Warrior', seed=0)
+        player.add_to_inventory('Elixir of Power')
+        player.use_consumable('Elixir of Power')
+        self.assertEqual(player.damage_modifier, 1.5)
+        player.clock.run_until_idle()
+        self.assertEqual(player.damage_modifier, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import random
+import unittest
+
+from engine import headless_player
+from policies import ScriptedPolicy
+
+
+class StackedRandom(random.Random):
+    # random() returns the given values in order; choice() takes the first option.
+    def __init__(self, values):
+        super().__init__(0)
+        self.values = list(values)
+
+    def random(self):
+        return self.values.pop(0)
+
+    def choice(self, options):
+        return options[0]
+
+
+def trapped_player(player_class, rolls, action):
+    player = headless_player(player_class, policy=ScriptedPolicy({'trap': [action]}), rng=StackedRandom(rolls))
+    player.inventory.clear()
+    return player
+
+
+class KitDisarmTest(unittest.TestCase):
+    def test_rogue_failed_kit_disarm_takes_reduced_damage(self):
+        # Trap found, disarm fails; the first trap type is a 20 damage spike.
+        # Half damage, halved again by the Rogue's resistance.
+        player = trapped_player('Rogue', [0.1, 0.95], 'disarm')
+        player.add_to_inventory('Trap Disarming Kit')
+        player.detect_trap()
+        self.assertEqual(player.health, player.max_health - 5)
+        self.assertEqual(player.inventory.type_count('trap_disarmament_item'), 0)
+        self.assertFalse(player.game_over)
+
+    def test_warrior_failed_kit_disarm_takes_full_damage(self):
+        # Warriors have to spot the trap with a detection kit first.
+        player = trapped_player('Warrior', [0.1, 0.1, 0.95], 'disarm')
+        player.add_to_inventory('Trap Detection Kit')
+        player.add_to_inventory('Trap Disarming Kit')
+        player.detect_trap()
+        self.assertEqual(player.health, player.max_health - 20)
+
+
+class RogueRulesTest(unittest.TestCase):
+    def test_rogue_avoids_more_often(self):
+        rogue = trapped_player('Rogue', [0.1, 0.5], 'avoid')
+        rogue.detect_trap()
+        self.assertEqual(rogue.health, rogue.max_health)
+
+    def test_rogue_disarms_by_hand_less_often(self):
+        rogue = trapped_player('Rogue', [0.1, 0.3], 'disarm')
+        rogue.detect_trap()
+        self.assertEqual(rogue.health, rogue.max_health - 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from content import LocationIds
+from world import WorldGraph, grid_world
+
+
+class WorldGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.ids = LocationIds()
+        self.world = WorldGraph(grid_world(3, 3), self.ids, start='Room 0,0')
+
+    def test_routes_on_a_grid(self):
+        self.assertEqual(self.world.route('Room 0,0', 'Room 2,1'), ['south', 'east', 'east'])
+        self.assertEqual(self.world.route('Room 1,1', 'Room 1,1'), [])
+        self.assertEqual(self.world.destination('Room 0,0', 'east'), 'Room 1,0')
+        self.assertIsNone(self.world.destination('Room 0,0', 'west'))
+
+    def test_unknown_location_has_no_exits(self):
+        self.assertIsNone(self.world.destination('Nowhere', 'north'))
+        self.assertEqual(self.world.open_exits('Nowhere'), [])
+        self.assertEqual(self.world.wander_targets('Nowhere'), ())
+        self.assertIsNone(self.world.route('Nowhere', 'Room 0,0'))
+        self.assertIsNone(self.world.route('Room 0,0', 'Nowhere'))
+        self.assertIsNone(self.world.find('Nowhere'))
+        # Looking a name up must not intern it.
+        self.assertIsNone(self.ids.get('Nowhere'))
+
+    def test_location_interned_after_compiling(self):
+        # e.g. a generated room name read back from a save or journal.
+        self.ids.id_of('Town (100, 100)')
+        self.assertIsNone(self.world.destination('Town (100, 100)', 'north'))
+        self.assertEqual(self.world.open_exits('Town (100, 100)'), [])
+        self.assertIsNone(self.world.route('Town (100, 100)', 'Room 0,0'))
+
+    def test_find_ignores_case(self):
+        self.assertEqual(self.world.find('room 2,2'), 'Room 2,2')
+
+
+if __name__ == '__main__':
+    unittest.main()
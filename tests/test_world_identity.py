@@ -0,0 +1,72 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from Adventure import Player, main as play
+from persistence import NullStore
+from policies import BatchPolicy, ScriptedPolicy
+from regions import open_world
+from render import EventLog
+from savedb import SaveDatabase
+
+
+def generated_world():
+    return open_world(seed=7, width=64)
+
+
+class WorldIdentityTest(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def quit_at_once(self, world):
+        output = EventLog(messages=True)
+        player = play(policy=BatchPolicy(['warrior', 'quit']), output=output, store=NullStore(),
+                      state_dir=self.state_dir, pace=0, rng=random.Random(0), world=world)
+        resumed = any(event.kind == 'message' and event.fields['text'].startswith('Resumed')
+                      for event in output.events)
+        return player, resumed
+
+    def test_autosave_from_another_world_is_not_resumed(self):
+        generated, _ = self.quit_at_once(generated_world())
+        self.assertTrue(os.path.exists(os.path.join(self.state_dir, 'autosave.jsonl')))
+        player, resumed = self.quit_at_once(None)
+        self.assertFalse(resumed)
+        self.assertEqual(player.current_location, 'Town')
+        self.assertNotEqual(generated.current_location, 'Town')
+
+    def test_autosave_from_the_map_is_not_resumed_in_a_generated_world(self):
+        self.quit_at_once(None)
+        world = generated_world()
+        player, resumed = self.quit_at_once(world)
+        self.assertFalse(resumed)
+        self.assertEqual(player.current_location, world.start)
+
+    def test_autosave_from_the_same_world_is_resumed(self):
+        self.quit_at_once(generated_world())
+        _, resumed = self.quit_at_once(generated_world())
+        self.assertTrue(resumed)
+
+    def test_save_from_another_world_is_rejected(self):
+        saves = SaveDatabase(os.path.join(self.state_dir, 'saves.db'))
+        policy = ScriptedPolicy({'save_name': ['far'], 'load_choice': ['1']})
+
+        def player(world):
+            return Player('Warrior', store=NullStore(), policy=policy, rng=random.Random(0), output=EventLog(True),
+                          saves=saves, world=world)
+
+        generated = player(generated_world())
+        generated.save_game()
+        here = player(None)
+        here.load_game()
+        self.assertEqual(here.current_location, 'Town')
+        self.assertIn('far', here.say.events[-1].fields['text'])
+        self.assertIn('different world', here.say.events[-1].fields['text'])
+
+
+if __name__ == '__main__':
+    unittest.main()
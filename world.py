@@ -0,0 +1,210 @@
+import argparse
+import time
+from array import array
+from collections import OrderedDict, deque
+
+from content import LocationIds, get_content
+
+EXITS = ('north', 'south', 'east', 'west')
+# What saves and autosaves record as the world they were made in; generated
+# worlds name their seed and size instead (see regions.py).
+MAP_IDENTITY = 'map'
+NO_EXIT = -1
+ROUTE_CACHE_SIZE = 256
+
+
+class WorldGraph:
+    # locations.json compiled to integer location IDs with one exit array per
+    # direction. Routes come from breadth-first search trees, one per source
+    # location, kept in a small LRU cache: all-pairs tables don't fit once a
+    # world has tens of thousands of rooms, and players mostly route from a
+    # handful of hubs.
+    identity = MAP_IDENTITY
+
+    def __init__(self, locations, ids=None, start='Town', cache_size=ROUTE_CACHE_SIZE):
+        self.ids = ids if ids is not None else LocationIds()
+        self.start = start
+        self.cache_size = cache_size
+        for name in locations:
+            self.ids.id_of(name)
+        size = len(self.ids)
+        self.exits = {direction: array('i', [NO_EXIT]) * size for direction in EXITS}
+        self.present = bytearray(size)
+        self.random_moves = {}
+        self.dangling = []
+        self._by_lower = {}
+        for name, location in locations.items():
+            location_id = self.ids.id_of(name)
+            self.present[location_id] = 1
+            self._by_lower[name.lower()] = name
+            for direction in EXITS:
+                target = location.get(direction)
+                if target is None:
+                    continue
+                if target not in locations:
+                    self.dangling.append((name, direction, target))
+                    continue
+                self.exits[direction][location_id] = self.ids.id_of(target)
+            if location.get('random_moves'):
+                moves = [target for target in location['random_moves'] if target in locations]
+                for target in location['random_moves']:
+                    if target not in locations:
+                        self.dangling.append((name, 'random', target))
+                self.random_moves[location_id] = tuple(moves)
+        self._trees = OrderedDict()
+        self.unreachable = self._find_unreachable()
+
+    def __len__(self):
+        return sum(self.present)
+
+    def _known(self, location):
+        # The ID of a location this graph compiled, or None. Names from a
+        # save, a journal or a later reload may have no place in the arrays,
+        # and looking one up must not intern it.
+        location_id = self.ids.get(location)
+        if location_id is None or location_id >= len(self.present) or not self.present[location_id]:
+            return None
+        return location_id
+
+    def find(self, name):
+        # Case-insensitive, since console commands arrive lower-cased.
+        if self._known(name) is not None:
+            return name
+        return self._by_lower.get(name.lower())
+
+    def destination(self, location, direction):
+        location_id = self._known(location)
+        if location_id is None:
+            return None
+        target = self.exits[direction][location_id]
+        return None if target == NO_EXIT else self.ids.name_of(target)
+
+    def archetype(self, location):
+        # The location whose description and spawn table a room uses; a
+        # hand-written room is its own (see regions.py for generated ones).
+        return location
+
+    def open_exits(self, location):
+        location_id = self._known(location)
+        if location_id is None:
+            return []
+        return [direction for direction in EXITS if self.exits[direction][location_id] != NO_EXIT]
+
+    def wander_targets(self, location):
+        # Where the 'random' direction can lead: the room's random_moves if it
+        # has any, otherwise its open exits.
+        location_id = self._known(location)
+        if location_id is None:
+            return ()
+        moves = self.random_moves.get(location_id)
+        if moves:
+            return moves
+        return tuple(self.ids.name_of(self.exits[direction][location_id]) for direction in EXITS
+                     if self.exits[direction][location_id] != NO_EXIT)
+
+    def _tree(self, source_id):
+        tree = self._trees.get(source_id)
+        if tree is not None:
+            self._trees.move_to_end(source_id)
+            return tree
+        size = len(self.present)
+        parent = array('i', [NO_EXIT]) * size
+        via = bytearray(size)
+        parent[source_id] = source_id
+        queue = deque([source_id])
+        exits = [self.exits[direction] for direction in EXITS]
+        while queue:
+            current = queue.popleft()
+            for direction_index, targets in enumerate(exits):
+                target = targets[current]
+                if target != NO_EXIT and parent[target] == NO_EXIT:
+                    parent[target] = current
+                    via[target] = direction_index
+                    queue.append(target)
+        tree = (parent, via)
+        self._trees[source_id] = tree
+        if len(self._trees) > self.cache_size:
+            self._trees.popitem(last=False)
+        return tree
+
+    def route(self, source, target):
+        # The directions to walk from source to target, or None if there is
+        # no way there.
+        source_id = self._known(source)
+        target_id = self._known(target)
+        if source_id is None or target_id is None:
+            return None
+        parent, via = self._tree(source_id)
+        if parent[target_id] == NO_EXIT:
+            return None
+        steps = []
+        current = target_id
+        while current != source_id:
+            steps.append(EXITS[via[current]])
+            current = parent[current]
+        steps.reverse()
+        return steps
+
+    def _find_unreachable(self):
+        if self.ids.get(self.start) is None:
+            return []
+        parent, _ = self._tree(self.ids.id_of(self.start))
+        return [self.ids.name_of(location_id) for location_id in range(len(self.present))
+                if self.present[location_id] and parent[location_id] == NO_EXIT]
+
+    def problems(self):
+        found = []
+        for name, direction, target in self.dangling:
+            found.append(f"{name}: {direction} exit leads to unknown location {target!r}")
+        for name in self.unreachable:
+            found.append(f"{name}: unreachable from {self.start}")
+        return found
+
+
+def grid_world(width, height):
+    # A synthetic width x height world for timing routes on big maps.
+    locations = {}
+    for y in range(height):
+        for x in range(width):
+            locations[f'Room {x},{y}'] = {
+                'north': f'Room {x},{y - 1}' if y > 0 else None,
+                'south': f'Room {x},{y + 1}' if y < height - 1 else None,
+                'east': f'Room {x + 1},{y}' if x < width - 1 else None,
+                'west': f'Room {x - 1},{y}' if x > 0 else None,
+                'description': 'A generated room.',
+            }
+    return locations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the world map, or time routing on a generated one.")
+    parser.add_argument('--grid', type=int, default=None, metavar='SIDE',
+                        help="time routes on a generated SIDE x SIDE world instead")
+    args = parser.parse_args(argv)
+
+    if args.grid is None:
+        world = get_content().world
+        problems = world.problems()
+        print(f"{len(world)} locations, {len(problems)} problems")
+        for problem in problems:
+            print(f"- {problem}")
+        return
+
+    locations = grid_world(args.grid, args.grid)
+    started = time.perf_counter()
+    world = WorldGraph(locations, start='Room 0,0')
+    compiled = time.perf_counter() - started
+    far = f'Room {args.grid - 1},{args.grid - 1}'
+    started = time.perf_counter()
+    steps = world.route('Room 0,0', far)
+    first = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(1000):
+        world.route('Room 0,0', far)
+    cached = (time.perf_counter() - started) / 1000
+    print(f"{len(world)} rooms compiled in {compiled:.2f}s")
+    print(f"route of {len(steps)} steps: {first * 1000:.1f}ms cold, {cached * 1000:.3f}ms cached")
+
+
+if __name__ == "__main__":
+    main()